@@ -1,4 +1,6 @@
 __all__ = [
-    "cli", "aggregate", "models", "utils", "output", "resolvers", "scanners"
+    "cli", "aggregate", "models", "utils", "output", "resolvers", "scanners",
+    "enrichment", "dnsproto", "rdns", "mdns", "netbios", "inventory", "watch", "scheduler",
+    "hoststore", "stats", "oui", "distributed", "planner", "snapshot", "ansible_inventory",
 ]
 __version__ = "1.1.0"
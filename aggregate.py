@@ -1,7 +1,21 @@
 from __future__ import annotations
-from typing import Dict, Iterable, List, Optional, Set
+import ipaddress
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+import stats
 from models import Host
-from resolvers import probe_ip_neigh_one, resolve_mdns, reverse_dns, run_nbtscan_range
+from enrichment import EnrichmentStage
+from hoststore import HostTable
+from inventory import InventoryDiff, InventoryStore
+from oui import OuiDatabase
+from planner import AdaptivePlanner, Plan, StepLog
+from resolvers import NeighTable, probe_ip_neigh_one, read_neigh_table
+from scheduler import RateBudget, host_count, shard_subnet
 from scanners import HostScanner, IpScanner
 
 class DiscoveryPipeline:
@@ -19,6 +33,21 @@ class DiscoveryPipeline:
         enable_nbtscan: bool = True,
         enable_mdns: bool = True,
         enable_rdns: bool = True,
+        max_parallel: Optional[int] = None,
+        enrich_workers: int = 32,
+        lookup_timeout: float = 2.0,
+        enrich_deadline: float = 60.0,
+        dns_server: Optional[str] = None,
+        inventory: Optional[InventoryStore] = None,
+        shard_prefix: Optional[int] = 24,
+        max_shards: int = 4,
+        pps: Optional[float] = None,
+        targeted: bool = False,
+        retry_timeout: Optional[int] = None,
+        vendor_db: Optional[OuiDatabase] = None,
+        record_inventory: bool = True,
+        planner: Optional[AdaptivePlanner] = None,
+        deadline: Optional[float] = None,
     ):
         self.host_scanners = list(host_scanners)
         self.ip_scanners = list(ip_scanners)
@@ -27,45 +56,429 @@ class DiscoveryPipeline:
         self.enable_nbtscan = enable_nbtscan
         self.enable_mdns = enable_mdns
         self.enable_rdns = enable_rdns
+        # None = launch every scanner at once, 1 = strictly sequential
+        self.max_parallel = max_parallel
+        # large subnets: shard size, shards in flight, global probe budget
+        self.shard_prefix = shard_prefix
+        self.max_shards = max(1, max_shards)
+        self.pps = pps
+        # targeted: scanners that take target lists probe only unknown
+        # addresses; retry_timeout: re-probe non-responders once more
+        self.targeted = targeted
+        self.retry_timeout = retry_timeout
+        self.enrichment = EnrichmentStage(
+            enable_mdns=enable_mdns,
+            enable_netbios=enable_nbtscan,
+            enable_rdns=enable_rdns,
+            workers=enrich_workers,
+            lookup_timeout=lookup_timeout,
+            deadline=enrich_deadline,
+            dns_server=dns_server,
+            vendor_db=vendor_db,
+        )
+        self.inventory = inventory
+        # False when a MultiNetworkDiscovery records the merged run instead
+        self.record_inventory = record_inventory
+        # name source per IP of the last run ("cache" for inventory reuse), and
+        # with an inventory attached, the changes against the previous run and
+        # the vendors it supplied
+        self.last_diff: Optional[InventoryDiff] = None
+        self.last_sources: Dict[str, str] = {}
+        self.last_cached_vendors: Set[str] = set()
+        # planner: picks and orders scanners/name sources per subnet from
+        # their measured cost and yield; deadline: seconds per discover run,
+        # capping tool timeouts and the enrichment stage
+        self.planner = planner
+        self.deadline = deadline
+        self.last_plan: Optional[Plan] = None
+        self._steps: Optional[StepLog] = None
+        self._until: Optional[float] = None
 
-    def discover(self, subnet: str) -> List[Host]:
-        hosts_by_ip: Dict[str, Host] = {}
-
-        # 1) Host-yielding scanners (e.g., arp-scan, ARP seed)
-        for scanner in self.host_scanners:
-            for h in scanner.scan_hosts(subnet, timeout=self.timeout, interface=self.interface):
-                hosts_by_ip[h.ip] = self._merged(hosts_by_ip.get(h.ip), h)
-
-        # 2) IP-only scanners (e.g., nmap ping, fping sweep)
-        seed_ips: Set[str] = set(hosts_by_ip.keys())
-        for scanner in self.ip_scanners:
-            for ip in scanner.scan_ips(subnet, timeout=self.timeout):
-                seed_ips.add(ip)
-        for ip in seed_ips:
-            hosts_by_ip.setdefault(ip, Host(ip=ip))
-
-        # 3) Enrichment (MAC, hostname via mDNS/NetBIOS/RDNS)
-        nbts = run_nbtscan_range(subnet, timeout=self.timeout) if self.enable_nbtscan else {}
-        for ip, host in list(hosts_by_ip.items()):
-            neigh = probe_ip_neigh_one(ip)
+    def discover(self, subnet: str) -> HostTable:
+        """
+        Final result: the run's working table itself, packed once enrichment
+        is done (iterates in numeric IP order, one Host view at a time).
+        """
+        table = HostTable()
+        for _ in self._discover_iter(subnet, table, updates=False):
+            pass
+        return table.freeze()
+
+    def discover_iter(self, subnet: str, *, updates: bool = True) -> Iterator[Host]:
+        """
+        Stream discovery results. With `updates=True` a copy of a host is
+        yielded as soon as it is first seen and again whenever a later step
+        adds information (last record per IP wins). With `updates=False`
+        every host is yielded exactly once, as soon as enrichment can no
+        longer change it: named hosts when the source that named them
+        finishes, the rest at the end.
+        """
+        return self._discover_iter(subnet, HostTable(), updates=updates)
+
+    def _discover_iter(self, subnet: str, hosts_by_ip: HostTable, *, updates: bool) -> Iterator[Host]:
+        emitted: Dict[str, Tuple[Optional[str], str, str]] = {}
+        settled: Set[str] = set()
+        self._until = None if self.deadline is None else time.monotonic() + self.deadline
+        plan = self.last_plan = self._plan(subnet)
+        self._steps = StepLog() if plan is not None else None
+
+        def fresh(hosts: Iterable[Host]) -> Iterator[Host]:
+            for h in hosts:
+                state = (h.hostname, h.mac, h.vendor)
+                if emitted.get(h.ip) != state:
+                    emitted[h.ip] = state
+                    yield replace(h)
+
+        def final(hosts: Iterable[Host]) -> Iterator[Host]:
+            # sources only query hosts still without a name, so a named one is done
+            for h in hosts:
+                if h.hostname and h.ip not in settled:
+                    settled.add(h.ip)
+                    yield h
+
+        # 1+2) Host-yielding scanners (arp-scan, ARP seed) and IP-only
+        # scanners (nmap ping, fping sweep), run concurrently
+        with stats.timed("stage", name="scan") as ev:
+            for touched in self._scan_iter(subnet, hosts_by_ip, self._planned_scanners(plan)):
+                if updates:
+                    yield from fresh(touched)
+            ev["hosts"] = len(hosts_by_ip)
+
+        # 3) Enrichment: MAC from one neighbour snapshot, then hostnames via
+        # mDNS/NetBIOS/RDNS in a bounded, deadline-capped stage
+        with stats.timed("stage", name="neigh") as ev:
+            ev["hosts"] = self._apply_neigh(hosts_by_ip.values())
+        cached_names, cached_vendors = self._apply_inventory(hosts_by_ip.values())
+        if updates:
+            yield from fresh(hosts_by_ip.values())
+        elif self.enrichment.vendor_db is None:
+            yield from final(hosts_by_ip.values())
+        else:
+            # the OUI lookup may still fill a vendor; named hosts without a MAC or with a vendor are done
+            yield from final(h for h in hosts_by_ip.values() if not h.mac or h.vendor)
+        remaining = None if self._until is None else max(0.0, self._until - time.monotonic())
+        first_batch_seen = False
+        with stats.timed("stage", name="enrich", hosts=len(hosts_by_ip)):
+            for touched in self.enrichment.run_iter(hosts_by_ip.values(), order=None if plan is None else plan.resolvers,
+                                                    deadline=remaining):
+                if updates:
+                    yield from fresh(touched)
+                else:
+                    # the OUI pass runs before the first batch, so every named host is done by then
+                    yield from final(touched if first_batch_seen else hosts_by_ip.values())
+                    first_batch_seen = True
+        if plan is not None:
+            self._record_plan(subnet, plan)
+
+        sources = dict(self.enrichment.sources)
+        sources.update((ip, "cache") for ip in cached_names)
+        self.last_sources, self.last_cached_vendors = sources, cached_vendors
+        if self.inventory is not None and self.record_inventory:
+            self.last_diff = self.inventory.diff(hosts_by_ip.values())
+            self.inventory.record(hosts_by_ip.values(), sources, cached_vendors)
+
+        if not updates:
+            yield from (h for h in hosts_by_ip.values() if h.ip not in settled)
+
+    def _plan(self, subnet: str) -> Optional[Plan]:
+        if self.planner is None:
+            return None
+        scanners = self.host_scanners + self.ip_scanners
+        return self.planner.plan(
+            subnet,
+            [type(s).__name__ for s in scanners],
+            self.enrichment.enabled_sources(),
+            required={type(s).__name__ for s in scanners if getattr(s, "passive", False)},
+            sequential=self.max_parallel == 1 or self.targeted,
+        )
+
+    def _planned_scanners(self, plan: Optional[Plan]) -> Optional[List[Tuple[bool, object]]]:
+        """The plan's scanners in its order, host scanners first; None = all, as configured."""
+        if plan is None:
+            return None
+        rank = {name: i for i, name in enumerate(plan.scanners)}
+        host = sorted((s for s in self.host_scanners if type(s).__name__ in rank), key=lambda s: rank[type(s).__name__])
+        ip = sorted((s for s in self.ip_scanners if type(s).__name__ in rank), key=lambda s: rank[type(s).__name__])
+        return [(True, s) for s in host] + [(False, s) for s in ip]
+
+    def _record_plan(self, subnet: str, plan: Plan) -> None:
+        passive = {type(s).__name__ for s in self.host_scanners + self.ip_scanners if getattr(s, "passive", False)}
+        observations = self._steps.observations([name for name in plan.scanners if name not in passive])
+        names: Dict[str, int] = {}
+        for source in self.enrichment.sources.values():
+            names[source] = names.get(source, 0) + 1
+        for source, duration in self.enrichment.timings.items():
+            observations[source] = (duration, names.get(source, 0))
+        self._steps = None
+        self.planner.record(subnet, plan, observations)
+
+    def scan(self, subnet: str) -> HostTable:
+        """Run the scanners only (no enrichment, no planning); returns the merged, live hosts."""
+        self._until = None if self.deadline is None else time.monotonic() + self.deadline
+        self._steps = None
+        hosts_by_ip = HostTable()
+        for _ in self._scan_iter(subnet, hosts_by_ip):
+            pass
+        return hosts_by_ip
+
+    def enrich(self, hosts: Iterable[Host], neigh_table: Optional[NeighTable] = None) -> None:
+        """Enrich just `hosts` in place (neighbour MAC, inventory cache, name resolution)."""
+        hosts = list(hosts)
+        self._apply_neigh(hosts, neigh_table)
+        self._apply_inventory(hosts)
+        self.enrichment.run(hosts)
+
+    @staticmethod
+    def _apply_neigh(hosts: Iterable[Host], neigh_table: Optional[NeighTable] = None) -> int:
+        """
+        Fill missing MACs from the neighbour table; hosts whose scanner
+        already reported a MAC (arp-scan, nmap) are left alone, and the
+        table is not even read when no host needs it. Returns the number
+        of hosts looked up.
+        """
+        missing = [h for h in hosts if not h.mac]
+        if not missing:
+            return 0
+        if neigh_table is None:
+            neigh_table = read_neigh_table()
+        for host in missing:
+            neigh = probe_ip_neigh_one(host.ip, neigh_table)
             if neigh.get("mac"):
                 host.mac = neigh["mac"]
+        return len(missing)
 
-            if self.enable_mdns and not host.hostname:
-                name = resolve_mdns(ip, timeout=self.timeout)
+    def _apply_inventory(self, hosts: Iterable[Host]) -> Tuple[Set[str], Set[str]]:
+        """Fresh inventory entries short-circuit mDNS/NetBIOS/RDNS for known hosts."""
+        cached_names: Set[str] = set()
+        cached_vendors: Set[str] = set()
+        if self.inventory is None:
+            return cached_names, cached_vendors
+        with stats.timed("stage", name="inventory") as ev:
+            for host in hosts:
+                name, vendor = self.inventory.apply_cached(host)
                 if name:
-                    host.hostname = name
+                    cached_names.add(host.ip)
+                if vendor:
+                    cached_vendors.add(host.ip)
+            ev["hosts"] = len(cached_names | cached_vendors)
+        return cached_names, cached_vendors
+
+    def _scan_iter(
+        self, subnet: str, hosts_by_ip: HostTable, scanners: Optional[List[Tuple[bool, object]]] = None,
+    ) -> Iterator[List[Host]]:
+        """
+        Run the scanners and merge their results into `hosts_by_ip`,
+        yielding the hosts each merge touched.
+
+        By default every scanner sweeps the whole subnet concurrently. In
+        targeted mode, the first active scanner that accepts target lists
+        (`supports_targets`) sweeps along with the passive and untargetable
+        ones; every later targetable scanner then runs on its own, in order,
+        and probes only addresses not confirmed alive yet. With
+        `retry_timeout` set, a final pass re-probes the remaining addresses
+        with that (longer) timeout and per-probe waits stretched in the same
+        ratio. `scanners` replaces the configured (is_host, scanner) list
+        for this run.
+        """
+        if scanners is None:
+            scanners = [(True, s) for s in self.host_scanners] + [(False, s) for s in self.ip_scanners]
+        targetable = [j for j in scanners if getattr(j[1], "supports_targets", False)
+                      and not getattr(j[1], "passive", False)]
+        followups = targetable[1:] if self.targeted else []
+        yield from self._sweep_iter(subnet, [j for j in scanners if j not in followups], hosts_by_ip)
+        for is_host, scanner in followups:
+            yield from self._probe_unknown(is_host, scanner, subnet, hosts_by_ip, self.timeout)
+        if self.retry_timeout:
+            # wait longer for each reply too, not only for the whole tool run
+            patience = max(1.0, self.retry_timeout / self.timeout) if self.timeout else 1.0
+            for is_host, scanner in targetable:
+                yield from self._probe_unknown(is_host, scanner, subnet, hosts_by_ip, self.retry_timeout, patience)
+
+    def _sweep_iter(
+        self, subnet: str, scanners: List[Tuple[bool, object]], hosts_by_ip: HostTable,
+    ) -> Iterator[List[Host]]:
+        """
+        Launch all scanners on a thread pool and merge their results into
+        `hosts_by_ip` as they arrive, yielding the hosts each merge touched.
+        Results are merged in scanner order: the oldest unfinished scanner
+        streams (hosts merged while its tool is still running), later ones
+        are buffered until their predecessors are done, so `Host.merge_from`
+        sees the same sequence regardless of which tool returns first.
+
+        Subnets larger than `shard_prefix` are split into shards: passive
+        scanners run once for the whole subnet (merged first), active ones
+        per shard under the global `pps` budget, and every shard is merged
+        as soon as its own scanners are done.
+        """
+        if not scanners:
+            return
+        shards = shard_subnet(subnet, self.shard_prefix)
+        if len(shards) == 1:
+            groups = [(subnet, scanners, False)]
+        else:
+            passive = [j for j in scanners if getattr(j[1], "passive", False)]
+            active = [j for j in scanners if not getattr(j[1], "passive", False)]
+            groups = [(subnet, passive, False)] + [(shard, active, True) for shard in shards]
+
+        # job = (group index, is_host, scanner, target subnet, filter to target)
+        jobs = [(g, is_host, scanner, target, filtered)
+                for g, (target, members, filtered) in enumerate(groups)
+                for is_host, scanner in members]
+        per_group = [sum(1 for j in jobs if j[0] == g) for g in range(len(groups))]
+        budget = RateBudget(self.pps)
+
+        width = self.max_parallel or len(scanners)
+        workers = max(1, min(width * (self.max_shards if len(groups) > 1 else 1), len(jobs)))
+        rate = self._rate_share(min(workers, sum(1 for j in jobs if not getattr(j[2], "passive", False))))
+        # workers report (job index, item) as scanners produce them and
+        # (job index, None) when a scanner is done
+        found: "queue.Queue[Tuple[int, object]]" = queue.Queue()
+        buffered: Dict[int, list] = {idx: [] for idx in range(len(jobs))}
+        finished: Set[int] = set()
+        next_idx = [sum(per_group[:g]) for g in range(len(groups))]
+        group_end = [next_idx[g] + per_group[g] for g in range(len(groups))]
+
+        def job(idx: int, is_host: bool, scanner, target: str) -> None:
+            try:
+                self._run_one(is_host, scanner, target, budget, rate=rate,
+                              on_found=lambda item: found.put((idx, item)))
+            finally:
+                found.put((idx, None))
 
-            if not host.hostname and ip in nbts:
-                host.hostname = nbts[ip]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures: List[Future] = [
+                pool.submit(job, idx, is_host, scanner, target)
+                for idx, (_g, is_host, scanner, target, _f) in enumerate(jobs)
+            ]
+            while len(finished) < len(jobs):
+                idx, item = found.get()
+                while True:
+                    if item is None:
+                        finished.add(idx)
+                        futures[idx].result()  # re-raise a scanner failure here
+                    else:
+                        buffered[idx].append(item)
+                    try:
+                        idx, item = found.get_nowait()
+                    except queue.Empty:
+                        break
+                for g in range(len(groups)):
+                    # shards are merged only after the whole-subnet group
+                    if g > 0 and next_idx[0] < group_end[0]:
+                        break
+                    # the oldest unfinished job of a group streams; later ones wait their turn
+                    while next_idx[g] < group_end[g]:
+                        head = next_idx[g]
+                        if buffered[head]:
+                            yield self._merge_found(jobs[head], buffered[head], hosts_by_ip)
+                            buffered[head] = []
+                        if head not in finished:
+                            break
+                        del buffered[head]
+                        next_idx[g] += 1
 
-            if self.enable_rdns and not host.hostname:
-                rd = reverse_dns(ip)
-                if rd:
-                    host.hostname = rd
+    def _merge_found(self, job: tuple, items: list, hosts_by_ip: HostTable) -> List[Host]:
+        _g, is_host, _s, target, filtered = job
+        net = ipaddress.ip_network(target, strict=False) if filtered else None
+        touched: List[Host] = []
+        for item in items:
+            if not is_host:
+                item = Host(ip=item)
+            if net is not None and not _in_network(item.ip, net):
+                continue
+            merged = self._merged(hosts_by_ip.get(item.ip), item)
+            hosts_by_ip[item.ip] = merged
+            touched.append(merged)
+        return touched
 
-        # 4) Sort by numeric IP
-        return sorted(hosts_by_ip.values(), key=lambda h: tuple(map(int, h.ip.split("."))))
+    def _probe_unknown(
+        self, is_host: bool, scanner, subnet: str, hosts_by_ip: HostTable, timeout: int, patience: float = 1.0,
+    ) -> Iterator[List[Host]]:
+        """Let `scanner` probe only the addresses of `subnet` not in `hosts_by_ip`, shard by shard."""
+        jobs = []
+        for shard in shard_subnet(subnet, self.shard_prefix):
+            net = ipaddress.ip_network(shard, strict=False)
+            targets = [ip for ip in map(str, _addresses(net)) if ip not in hosts_by_ip]
+            if targets:
+                jobs.append((shard, net, targets))
+        if not jobs:
+            return
+        budget = RateBudget(self.pps)
+        width = min(self.max_shards, len(jobs))
+        rate = self._rate_share(width)
+        with ThreadPoolExecutor(max_workers=width) as pool:
+            futures = [pool.submit(self._run_one, is_host, scanner, shard, budget, targets, timeout,
+                                   rate=rate, patience=patience)
+                       for shard, _net, targets in jobs]
+            # merged in shard order, as each shard's predecessors finish
+            for fut, (_shard, net, targets) in zip(futures, jobs):
+                wanted = set(targets)
+                touched: List[Host] = []
+                for item in fut.result():
+                    if not is_host:
+                        item = Host(ip=item)
+                    if item.ip not in wanted:
+                        continue
+                    merged = self._merged(hosts_by_ip.get(item.ip), item)
+                    hosts_by_ip[item.ip] = merged
+                    touched.append(merged)
+                yield touched
+
+    def _run_one(
+        self, is_host: bool, scanner, subnet: str, budget: Optional[RateBudget] = None,
+        targets: Optional[List[str]] = None, timeout: Optional[int] = None, on_found=None,
+        rate: Optional[float] = None, patience: float = 1.0,
+    ) -> list:
+        """
+        Run one scanner and return what it found. With `on_found`, results
+        are passed to it one by one as the scanner produces them instead
+        (scanners with `iter_hosts`/`iter_ips` report while still running).
+        `rate` is this job's share of the probe budget: scanners that pace
+        themselves get it, the others draw their probes from `budget`.
+        `patience` (> 1 on the retry pass) stretches per-probe timeouts.
+        """
+        kwargs = dict(timeout=self.timeout if timeout is None else timeout)
+        if patience > 1 and getattr(scanner, "supports_patience", False):
+            kwargs["patience"] = patience
+        if not getattr(scanner, "passive", False):
+            if rate is not None and getattr(scanner, "supports_rate", False):
+                kwargs["rate"] = rate
+            elif budget is not None:
+                budget.acquire(host_count(subnet) if targets is None else len(targets))
+        if self._until is not None:
+            kwargs["timeout"] = max(1, min(kwargs["timeout"], math.ceil(self._until - time.monotonic())))
+        if targets is not None:
+            kwargs["targets"] = targets
+        steps = self._steps
+        reported: List[str] = []
+        started = time.monotonic()
+        with stats.timed("scanner", name=type(scanner).__name__, subnet=subnet) as ev:
+            if is_host:
+                produce = getattr(scanner, "iter_hosts", scanner.scan_hosts)
+                results = produce(subnet, interface=self.interface, **kwargs)
+            else:
+                produce = getattr(scanner, "iter_ips", scanner.scan_ips)
+                results = produce(subnet, **kwargs)
+            found = []
+            count = 0
+            for item in results:
+                count += 1
+                if steps is not None:
+                    reported.append(item.ip if is_host else item)
+                if on_found is None:
+                    found.append(item)
+                else:
+                    on_found(item)
+            ev["hosts"] = count
+            if targets is not None:
+                ev["targets"] = len(targets)
+        if steps is not None:
+            steps.add(type(scanner).__name__, started, time.monotonic(), reported)
+        return found
+
+    def _rate_share(self, concurrent: int) -> Optional[float]:
+        """Packets per second for each of `concurrent` active jobs under the --pps budget."""
+        return None if not self.pps else self.pps / max(1, concurrent)
 
     @staticmethod
     def _merged(a: Optional[Host], b: Host) -> Host:
@@ -73,3 +486,129 @@ class DiscoveryPipeline:
             return b
         a.merge_from(b)
         return a
+
+class ScanTarget(NamedTuple):
+    """One network of a multi-network run and the interface its scanners are bound to."""
+    interface: Optional[str]
+    subnet: str
+
+class MultiNetworkDiscovery:
+    """
+    One run over several (interface, subnet) targets, each with its own
+    DiscoveryPipeline. Targets run concurrently, at most `per_interface`
+    at a time on the same interface, and their results are merged into
+    one host set. A host belongs to the target whose subnet contains it;
+    addresses outside every target (ARP-cache entries of other networks)
+    are merged across targets and reported last, under the first target
+    in order that saw them. With more than one target, every host is
+    tagged with its target's interface and subnet. The shared inventory,
+    if any, records the merged run once.
+    """
+
+    def __init__(
+        self,
+        pipelines: Sequence[Tuple[ScanTarget, DiscoveryPipeline]],
+        *,
+        per_interface: int = 1,
+        inventory: Optional[InventoryStore] = None,
+    ):
+        self.pipelines = list(pipelines)
+        self.per_interface = max(1, per_interface)
+        self.inventory = inventory
+        self.last_diff: Optional[InventoryDiff] = None
+        self.last_sources: Dict[str, str] = {}
+        for _target, pipeline in self.pipelines:
+            pipeline.record_inventory = False
+        self._networks = [(ipaddress.ip_network(t.subnet, strict=False), i) for i, (t, _p) in enumerate(self.pipelines)]
+
+    @property
+    def skipped(self) -> int:
+        """Lookups skipped at the enrichment deadline, over all targets."""
+        return sum(p.enrichment.skipped for _t, p in self.pipelines)
+
+    def discover(self) -> HostTable:
+        """Same contract as `DiscoveryPipeline.discover`, over all targets."""
+        merged = HostTable()
+        for _ in self._discover_iter(merged, updates=False):
+            pass
+        return merged.freeze()
+
+    def discover_iter(self, *, updates: bool = True) -> Iterator[Host]:
+        """Same contract as `DiscoveryPipeline.discover_iter`, over all targets."""
+        return self._discover_iter(HostTable(), updates=updates)
+
+    def _discover_iter(self, merged: HostTable, *, updates: bool) -> Iterator[Host]:
+        found: "queue.Queue[Tuple[int, Optional[Host]]]" = queue.Queue()
+        limits = {t.interface: threading.Semaphore(self.per_interface) for t, _p in self.pipelines}
+
+        def run(i: int, target: ScanTarget, pipeline: DiscoveryPipeline) -> None:
+            try:
+                with limits[target.interface]:
+                    for host in pipeline.discover_iter(target.subnet, updates=updates):
+                        found.put((i, host))
+            finally:
+                found.put((i, None))
+
+        tag = len(self.pipelines) > 1
+        # hosts outside every target, latest copy per reporting target
+        strays: Dict[str, Dict[int, Host]] = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(self.pipelines))) as pool:
+            futures = [pool.submit(run, i, t, p) for i, (t, p) in enumerate(self.pipelines)]
+            remaining = len(futures)
+            while remaining:
+                i, host = found.get()
+                if host is None:
+                    remaining -= 1
+                    futures[i].result()  # re-raise a failed target here
+                    continue
+                owner = self._owner(host.ip)
+                if owner is None:
+                    strays.setdefault(host.ip, {})[i] = host
+                elif owner == i:  # other targets only saw it in the ARP cache
+                    merged[host.ip] = self._tagged(host, i, tag)
+                    yield host
+        # strays go to the first target that reported them, merged in target order
+        for ip, copies in strays.items():
+            order = sorted(copies)
+            host = copies[order[0]]
+            for i in order[1:]:
+                host.merge_from(copies[i])
+            merged[ip] = self._tagged(host, order[0], tag)
+            yield host
+
+        sources: Dict[str, str] = {}
+        cached_vendors: Set[str] = set()
+        for _t, pipeline in self.pipelines:
+            sources.update(pipeline.last_sources)
+            cached_vendors |= pipeline.last_cached_vendors
+        self.last_sources = sources
+        if self.inventory is not None:
+            self.last_diff = self.inventory.diff(merged.values())
+            self.inventory.record(merged.values(), sources, cached_vendors)
+
+    def _owner(self, ip: str) -> Optional[int]:
+        """Index of the target whose subnet contains `ip`, None when there is none."""
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        for net, i in self._networks:
+            if addr in net:
+                return i
+        return None
+
+    def _tagged(self, host: Host, i: int, tag: bool) -> Host:
+        if tag:
+            host.interface = self.pipelines[i][0].interface or ""
+            host.subnet = str(self._networks[i][0])
+        return host
+
+def _addresses(net):
+    # probe-able addresses: hosts() skips network/broadcast, but keeps a /31 or /32
+    return net.hosts() if net.num_addresses > 2 else iter(net)
+
+def _in_network(ip: str, net) -> bool:
+    try:
+        return ipaddress.ip_address(ip) in net
+    except ValueError:
+        return False
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Ansible dynamic inventory over the snapshot a `localnet --snapshot` run
+writes. It only reads that file (and imports nothing of the scanner), so
+`ansible -i` gets its answer in milliseconds; with a max age, a stale or
+missing snapshot starts a background rescan and the current one is served
+meanwhile. Ansible passes only --list/--host, so the other settings can
+come from LOCALNET_SNAPSHOT, LOCALNET_MAX_AGE and LOCALNET_RESCAN.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import shlex
+import sys
+import time
+from typing import List, Optional
+
+from snapshot import Snapshot, ansible_inventory, default_snapshot_path, read_snapshot, start_rescan
+
+def default_rescan_command() -> List[str]:
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"), "--auto"]
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="localnet ansible-inventory",
+        description="Ansible dynamic inventory served from a localnet scan snapshot.",
+    )
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--list", action="store_true", help="Print every host and group (Ansible inventory JSON)")
+    mode.add_argument("--host", help="Print the variables of one host")
+    parser.add_argument("--snapshot", default=os.environ.get("LOCALNET_SNAPSHOT") or default_snapshot_path(),
+                        metavar="PATH", help="Snapshot to serve (env LOCALNET_SNAPSHOT; default %(default)s)")
+    parser.add_argument("--max-age", type=float, default=os.environ.get("LOCALNET_MAX_AGE"), metavar="SECONDS",
+                        help="Start a background rescan when the snapshot is older (env LOCALNET_MAX_AGE); "
+                             "the inventory call does not wait for it")
+    parser.add_argument("--rescan", default=os.environ.get("LOCALNET_RESCAN"), metavar="COMMAND",
+                        help="Scan command for the rescan, --snapshot PATH is appended (env LOCALNET_RESCAN; "
+                             "default: this localnet with --auto), e.g. 'sudo -n localnet --auto --arp native'")
+    args = parser.parse_args(argv)
+
+    try:
+        snapshot: Optional[Snapshot] = read_snapshot(args.snapshot)
+    except FileNotFoundError:
+        snapshot = None
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Cannot read snapshot: {e}")
+    if args.max_age is not None and (snapshot is None or time.time() - snapshot.created > args.max_age):
+        command = shlex.split(args.rescan) if args.rescan else default_rescan_command()
+        try:
+            start_rescan(args.snapshot, command)
+        except OSError as e:
+            print(f"warning: cannot start a rescan: {e}", file=sys.stderr)
+    if snapshot is None:
+        if args.max_age is None:
+            raise SystemExit(f"No snapshot at {args.snapshot}; write one with `localnet --snapshot`.")
+        print(f"warning: no snapshot at {args.snapshot} yet, serving an empty inventory", file=sys.stderr)
+        snapshot = Snapshot(0, [])
+
+    inventory = ansible_inventory(snapshot)
+    # dumps, not dump: the C encoder and one write instead of one per token
+    sys.stdout.write(json.dumps(inventory if args.list else inventory["_meta"]["hostvars"].get(args.host, {})) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+In-memory link for the built-in ARP engine (scanners.arp.ArpSweepScanner):
+a synthetic `Segment` whose live hosts answer who-has requests after a
+fixed latency, with an optional fraction of requests lost. Used by the
+unit tests and by `bench.py --modes arp` instead of an AF_PACKET socket.
+"""
+from __future__ import annotations
+import heapq
+import random
+import socket
+import struct
+import time
+from typing import List, Tuple
+
+from benchmarks.fake_tools import Segment
+from scanners.arp import ARP_REPLY, ETH_P_ARP, ETH_P_IP
+
+_ARP = struct.Struct("!HHBBH6s4s6s4s")
+
+class SimulatedArpLink:
+    """ArpTransport over `segment`; the scanning host is the segment's first address."""
+
+    def __init__(self, segment: Segment, *, latency: float = 0.001, loss: float = 0.0, seed: int = 0):
+        self.segment = segment
+        self.latency = latency
+        self.loss = loss
+        self.mac = bytes.fromhex("0200000000fe")
+        self.ip = (segment.net.network_address + 1).packed
+        self.sent = 0
+        self.closed = False
+        self._rng = random.Random(seed)
+        self._due: List[Tuple[float, int, bytes]] = []
+
+    def send(self, frame: bytes) -> None:
+        self.sent += 1
+        if len(frame) < 14 + _ARP.size or frame[12:14] != b"\x08\x06":
+            return
+        _h, _p, _hl, _pl, op, _sha, spa, _tha, tpa = _ARP.unpack_from(frame, 14)
+        if op != 1 or not self.segment.is_live(socket.inet_ntoa(tpa)) or self._rng.random() < self.loss:
+            return
+        mac = bytes.fromhex("0200") + tpa
+        reply = self.mac + mac + struct.pack("!H", ETH_P_ARP) + \
+            _ARP.pack(1, ETH_P_IP, 6, 4, ARP_REPLY, mac, tpa, self.mac, spa)
+        heapq.heappush(self._due, (time.monotonic() + self.latency, self.sent, reply))
+
+    def recv(self, timeout: float) -> List[bytes]:
+        now = time.monotonic()
+        if not self._due or self._due[0][0] > now:
+            wake = now + timeout if not self._due else min(now + timeout, self._due[0][0])
+            if wake > now:
+                time.sleep(wake - now)
+            now = time.monotonic()
+        frames = []
+        while self._due and self._due[0][0] <= now:
+            frames.append(heapq.heappop(self._due)[2])
+        return frames
+
+    def close(self) -> None:
+        self.closed = True
+
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark on synthetic networks.
+
+Puts the fake tools from fake_tools.py first (and alone) on PATH, serves
+reverse DNS and mDNS for the synthetic segment from loopback responders,
+and runs every scenario in a fresh worker process so peak RSS is per
+scenario. Synthetic segments live in 127.64.0.0/10, so nothing the
+built-in resolvers send leaves the machine.
+
+    python3 benchmarks/bench.py                         # 256, 4096, 65536 hosts
+    python3 benchmarks/bench.py --sizes 256 --modes cli
+    python3 benchmarks/bench.py --save local            # write baselines/local.json
+    python3 benchmarks/bench.py --compare local         # exit 1 on regressions
+    python3 benchmarks/bench.py --modes arp             # built-in ARP engine, simulated link
+
+Reported per scenario: wall time, subprocesses spawned (by tool), peak
+RSS of the worker, hosts found and per-stage time as reported by the
+`stats` instrumentation events (scan, neighbour snapshot, enrichment,
+time inside each scanner summed over shards, and each name resolver).
+"""
+from __future__ import annotations
+import argparse
+import functools
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BASELINE_DIR = os.path.join(HERE, "baselines")
+
+# size -> synthetic segment (the address count is the network size)
+NETWORKS = {
+    256: "127.64.0.0/24",
+    4096: "127.64.0.0/20",
+    65536: "127.64.0.0/16",
+}
+METRICS = ("wall_s", "subprocesses", "peak_rss_kib")
+
+class NameResponder:
+    """Answers PTR questions for the synthetic segment, as a unicast DNS
+    server (NXDOMAIN for unnamed hosts) or as an mDNS responder (silent)."""
+
+    def __init__(self, segment, mdns: bool):
+        self.segment = segment
+        self.mdns = mdns
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self) -> None:
+        from dnsproto import CLASS_IN, RCODE_NXDOMAIN, TYPE_PTR, Record, build_response, parse_message, reverse_name_to_ip
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(9000)
+                q = parse_message(data)
+            except (OSError, ValueError):
+                continue
+            answers = []
+            for qname, qtype in q.questions:
+                ip = reverse_name_to_ip(qname)
+                name = self.segment.hostname(ip) if ip and qtype == TYPE_PTR else None
+                if name:
+                    answers.append(Record(qname, TYPE_PTR, CLASS_IN, 120,
+                                          name.split(".")[0] + ".local" if self.mdns else name))
+            if self.mdns:
+                if answers:
+                    q.questions = []
+                    self.sock.sendto(build_response(q, answers, flags=0x8400), addr)
+                continue
+            self.sock.sendto(build_response(q, answers, rcode=0 if answers else RCODE_NXDOMAIN), addr)
+
+def stage_times(summary: Dict) -> Dict[str, float]:
+    """Flatten a StatsCollector summary into {stage | scanner:X | resolver:X: seconds}."""
+    times = {name: row["duration"] for name, row in summary["stages"].items()}
+    times.update(("scanner:" + name, row["duration"]) for name, row in summary["scanners"].items())
+    times.update(("resolver:" + name, row["duration"]) for name, row in summary["resolvers"].items())
+    return times
+
+def run_worker(spec: Dict, result_path: str) -> None:
+    """Runs one scenario in this (fresh) process and writes its result as JSON."""
+    sys.path.insert(0, ROOT)
+    import cli
+    import enrichment
+    import stats
+    from benchmarks.fake_tools import IFACE, Segment
+    from mdns import MdnsResolver
+    from netbios import NetbiosResolver
+    from rdns import PtrResolver
+
+    segment = Segment.from_env()
+    if spec["mode"] == "arp":
+        run_arp_worker(spec, segment, result_path)
+        return
+    dns = NameResponder(segment, mdns=False)
+    mdns = NameResponder(segment, mdns=True)
+    # point the built-in resolvers at the loopback responders; NBSTAT goes to
+    # a closed port, so NetBIOS behaves like a segment without Windows hosts
+    enrichment.PtrResolver = functools.partial(PtrResolver, port=dns.port)
+    enrichment.MdnsResolver = functools.partial(MdnsResolver, group="127.0.0.1", port=mdns.port,
+                                                listen_multicast=False)
+    enrichment.NetbiosResolver = functools.partial(NetbiosResolver, port=9)
+
+    collector = stats.StatsCollector()
+    argv = ["--subnet", spec["net"], "--interface", IFACE, "--dns-server", "127.0.0.1",
+            "--lookup-timeout", str(spec["lookup_timeout"]), "--enrich-deadline", str(spec["enrich_deadline"])]
+    if spec["deep"]:
+        argv.append("--deep")
+    argv += spec["extra"]
+    start = time.perf_counter()
+    with stats.listening(collector):
+        if spec["mode"] == "cli":
+            cli.main(argv + ["--format", "json", "--output", os.devnull])
+            hosts = None
+        else:
+            args = cli.build_parser().parse_args(argv)
+            hosts = len(cli.pipeline_from_args(args, None).discover(spec["net"]))
+    wall = time.perf_counter() - start
+    with open(result_path, "w") as f:
+        json.dump(dict(wall_s=wall, hosts=hosts, stages=stage_times(collector.summary())), f)
+
+def run_arp_worker(spec: Dict, segment, result_path: str) -> None:
+    """The built-in ARP engine alone, against an in-memory link instead of a socket."""
+    from benchmarks.arp_link import SimulatedArpLink
+    from scanners.arp import ArpSweepScanner
+
+    links = []
+
+    def link(_interface, _subnet):
+        links.append(SimulatedArpLink(segment, loss=spec["arp_loss"]))
+        return links[-1]
+
+    scanner = ArpSweepScanner(rate=spec["arp_rate"], transport=link)
+    start = time.perf_counter()
+    hosts = len(scanner.scan_hosts(spec["net"], timeout=3600))
+    wall = time.perf_counter() - start
+    with open(result_path, "w") as f:
+        json.dump(dict(wall_s=wall, hosts=hosts, stages={"scanner:ArpSweepScanner": wall}), f)
+
+def run_scenario(size: int, mode: str, opts: argparse.Namespace, bindir: str) -> Dict:
+    net = NETWORKS[size]
+    with tempfile.TemporaryDirectory(prefix="localnet-bench-") as tmp:
+        log = os.path.join(tmp, "spawned.log")
+        result = os.path.join(tmp, "result.json")
+        open(log, "w").close()
+        env = dict(os.environ, PATH=bindir, BENCH_NET=net, BENCH_SILENT=str(opts.silent),
+                   BENCH_NAMED=str(opts.named), BENCH_LATENCY=str(opts.latency),
+                   BENCH_PER_HOST=str(opts.per_host), BENCH_LOG=log, PYTHONPATH=ROOT)
+        spec = dict(net=net, mode=mode, deep=opts.deep, lookup_timeout=opts.lookup_timeout,
+                    enrich_deadline=opts.enrich_deadline, extra=shlex.split(opts.cli_args),
+                    arp_rate=opts.arp_rate, arp_loss=opts.arp_loss)
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker", json.dumps(spec), result],
+                                env=env, cwd=ROOT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode != 0:
+            raise SystemExit(f"benchmark worker failed for {mode}/{size} (exit {proc.returncode})")
+        with open(result) as f:
+            data = json.load(f)
+        with open(log) as f:
+            spawned = Counter(line.strip() for line in f if line.strip())
+    return dict(
+        scenario=f"{mode}/{size}",
+        wall_s=round(data["wall_s"], 3),
+        hosts=data["hosts"],
+        subprocesses=sum(spawned.values()),
+        by_tool=dict(sorted(spawned.items())),
+        peak_rss_kib=usage.ru_maxrss,
+        stages={k: round(v, 3) for k, v in sorted(data["stages"].items())},
+    )
+
+def format_result(r: Dict) -> str:
+    hosts = "" if r["hosts"] is None else f"  hosts={r['hosts']}"
+    stages = "  ".join(f"{k}={v:.3f}s" for k, v in r["stages"].items())
+    tools = ", ".join(f"{k}={v}" for k, v in r["by_tool"].items())
+    return (f"{r['scenario']:<15} wall={r['wall_s']:.3f}s  rss={r['peak_rss_kib'] / 1024:.1f}MiB  "
+            f"subprocesses={r['subprocesses']} ({tools}){hosts}\n{'':<15} {stages}")
+
+def compare(results: List[Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Lines describing every metric that got worse than the baseline by more than `threshold`."""
+    regressions = []
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if not base:
+            continue
+        for metric in METRICS:
+            old, new = base.get(metric), r[metric]
+            if old and new > old * (1 + threshold):
+                regressions.append(f"{r['scenario']}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+def baseline_path(name: str) -> str:
+    return name if name.endswith(".json") else os.path.join(BASELINE_DIR, name + ".json")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the discovery pipeline on synthetic networks.")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--sizes", default="256,4096,65536", help="Comma-separated network sizes (256, 4096, 65536)")
+    parser.add_argument("--modes", default="pipeline,cli",
+                        help="pipeline = DiscoveryPipeline.discover, cli = the full command line, "
+                             "arp = the built-in ARP engine on a simulated link")
+    parser.add_argument("--silent", type=float, default=0.5, help="Fraction of addresses without a live host")
+    parser.add_argument("--named", type=float, default=0.5, help="Fraction of live hosts with a hostname")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds every fake tool waits before answering")
+    parser.add_argument("--per-host", type=float, default=0.0, help="Extra seconds per output line of a fake tool")
+    parser.add_argument("--deep", action="store_true", help="Benchmark --deep (adds the fping sweep)")
+    parser.add_argument("--cli-args", default="", metavar="ARGS",
+                        help='Extra localnet options for every scenario, e.g. --cli-args="--targeted --retry-timeout 5"')
+    parser.add_argument("--arp-rate", type=int, default=20000, help="Frames per second for --modes arp")
+    parser.add_argument("--arp-loss", type=float, default=0.02, help="Fraction of ARP requests lost in --modes arp")
+    parser.add_argument("--lookup-timeout", type=float, default=0.5)
+    parser.add_argument("--enrich-deadline", type=float, default=10.0)
+    parser.add_argument("--save", metavar="NAME", help="Store the results as baseline NAME (or a .json path)")
+    parser.add_argument("--compare", metavar="NAME", help="Compare with baseline NAME; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown/growth before flagging")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(json.loads(args.worker[0]), args.worker[1])
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in NETWORKS]
+    if unknown:
+        parser.error(f"unsupported size(s): {unknown}; choose from {sorted(NETWORKS)}")
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+
+    sys.path.insert(0, ROOT)
+    from benchmarks.fake_tools import install
+    results = []
+    with tempfile.TemporaryDirectory(prefix="localnet-fakebin-") as bindir:
+        install(bindir, ROOT)
+        for size in sizes:
+            for mode in modes:
+                r = run_scenario(size, mode, args, bindir)
+                results.append(r)
+                if not args.json:
+                    print(format_result(r), flush=True)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        payload = dict(
+            created=time.strftime("%Y-%m-%dT%H:%M:%S"),
+            python=sys.version.split()[0],
+            options=dict(silent=args.silent, named=args.named, latency=args.latency, per_host=args.per_host,
+                         deep=args.deep, cli_args=args.cli_args, lookup_timeout=args.lookup_timeout, enrich_deadline=args.enrich_deadline),
+            results={r["scenario"]: r for r in results},
+        )
+        with open(baseline_path(args.save), "w") as f:
+            json.dump(payload, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(baseline_path(args.compare)) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
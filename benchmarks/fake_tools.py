@@ -0,0 +1,233 @@
+"""
+Stand-ins for the external tools the scanners shell out to (arp-scan,
+nmap, fping, nbtscan, ip, avahi-resolve-address). Each one prints
+realistic output for a synthetic segment described by environment
+variables, so the pipeline can be benchmarked without a real network:
+
+    BENCH_NET      CIDR of the synthetic segment (default 127.64.0.0/24)
+    BENCH_SILENT   fraction of addresses with no live host (default 0.5)
+    BENCH_NAMED    fraction of live hosts that have a hostname (default 0.5)
+    BENCH_LATENCY  seconds every invocation sleeps before answering
+    BENCH_PER_HOST extra seconds per host printed (simulates probe time)
+    BENCH_LOG      file that gets one line per invocation (subprocess count)
+
+Which hosts are live, their MACs, vendors and names are a pure function
+of the address, so every tool (and the fake DNS/mDNS responders in
+bench.py) agrees on the same segment.
+"""
+from __future__ import annotations
+import ipaddress
+import os
+import sys
+import time
+from typing import Iterator, List, Optional
+
+IFACE = "bench0"
+DOMAIN = "bench.lan"
+VENDORS = ("Acme Networks", "Globex Corp.", "Initech Devices", "Umbrella Systems", "Hooli Hardware")
+TOOLS = ("arp-scan", "nmap", "fping", "nbtscan", "ip", "avahi-resolve-address")
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def _bucket(n: int, salt: int) -> float:
+    # cheap deterministic hash of the address into [0, 1)
+    return ((n * 2654435761 + salt * 40503) & 0xFFFFFFFF) / 2**32
+
+class Segment:
+    """The synthetic network: which addresses answer, with what MAC/vendor/name."""
+
+    def __init__(self, net: str, silent: float = 0.5, named: float = 0.5):
+        self.net = ipaddress.ip_network(net, strict=False)
+        self.silent = silent
+        self.named = named
+
+    @classmethod
+    def from_env(cls) -> "Segment":
+        return cls(
+            os.environ.get("BENCH_NET", "127.64.0.0/24"),
+            _env_float("BENCH_SILENT", 0.5),
+            _env_float("BENCH_NAMED", 0.5),
+        )
+
+    def gateway(self) -> str:
+        return str(self.net.network_address + 1)
+
+    def _live(self, n: int) -> bool:
+        net = self.net
+        first, last = int(net.network_address), int(net.broadcast_address)
+        if not first < n < last or n == first + 1:  # network, broadcast, the scanning host
+            return False
+        return _bucket(n, 1) >= self.silent
+
+    def is_live(self, ip: str) -> bool:
+        return self._live(int(ipaddress.ip_address(ip)))
+
+    def live_hosts(self, target: Optional[str] = None) -> Iterator[str]:
+        net = self.net
+        if target:
+            want = ipaddress.ip_network(target, strict=False)
+            if not want.overlaps(net):
+                return
+            if want.subnet_of(net):
+                net = want
+        for n in range(int(net.network_address), int(net.broadcast_address) + 1):
+            if self._live(n):
+                yield str(ipaddress.IPv4Address(n))
+
+    @staticmethod
+    def mac(ip: str) -> str:
+        return "02:00:" + ":".join(f"{b:02x}" for b in ipaddress.ip_address(ip).packed)
+
+    @staticmethod
+    def vendor(ip: str) -> str:
+        return VENDORS[int(ipaddress.ip_address(ip)) % len(VENDORS)]
+
+    def hostname(self, ip: str) -> Optional[str]:
+        n = int(ipaddress.ip_address(ip))
+        if not self.is_live(ip) or _bucket(n, 2) >= self.named:
+            return None
+        return f"host-{ip.replace('.', '-')}.{DOMAIN}"
+
+def _target(args: List[str]) -> Optional[str]:
+    for a in reversed(args):
+        if not a.startswith("-") and a[:1].isdigit():
+            return a
+    return None
+
+def _probed(seg: Segment, args: List[str], target: Optional[str]) -> Iterator[str]:
+    """Live hosts among the probed addresses: a target file (-iL/-f) if given, else `target`/the segment."""
+    for flag in ("-iL", "-f", "--file"):
+        if flag in args and args.index(flag) + 1 < len(args):
+            with open(args[args.index(flag) + 1]) as f:
+                return (ip for ip in (line.strip() for line in f) if ip and seg.is_live(ip))
+    return seg.live_hosts(target)
+
+def _emit(lines: Iterator[str]) -> int:
+    per_host = _env_float("BENCH_PER_HOST", 0.0)
+    n = 0
+    for line in lines:
+        if per_host:
+            time.sleep(per_host)
+        sys.stdout.write(line + "\n")
+        if per_host:
+            sys.stdout.flush()  # paced output arrives line by line, like a live sweep
+        n += 1
+    return n
+
+def arp_scan(seg: Segment, args: List[str]) -> int:
+    target = None if "--localnet" in args else _target(args)
+    print(f"Interface: {IFACE}, type: EN10MB, MAC: 02:00:00:00:00:01, IPv4: {seg.gateway()}")
+    print("Starting arp-scan 1.10.0 with 256 hosts (https://github.com/royhills/arp-scan)")
+    n = _emit(f"{ip}\t{seg.mac(ip)}\t{seg.vendor(ip)}" for ip in _probed(seg, args, target))
+    print()
+    print(f"{n} packets received by filter, 0 packets dropped by kernel")
+    print(f"Ending arp-scan 1.10.0: {seg.net.num_addresses} hosts scanned in 1.912 seconds. {n} responded")
+    return 0
+
+def nmap(seg: Segment, args: List[str]) -> int:
+    target = _target(args)
+    if "-oX" in args:
+        print('<?xml version="1.0" encoding="UTF-8"?>')
+        print(f'<nmaprun scanner="nmap" args="nmap {" ".join(args)}" version="7.94">')
+
+        def hosts() -> Iterator[str]:
+            for ip in _probed(seg, args, target):
+                yield (f'<host><status state="up" reason="arp-response" reason_ttl="0"/>\n'
+                       f'<address addr="{ip}" addrtype="ipv4"/>\n'
+                       f'<address addr="{seg.mac(ip).upper()}" addrtype="mac" vendor="{seg.vendor(ip)}"/>\n'
+                       f'<hostnames>\n</hostnames>\n</host>')
+
+        n = _emit(hosts())
+        print(f'<runstats><finished elapsed="2.05"/><hosts up="{n}"/></runstats>\n</nmaprun>')
+        return 0
+    print("Starting Nmap 7.94 ( https://nmap.org )")
+    n = _emit(f"Nmap scan report for {ip}\nHost is up (0.00042s latency).\n"
+              f"MAC Address: {seg.mac(ip).upper()} ({seg.vendor(ip)})" for ip in _probed(seg, args, target))
+    print(f"Nmap done: {n} hosts up scanned in 2.05 seconds")
+    return 0
+
+def fping(seg: Segment, args: List[str]) -> int:
+    target = _target(args)
+    n = _emit(_probed(seg, args, target))
+    return 0 if n and seg.silent == 0 else 1  # 1 = some targets unreachable
+
+def nbtscan(seg: Segment, args: List[str]) -> int:
+    target = _target(args)
+    print("Doing NBT name scan for addresses from " + (target or str(seg.net)))
+    print()
+    print("IP address       NetBIOS Name     Server    User             MAC address")
+    print("-" * 78)
+
+    def lines() -> Iterator[str]:
+        for ip in seg.live_hosts(target):
+            name = seg.hostname(ip)
+            if name:
+                nb = name.split(".")[0].upper()[:15]
+                yield f"{ip:<17}{nb:<17}<server>  <unknown>        {seg.mac(ip)}"
+
+    _emit(lines())
+    return 0
+
+def ip_cmd(seg: Segment, args: List[str]) -> int:
+    words = [a for a in args if not a.startswith("-")]
+    if words[:1] == ["neigh"] or words[:1] == ["neighbor"]:
+        _emit(f"{ip} dev {IFACE} lladdr {seg.mac(ip)} REACHABLE" for ip in seg.live_hosts())
+        return 0
+    if words[:1] in (["addr"], ["address"], ["a"]):
+        print(f"2: {IFACE}    inet {seg.gateway()}/{seg.net.prefixlen} brd {seg.net.broadcast_address} "
+              f"scope global {IFACE}\\       valid_lft forever preferred_lft forever")
+        return 0
+    return 0
+
+def avahi_resolve_address(seg: Segment, args: List[str]) -> int:
+    ip = _target(args)
+    name = seg.hostname(ip) if ip else None
+    if not name:
+        print(f"Failed to resolve address '{ip}': Timeout reached", file=sys.stderr)
+        return 1
+    print(f"{ip}\t{name.split('.')[0]}.local")
+    return 0
+
+HANDLERS = {
+    "arp-scan": arp_scan,
+    "nmap": nmap,
+    "fping": fping,
+    "nbtscan": nbtscan,
+    "ip": ip_cmd,
+    "avahi-resolve-address": avahi_resolve_address,
+}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv if argv is None else argv
+    tool = os.path.basename(argv[0])
+    log = os.environ.get("BENCH_LOG")
+    if log:
+        with open(log, "a") as f:
+            f.write(tool + "\n")
+    latency = _env_float("BENCH_LATENCY", 0.0)
+    if latency:
+        time.sleep(latency)
+    return HANDLERS[tool](Segment.from_env(), argv[1:])
+
+def install(bindir: str, repo_root: str) -> List[str]:
+    """Write one executable per tool into `bindir`, all dispatching to `main`."""
+    os.makedirs(bindir, exist_ok=True)
+    paths = []
+    for tool in TOOLS:
+        path = os.path.join(bindir, tool)
+        with open(path, "w") as f:
+            f.write(f"#!{sys.executable}\n"
+                    "import sys\n"
+                    f"sys.path.insert(0, {repo_root!r})\n"
+                    "from benchmarks.fake_tools import main\n"
+                    "sys.exit(main())\n")
+        os.chmod(path, 0o755)
+        paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,13 +2,34 @@
 from __future__ import annotations
 
 import argparse
+import ipaddress
+import os
+import signal
 import socket
-from typing import Optional
+import sys
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO
 
-from aggregate import DiscoveryPipeline
-from output import output_ansible, output_csv, output_json, output_table
-from scanners import ArpScanScanner, FpingSweepScanner, NmapPingScanner, SeedArpCacheScanner
+import ansible_inventory
+
+from aggregate import DiscoveryPipeline, MultiNetworkDiscovery, ScanTarget
+from distributed import DEFAULT_PORT, Agent, AgentSpec, Coordinator, listen_on, parse_address, read_secret
+from inventory import InventoryStore
+from models import Host
+from planner import AdaptivePlanner, ScanHistory
+from oui import SYSTEM_SOURCES, OuiDatabase, build_index, default_index_path
+from resolvers import NeighTable, read_neigh_table
+from snapshot import default_snapshot_path, write_snapshot
+from output import (
+    output_ansible, output_csv, output_diff, output_json, output_table, write_csv, write_json, write_ndjson,
+)
+from scanners import (
+    ArpScanScanner, ArpSweepScanner, FpingSweepScanner, IcmpEchoScanner, NmapPingScanner, PassiveListenerScanner, SeedArpCacheScanner,
+    TcpConnectScanner,
+)
+from stats import StatsCollector, add_listener, remove_listener
 from utils import which, run
+from watch import StreamSink, UnixSocketSink, Watcher
 
 def detect_subnet(auto: bool, provided: Optional[str]) -> str:
     if provided:
@@ -30,59 +51,561 @@ def detect_subnet(auto: bool, provided: Optional[str]) -> str:
         pass
     raise SystemExit("Could not auto-detect subnet. Provide --subnet like 192.168.0.0/24.")
 
-def build_pipeline(interface: Optional[str], timeout: int, deep: bool, no_arpscan: bool) -> DiscoveryPipeline:
-    host_scanners = [SeedArpCacheScanner()]
-    if not no_arpscan:
-        host_scanners.append(ArpScanScanner())
+def local_networks() -> List[ScanTarget]:
+    """Every global IPv4 network of this host with its interface, from `ip -4 -o addr`."""
+    if not which("ip"):
+        return []
+    rc, out, _ = run(["ip", "-4", "-o", "addr", "show", "scope", "global"])
+    if rc != 0:
+        return []
+    networks: List[ScanTarget] = []
+    for line in out.splitlines():
+        tokens = line.split()
+        if len(tokens) < 4 or tokens[2] != "inet":
+            continue
+        try:
+            net = ipaddress.ip_network(tokens[3], strict=False)
+        except ValueError:
+            continue
+        target = ScanTarget(tokens[1].split("@")[0], str(net))
+        if target not in networks:
+            networks.append(target)
+    return networks
+
+def detect_targets(auto: bool, subnets: Optional[List[str]], interface: Optional[str] = None) -> List[ScanTarget]:
+    """
+    Networks to scan. Given subnets keep their order and are bound to
+    `interface`, or else to the local interface whose network overlaps
+    them; --auto takes every local network (only those of `interface`
+    when given), falling back to `detect_subnet`.
+    """
+    if subnets:
+        local = [] if interface else local_networks()
+        targets = []
+        for subnet in subnets:
+            try:
+                net = ipaddress.ip_network(subnet, strict=False)
+            except ValueError:
+                raise SystemExit(f"Invalid subnet {subnet!r}; use CIDR notation like 192.168.0.0/24.")
+            iface = interface or next(
+                (t.interface for t in local if ipaddress.ip_network(t.subnet).overlaps(net)), None)
+            targets.append(ScanTarget(iface, subnet))
+        return targets
+    if auto:
+        targets = [t for t in local_networks() if not interface or t.interface == interface]
+        if targets:
+            return targets
+    return [ScanTarget(interface, detect_subnet(auto, None))]
+
+def parse_ports(value: str) -> List[int]:
+    try:
+        ports = [int(p) for p in value.split(",") if p.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid port list: {value!r}")
+    if not ports or any(not 0 < p < 65536 for p in ports):
+        raise argparse.ArgumentTypeError(f"invalid port list: {value!r}")
+    return ports
+
+def parse_agent(value: str) -> AgentSpec:
+    address, _, subnets = value.partition("=")
+    try:
+        parse_address(address)
+        for subnet in subnets.split(",") if subnets else ():
+            ipaddress.ip_network(subnet, strict=False)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid agent {value!r}: {e}")
+    return AgentSpec(address, tuple(subnets.split(",")) if subnets else ())
+
+DEFAULT_LISTEN_WINDOW = 10.0
 
-    ip_scanners = [NmapPingScanner()]
-    if deep:
-        ip_scanners.append(FpingSweepScanner())
+def arp_sweeper(engine: str, no_arpscan: bool = False):
+    """arp-scan when asked for (or, with "auto", when installed), else the built-in AF_PACKET sweep."""
+    if engine == "native" or (engine == "auto" and not no_arpscan and not which("arp-scan")):
+        return ArpSweepScanner()
+    return None if no_arpscan else ArpScanScanner()
+
+def build_pipeline(
+    interface: Optional[str],
+    timeout: int,
+    deep: bool,
+    no_arpscan: bool,
+    max_parallel: Optional[int] = None,
+    lookup_timeout: float = 2.0,
+    enrich_deadline: float = 60.0,
+    dns_server: Optional[str] = None,
+    icmp_rate: Optional[int] = None,
+    tcp_ports: Optional[List[int]] = None,
+    inventory: Optional[InventoryStore] = None,
+    shard_prefix: Optional[int] = 24,
+    max_shards: int = 4,
+    pps: Optional[float] = None,
+    targeted: bool = False,
+    retry_timeout: Optional[int] = None,
+    vendor_db: Optional[OuiDatabase] = None,
+    listen: Optional[float] = None,
+    pcap: Optional[str] = None,
+    passive_only: bool = False,
+    seed_table: Optional[NeighTable] = None,
+    arp_engine: str = "auto",
+    planner: Optional[AdaptivePlanner] = None,
+    deadline: Optional[float] = None,
+) -> DiscoveryPipeline:
+    host_scanners = [SeedArpCacheScanner(seed_table)]
+    if listen or pcap or passive_only:
+        host_scanners.append(PassiveListenerScanner(window=listen or DEFAULT_LISTEN_WINDOW, pcap=pcap))
+    ip_scanners = []
+    if not passive_only:
+        sweeper = arp_sweeper(arp_engine, no_arpscan)
+        if sweeper is not None:
+            host_scanners.append(sweeper)
+        host_scanners.append(NmapPingScanner())
+        if deep:
+            ip_scanners.append(FpingSweepScanner(interface=interface))
+        if icmp_rate:
+            ip_scanners.append(IcmpEchoScanner(rate=icmp_rate, interface=interface))
+        if tcp_ports:
+            ip_scanners.append(TcpConnectScanner(tcp_ports))
 
     return DiscoveryPipeline(
         host_scanners=host_scanners,
         ip_scanners=ip_scanners,
         timeout=timeout,
         interface=interface,
-        enable_nbtscan=True,
-        enable_mdns=True,
-        enable_rdns=True,
+        # passive mode sends nothing, name lookups included
+        enable_nbtscan=not passive_only,
+        enable_mdns=not passive_only,
+        enable_rdns=not passive_only,
+        max_parallel=max_parallel,
+        lookup_timeout=lookup_timeout,
+        enrich_deadline=enrich_deadline,
+        dns_server=dns_server,
+        inventory=inventory,
+        shard_prefix=shard_prefix,
+        max_shards=max_shards,
+        pps=pps,
+        targeted=targeted,
+        retry_timeout=retry_timeout,
+        vendor_db=vendor_db,
+        planner=planner,
+        deadline=deadline,
     )
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Local network scanner using Strategy-pattern scanners (arp-scan/nmap/fping) and resolvers."
-    )
-    parser.add_argument("--subnet", "-s", help="CIDR to scan, e.g. 192.168.0.0/24")
-    parser.add_argument("--auto", action="store_true", help="Auto-detect primary IPv4 CIDR (uses `ip` output)")
-    parser.add_argument("--interface", "-i", help="Interface to use for arp-scan (optional)")
-    parser.add_argument("--format", "-f", choices=["table", "csv", "json", "ansible"], default="table", help="Output format")
-    parser.add_argument("--output", "-o", help="Output file (if omitted prints to stdout)")
+STREAM_WRITERS = {"ndjson": write_ndjson, "csv": write_csv, "json": write_json}
+
+def build_parser(watch: bool = False, agent: bool = False) -> argparse.ArgumentParser:
+    if watch:
+        prog, description = "localnet watch", "Continuously monitor a subnet and emit join/leave/change events as NDJSON."
+    elif agent:
+        prog, description = "localnet agent", ("Scan subnets on request of a `localnet coordinate` run and stream "
+                                               "the hosts back. The scan options apply to every request.")
+    else:
+        prog, description = None, "Local network scanner using Strategy-pattern scanners (arp-scan/nmap/fping) and resolvers."
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+    if watch:
+        parser.add_argument("--refresh-interval", type=float, default=10.0,
+                            help="Seconds between cheap neighbour-table refreshes")
+        parser.add_argument("--sweep-interval", type=float, default=300.0,
+                            help="Seconds between active scanner sweeps")
+        parser.add_argument("--leave-after", type=float, default=None,
+                            help="Seconds without sighting before a leave event (default: 2 sweeps + 1 refresh)")
+        parser.add_argument("--socket", help="Publish events on this Unix socket instead of stdout")
+    if agent:
+        parser.add_argument("--bind", default=f"127.0.0.1:{DEFAULT_PORT}", metavar="ADDR",
+                            help="HOST:PORT or Unix socket path to accept coordinators on (default %(default)s)")
+        parser.add_argument("--name", help="Agent name in the coordinator's results (default: hostname)")
+        parser.add_argument("--subnet", "-s", action="append",
+                            help="Network to offer to coordinators; repeatable (default: every global IPv4 network)")
+        parser.add_argument("--secret-file", metavar="PATH",
+                            help="Serve only coordinators that prove they know the secret in PATH "
+                                 "(required unless --bind is a loopback address or a Unix socket)")
+        parser.add_argument("--any-subnet", action="store_true",
+                            help="Also scan subnets outside the offered networks when a coordinator asks")
+    else:
+        parser.add_argument("--subnet", "-s", action="append",
+                            help="CIDR to scan, e.g. 192.168.0.0/24; repeat to scan several networks in one run")
+        parser.add_argument("--auto", action="store_true",
+                            help="Scan every global IPv4 network of this host, each on its own interface (uses `ip` output)")
+    parser.add_argument("--interface", "-i",
+                        help="Interface to scan from (default: the one on the subnet); with --auto, only its networks")
+    if not agent:
+        add_output_options(parser)
+    if not watch and not agent:
+        add_snapshot_options(parser)
     parser.add_argument("--timeout", type=int, default=30, help="Global timeout per external tool in seconds")
-    parser.add_argument("--no-arpscan", action="store_true", help="Do not try arp-scan even if available")
+    parser.add_argument("--no-arpscan", action="store_true", help="Do not try arp-scan even if available (no ARP sweep unless --arp native)")
+    parser.add_argument("--arp", dest="arp_engine", choices=["auto", "arp-scan", "native"], default="auto",
+                        help="ARP sweep: arp-scan, the built-in AF_PACKET engine (needs CAP_NET_RAW), or "
+                             "auto = arp-scan when installed, else built-in")
     parser.add_argument("--deep", action="store_true", help="Do a deeper discovery (fping sweep + full ARP cache seed)")
+    parser.add_argument("--max-parallel", type=int, default=None,
+                        help="Maximum number of scanners running at once (default: all; 1 = sequential)")
+    parser.add_argument("--lookup-timeout", type=float, default=2.0,
+                        help="Timeout per hostname lookup (mDNS/RDNS) in seconds")
+    parser.add_argument("--enrich-deadline", type=float, default=60.0,
+                        help="Overall time budget for hostname enrichment in seconds")
+    parser.add_argument("--dns-server", help="Nameserver for reverse DNS (default: first entry of /etc/resolv.conf)")
+    parser.add_argument("--icmp", dest="icmp_rate", nargs="?", type=int, const=2000, default=None, metavar="PPS",
+                        help="Add the built-in ICMP echo sweep (no subprocess), optionally at PPS packets/s (default 2000)")
+    parser.add_argument("--tcp-ports", type=parse_ports, nargs="?", const=[22, 80, 443, 445], default=None,
+                        metavar="PORTS", help="Add TCP-connect liveness probing on PORTS (default 22,80,443,445) "
+                                              "for networks that drop ICMP")
+    parser.add_argument("--cache", nargs="?", const="", default=None, metavar="PATH",
+                        help="Keep a host inventory (default: $XDG_CACHE_HOME/localnet/inventory.sqlite3) and "
+                             "reuse fresh hostnames/vendors instead of resolving them again")
+    parser.add_argument("--cache-ttl", type=float, default=3600, help="Seconds a cached hostname stays fresh")
+    parser.add_argument("--vendor-ttl", type=float, default=30 * 86400, help="Seconds a cached vendor stays fresh")
+    parser.add_argument("--forget-after", type=float, default=30 * 86400,
+                        help="Drop inventory entries not seen for this many seconds")
+    if not agent:
+        parser.add_argument("--diff", action="store_true",
+                            help="Report hosts that appeared, disappeared or changed since the last cached run "
+                                 "(implies --cache)")
+    parser.add_argument("--shard-prefix", type=int, default=24,
+                        help="Split larger subnets into shards of this prefix length (default 24)")
+    parser.add_argument("--max-shards", type=int, default=4, help="Shards scanned concurrently")
+    parser.add_argument("--per-interface", type=int, default=1, metavar="N",
+                        help="Networks scanned at the same time on one interface (interfaces run in parallel)")
+    parser.add_argument("--pps", type=float, default=None,
+                        help="Global probe budget in packets per second across all shards; each running "
+                             "shard's share is passed to nmap, arp-scan, fping and the native sweeps")
+    parser.add_argument("--targeted", action="store_true",
+                        help="Probe with nmap/fping/ICMP/TCP only the addresses arp-scan and the ARP cache "
+                             "have not already confirmed alive")
+    parser.add_argument("--retry-timeout", type=int, default=None, metavar="SECONDS",
+                        help="Re-probe addresses that did not answer once more with this longer timeout; "
+                             "per-probe reply timeouts grow in the same ratio")
+    parser.add_argument("--listen", nargs="?", type=float, const=DEFAULT_LISTEN_WINDOW, default=None, metavar="SECONDS",
+                        help="Also listen for ARP, mDNS and DHCP traffic for SECONDS (default %(const)s; needs "
+                             "CAP_NET_RAW); hostnames come from mDNS records and DHCP option 12")
+    parser.add_argument("--pcap", metavar="FILE", help="Read ARP/mDNS/DHCP traffic from a pcap file instead of listening")
+    parser.add_argument("--passive", action="store_true",
+                        help="Send nothing: only the ARP cache and the listener, no probes and no name lookups")
+    parser.add_argument("--plan", choices=["fixed", "auto"], default="fixed",
+                        help="auto: learn each step's time and unique yield per subnet (kept in the --cache "
+                             "inventory, implied) and skip or reorder scanners/name lookups that do not pay off")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                        help="Time budget per network: caps tool timeouts and name lookups; with --plan auto, "
+                             "also leaves out the steps expected not to fit")
+    parser.add_argument("--full-every", type=int, default=10, metavar="N",
+                        help="With --plan auto, run every step on every Nth run to refresh the statistics")
+    parser.add_argument("--oui", metavar="PATH",
+                        help="OUI vendor index used to fill vendors from MACs (default: "
+                             "$XDG_CACHE_HOME/localnet/oui.idx when present; build it with `localnet update-oui`)")
+    parser.add_argument("--no-oui", action="store_true", help="Do not look up vendors in the OUI index")
+    parser.add_argument("--stats", nargs="?", const="-", default=None, metavar="PATH",
+                        help="Write a JSON summary of subprocess, scanner, resolver and stage timings "
+                             "to stderr (or to PATH)")
     parser.add_argument("--version", action="version", version="localnet 1.1.0")
+    return parser
 
-    args = parser.parse_args()
-    subnet = detect_subnet(args.auto, args.subnet)
+def add_output_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--format", "-f", choices=["table", "csv", "json", "ndjson", "ansible"], default="table",
+                        help="Output format (ndjson always streams, one line per host update)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write each csv/json row once its name lookups finish instead of all rows sorted at the end")
+    parser.add_argument("--output", "-o", help="Output file (if omitted prints to stdout)")
+
+def add_snapshot_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--snapshot", nargs="?", const="", default=None, metavar="PATH",
+                        help="Also write the hosts to a snapshot for `localnet ansible-inventory` (default: "
+                             "$XDG_CACHE_HOME/localnet/snapshot.json), atomically")
+    parser.add_argument("--snapshot-keep", type=float, default=0.0, metavar="SECONDS",
+                        help="Keep hosts of the previous snapshot that this run missed for up to SECONDS")
+
+def collect(hosts: Iterable[Host], into: Dict[str, Host]) -> Iterator[Host]:
+    """Pass `hosts` through, keeping the last record per IP in `into`."""
+    for h in hosts:
+        into[h.ip] = h
+        yield h
+
+def save_snapshot(
+    args: argparse.Namespace, hosts: Iterable[Host], sources: Optional[Dict[str, str]],
+    networks: Sequence[ScanTarget] = (),
+) -> None:
+    if args.snapshot is None:
+        return
+    path = args.snapshot or default_snapshot_path()
+    try:
+        write_snapshot(path, hosts, sources=sources, networks=networks, keep=args.snapshot_keep)
+    except OSError as e:
+        raise SystemExit(f"Cannot write snapshot {path}: {e}")
+
+def secret_from_args(args: argparse.Namespace) -> Optional[bytes]:
+    if args.secret_file is None:
+        return None
+    try:
+        return read_secret(args.secret_file)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Cannot read the shared secret: {e}")
+
+def open_inventory(args: argparse.Namespace) -> Optional[InventoryStore]:
+    if args.cache is None and not getattr(args, "diff", False) and args.plan != "auto":
+        return None
+    return InventoryStore(
+        args.cache or None, hostname_ttl=args.cache_ttl, vendor_ttl=args.vendor_ttl,
+        forget_after=args.forget_after,
+    )
+
+def pipeline_from_args(
+    args: argparse.Namespace, inventory: Optional[InventoryStore], interface: Optional[str] = None,
+    seed_table: Optional[NeighTable] = None, vendor_db: Optional[OuiDatabase] = None,
+) -> DiscoveryPipeline:
+    return build_pipeline(
+        interface or args.interface, args.timeout, args.deep, args.no_arpscan, args.max_parallel,
+        args.lookup_timeout, args.enrich_deadline, args.dns_server, args.icmp_rate,
+        args.tcp_ports, inventory, args.shard_prefix, args.max_shards, args.pps,
+        args.targeted, args.retry_timeout, vendor_db or open_vendor_db(args), args.listen, args.pcap, args.passive,
+        seed_table, args.arp_engine, planner_from_args(args, inventory), args.deadline,
+    )
+
+def planner_from_args(args: argparse.Namespace, inventory: Optional[InventoryStore]) -> Optional[AdaptivePlanner]:
+    if args.plan != "auto" or inventory is None:
+        return None
+    return AdaptivePlanner(ScanHistory(inventory), deadline=args.deadline, full_every=args.full_every)
+
+def discovery_from_args(
+    args: argparse.Namespace, targets: List[ScanTarget], inventory: Optional[InventoryStore],
+) -> MultiNetworkDiscovery:
+    """One pipeline per target; several targets share one ARP-cache snapshot for their seeds."""
+    seed_table = read_neigh_table(include_local=False) if len(targets) > 1 else None
+    return MultiNetworkDiscovery(
+        [(t, pipeline_from_args(args, inventory, t.interface, seed_table)) for t in targets],
+        per_interface=args.per_interface, inventory=inventory,
+    )
 
-    pipeline = build_pipeline(args.interface, args.timeout, args.deep, args.no_arpscan)
-    hosts = pipeline.discover(subnet)
+def open_vendor_db(args: argparse.Namespace) -> Optional[OuiDatabase]:
+    if args.no_oui:
+        return None
+    db = OuiDatabase.open(args.oui)
+    if db is None and args.oui:
+        raise SystemExit(f"Cannot read OUI index {args.oui}; build it with `localnet update-oui`.")
+    return db
 
-    if args.format == "table":
+def start_stats(args: argparse.Namespace) -> Optional[StatsCollector]:
+    if args.stats is None:
+        return None
+    collector = StatsCollector()
+    add_listener(collector)
+    return collector
+
+def finish_stats(collector: Optional[StatsCollector], args: argparse.Namespace) -> None:
+    if collector is not None:
+        remove_listener(collector)
+        collector.write(args.stats)
+
+def write_output(fmt: str, hosts: Iterable[Host], out: TextIO) -> None:
+    if fmt == "table":
         content = output_table(hosts)
-    elif args.format == "csv":
+    elif fmt == "csv":
         content = output_csv(hosts)
-    elif args.format == "json":
+    elif fmt == "json":
         content = output_json(hosts)
+    elif fmt == "ndjson":
+        write_ndjson(hosts, out)
+        return
     else:
         content = output_ansible(hosts)
+    out.write(content + ("\n" if not content.endswith("\n") else ""))
 
-    if args.output:
-        with open(args.output, "w") as f:
-            f.write(content + ("\n" if not content.endswith("\n") else ""))
-    else:
-        print(content)
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "watch":
+        return watch_main(argv[1:])
+    if argv and argv[0] == "update-oui":
+        return update_oui_main(argv[1:])
+    if argv and argv[0] == "agent":
+        return agent_main(argv[1:])
+    if argv and argv[0] == "coordinate":
+        return coordinate_main(argv[1:])
+    if argv and argv[0] == "ansible-inventory":
+        return ansible_inventory.main(argv[1:])
+    args = build_parser().parse_args(argv)
+    targets = detect_targets(args.auto, args.subnet, args.interface)
+
+    collector = start_stats(args)
+    inventory = open_inventory(args)
+    discovery = discovery_from_args(args, targets, inventory)
+    out = open(args.output, "w") if args.output else sys.stdout
+    # streamed runs keep the last record per IP for the snapshot; otherwise
+    # the pipeline's own table is written and snapshotted, without copies
+    streamed: Dict[str, Host] = {}
+    found: Iterable[Host] = streamed.values()
+    try:
+        if args.diff:
+            found = discovery.discover()
+            content = output_diff(discovery.last_diff, args.format)
+            if content:
+                out.write(content + "\n")
+        elif args.format == "ndjson":
+            write_ndjson(collect(discovery.discover_iter(), streamed), out)
+        elif args.stream and args.format in STREAM_WRITERS:
+            STREAM_WRITERS[args.format](collect(discovery.discover_iter(updates=False), streamed), out)
+        else:
+            found = discovery.discover()
+            write_output(args.format, found, out)
+        save_snapshot(args, found, discovery.last_sources, targets)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if inventory is not None:
+            inventory.close()
+        finish_stats(collector, args)
+    if discovery.skipped:
+        print(f"warning: enrichment deadline reached, {discovery.skipped} lookup(s) skipped",
+              file=sys.stderr)
+
+def watch_main(argv: List[str]) -> None:
+    args = build_parser(watch=True).parse_args(argv)
+    if args.subnet and len(args.subnet) > 1:
+        raise SystemExit("watch monitors a single subnet; run one watcher per network.")
+    subnet = detect_subnet(args.auto, args.subnet[0] if args.subnet else None)
+    collector = start_stats(args)
+    inventory = open_inventory(args)
+    pipeline = pipeline_from_args(args, inventory)
+    sink = UnixSocketSink(args.socket) if args.socket else StreamSink(sys.stdout)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    watcher = Watcher(
+        pipeline, subnet, sink,
+        refresh_interval=args.refresh_interval,
+        sweep_interval=args.sweep_interval,
+        leave_after=args.leave_after,
+    )
+    try:
+        watcher.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.close()
+        if inventory is not None:
+            inventory.close()
+        finish_stats(collector, args)
+
+def agent_main(argv: List[str]) -> None:
+    args = build_parser(agent=True).parse_args(argv)
+    networks = detect_targets(True, args.subnet, args.interface)
+    secret = secret_from_args(args)
+    try:
+        family, addr = parse_address(args.bind)
+    except ValueError as e:
+        raise SystemExit(f"Cannot listen on {args.bind}: {e}")
+    if secret is None and family != socket.AF_UNIX and not _is_loopback(addr[0]):
+        raise SystemExit(f"Refusing to accept coordinators on {args.bind} without --secret-file: anyone who "
+                         "can reach it could run scans from this host.")
+    try:
+        server = listen_on(args.bind)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Cannot listen on {args.bind}: {e}")
+    collector = start_stats(args)
+    inventory = open_inventory(args)
+    vendor_db = open_vendor_db(args)
+    agent = Agent(
+        lambda target: pipeline_from_args(args, inventory, target.interface, vendor_db=vendor_db),
+        networks, name=args.name, per_interface=args.per_interface, secret=secret, any_subnet=args.any_subnet,
+    )
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"agent {agent.name} listening on {args.bind} for " + ", ".join(t.subnet for t in networks),
+          file=sys.stderr)
+    try:
+        agent.serve(server, stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if family == socket.AF_UNIX and os.path.exists(addr):
+            os.unlink(addr)
+        if inventory is not None:
+            inventory.close()
+        finish_stats(collector, args)
+
+def coordinate_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="localnet coordinate",
+        description="Scan many segments at once through `localnet agent` processes and merge their results.",
+    )
+    parser.add_argument("--agent", "-a", dest="agents", type=parse_agent, action="append", required=True,
+                        metavar="ADDR[=SUBNET,...]",
+                        help="Agent address (HOST:PORT or Unix socket path), optionally with the subnets it must "
+                             "scan; repeatable. Without subnets, the agent gets the --subnet networks it is on, "
+                             "or else every network it offers")
+    parser.add_argument("--subnet", "-s", action="append", default=[],
+                        help="Network to scan, handed to an agent on it; repeatable")
+    add_output_options(parser)
+    add_snapshot_options(parser)
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                        help="Stop waiting for agents after SECONDS; unfinished subnets are reported")
+    parser.add_argument("--idle-timeout", type=float, default=30.0, metavar="SECONDS",
+                        help="Consider an agent lost after SECONDS without data or heartbeat; its subnets move "
+                             "to another agent on the same network")
+    parser.add_argument("--connect-timeout", type=float, default=5.0, metavar="SECONDS",
+                        help="Timeout for connecting to an agent")
+    parser.add_argument("--secret-file", metavar="PATH",
+                        help="Shared secret of the agents (their --secret-file)")
+    parser.add_argument("--stats", nargs="?", const="-", default=None, metavar="PATH",
+                        help="Write a JSON summary of per-agent timings to stderr (or to PATH)")
+    args = parser.parse_args(argv)
+    for subnet in args.subnet:
+        try:
+            ipaddress.ip_network(subnet, strict=False)
+        except ValueError:
+            raise SystemExit(f"Invalid subnet {subnet!r}; use CIDR notation like 192.168.0.0/24.")
+
+    collector = start_stats(args)
+    coordinator = Coordinator(
+        args.agents, subnets=args.subnet, connect_timeout=args.connect_timeout,
+        idle_timeout=args.idle_timeout, deadline=args.deadline, secret=secret_from_args(args),
+    )
+    out = open(args.output, "w") if args.output else sys.stdout
+    streamed: Dict[str, Host] = {}
+    found: Iterable[Host] = streamed.values()
+    try:
+        if args.format == "ndjson":
+            write_ndjson(collect(coordinator.discover_iter(), streamed), out)
+        elif args.stream and args.format in STREAM_WRITERS:
+            STREAM_WRITERS[args.format](collect(coordinator.discover_iter(updates=False), streamed), out)
+        else:
+            found = coordinator.discover()
+            write_output(args.format, found, out)
+        # agents do not report name sources
+        save_snapshot(args, found, None)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        finish_stats(collector, args)
+    for address, reason in coordinator.lost:
+        print(f"warning: agent {address} lost: {reason}", file=sys.stderr)
+    for subnet, reason in coordinator.failed:
+        print(f"warning: {subnet} not scanned completely: {reason}", file=sys.stderr)
+    if coordinator.skipped:
+        print(f"warning: enrichment deadline reached, {coordinator.skipped} lookup(s) skipped",
+              file=sys.stderr)
+
+def _is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+def update_oui_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="localnet update-oui",
+        description="Compile IEEE OUI/MA-M/MA-S registry files into the vendor index used for MAC lookups.",
+    )
+    parser.add_argument("sources", nargs="*", metavar="FILE",
+                        help="Registry files (oui.csv, mam.csv, oui36.csv, oui.txt, Wireshark manuf, "
+                             "arp-scan ieee-oui.txt); default: copies installed by the system")
+    parser.add_argument("--index", default=None, help="Where to write the index (default: %s)" % default_index_path())
+    args = parser.parse_args(argv)
+    sources = args.sources or [p for p in SYSTEM_SOURCES if os.path.exists(p)]
+    if not sources:
+        raise SystemExit("No OUI registry file found. Download one (e.g. https://standards-oui.ieee.org/oui/oui.csv) "
+                         "and run `localnet update-oui oui.csv`.")
+    try:
+        count = build_index(sources, args.index)
+    except OSError as e:
+        raise SystemExit(f"Cannot build the OUI index: {e}")
+    print(f"{count} prefixes from {len(sources)} file(s) written to {args.index or default_index_path()}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,588 @@
+from __future__ import annotations
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import queue
+import secrets
+import socket
+import stat
+import struct
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import stats
+from aggregate import DiscoveryPipeline, ScanTarget
+from models import Host
+from output import host_dict
+
+# Wire protocol, over TCP or a Unix stream socket: every frame is a 4-byte
+# big-endian length and one UTF-8 JSON object with a `type`.
+#   agent -> coordinator
+#     hello   version, name, networks ([interface, subnet] pairs it is on),
+#             challenge (only when the agent has a shared secret)
+#     host    job, ip, hostname, mac, vendor, interface (one per host update)
+#     done    job, skipped (lookups dropped at the enrichment deadline)
+#     error   job, message (job null: the connection is refused and closed)
+#     welcome answer to a valid auth; the coordinator scans only after it
+#     alive   heartbeat, every few seconds while connected
+#   coordinator -> agent
+#     auth    proof: hex HMAC-SHA256 of the challenge under the shared
+#             secret; required before any scan when hello had a challenge
+#     scan    job, subnet, updates
+PROTOCOL_VERSION = 1
+DEFAULT_PORT = 7707
+MAX_FRAME = 1 << 20
+_LENGTH = struct.Struct("!I")
+
+def read_secret(path: str) -> bytes:
+    """Shared secret from a file (surrounding whitespace ignored); OSError or ValueError when unusable."""
+    with open(path, "rb") as f:
+        secret = f.read().strip()
+    if not secret:
+        raise ValueError(f"{path} is empty")
+    return secret
+
+def auth_proof(secret: bytes, challenge: str) -> str:
+    return hmac.new(secret, b"localnet-agent " + challenge.encode(), hashlib.sha256).hexdigest()
+
+def send_frame(sock: socket.socket, message: Dict) -> None:
+    data = json.dumps(message, separators=(",", ":")).encode()
+    if len(data) > MAX_FRAME:
+        raise ValueError(f"frame of {len(data)} bytes exceeds the limit")
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+
+def recv_frame(sock: socket.socket) -> Optional[Dict]:
+    """The next message, or None when the peer closed between frames. Malformed frames raise ValueError."""
+    head = _recv_exact(sock, _LENGTH.size)
+    if head is None:
+        return None
+    (length,) = _LENGTH.unpack(head)
+    if length > MAX_FRAME:
+        raise ValueError(f"frame of {length} bytes exceeds the limit")
+    body = _recv_exact(sock, length)
+    if body is None:
+        raise ValueError("connection closed inside a frame")
+    message = json.loads(body)
+    if not isinstance(message, dict) or not isinstance(message.get("type"), str):
+        raise ValueError("not a protocol message")
+    return message
+
+def _recv_exact(sock: socket.socket, n: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            if buf:
+                raise ValueError("connection closed inside a frame")
+            return None
+        buf += chunk
+    return bytes(buf)
+
+def parse_address(address: str) -> Tuple[int, object]:
+    """
+    (family, sockaddr) of an agent address: "unix:PATH" or any path with a
+    slash is a Unix socket, otherwise HOST:PORT, [IPV6]:PORT or HOST alone
+    (default port). An empty host listens on every IPv4 address.
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[5:]
+    if "/" in address:
+        return socket.AF_UNIX, address
+    host, sep, port = address.rpartition(":")
+    if not sep or "]" in port:
+        host, port = address, str(DEFAULT_PORT)
+    try:
+        number = int(port)
+    except ValueError:
+        raise ValueError(f"invalid port in agent address {address!r}")
+    if not 0 < number < 65536:
+        raise ValueError(f"invalid port in agent address {address!r}")
+    family = socket.AF_INET6 if host.startswith("[") else socket.AF_INET
+    return family, (host.strip("[]"), number)
+
+def listen_on(address: str) -> socket.socket:
+    family, addr = parse_address(address)
+    if family == socket.AF_UNIX:
+        try:
+            if stat.S_ISSOCK(os.stat(addr).st_mode):
+                os.unlink(addr)  # stale socket of a previous agent
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(addr)
+        server.listen(16)
+        return server
+    return socket.create_server(addr, family=family)
+
+def connect_to(address: str, timeout: float) -> socket.socket:
+    family, addr = parse_address(address)
+    if family != socket.AF_UNIX:
+        return socket.create_connection(addr, timeout=timeout)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(addr)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+class Agent:
+    """
+    Runs scans for a coordinator. Each connection is greeted with the
+    `networks` this host sits on and may then request any number of
+    subnets inside them (any subnet with `any_subnet`); each request gets
+    its own pipeline from `pipeline_for`, bound to the interface of its
+    network (at most `per_interface` scans at a time per interface), and
+    its hosts are streamed back as the pipeline finds them. With a
+    `secret`, a connection must answer the hello's challenge before its
+    first scan, or it is closed. A heartbeat every `heartbeat` seconds
+    tells a slow scan from a lost agent.
+    """
+
+    def __init__(
+        self,
+        pipeline_for: Callable[[ScanTarget], DiscoveryPipeline],
+        networks: Sequence[ScanTarget],
+        *,
+        name: Optional[str] = None,
+        per_interface: int = 1,
+        heartbeat: float = 5.0,
+        secret: Optional[bytes] = None,
+        any_subnet: bool = False,
+    ):
+        self.pipeline_for = pipeline_for
+        self.networks = list(networks)
+        self.name = name or socket.gethostname()
+        self.per_interface = max(1, per_interface)
+        self.heartbeat = heartbeat
+        self.secret = secret
+        self.any_subnet = any_subnet
+        self._limits: Dict[Optional[str], threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def serve(self, server: socket.socket, stop: Optional[threading.Event] = None) -> None:
+        """Accept coordinators on `server` until `stop` is set, one thread per connection."""
+        stop = stop or threading.Event()
+        server.settimeout(0.5)
+        while not stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                if stop.is_set():
+                    return
+                raise
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn: socket.socket) -> None:
+        """Serve one coordinator connection until it closes."""
+        conn.settimeout(None)
+        send_lock = threading.Lock()
+        closed = threading.Event()
+
+        def send(message: Dict) -> bool:
+            if closed.is_set():
+                return False
+            try:
+                with send_lock:
+                    send_frame(conn, message)
+                return True
+            except OSError:
+                closed.set()  # coordinator gone: running scans stop at their next host
+                return False
+
+        def beat() -> None:
+            while not closed.wait(self.heartbeat):
+                send({"type": "alive"})
+
+        hello = dict(type="hello", version=PROTOCOL_VERSION, name=self.name,
+                     networks=[[t.interface or "", t.subnet] for t in self.networks])
+        challenge = secrets.token_hex(16) if self.secret is not None else None
+        if challenge is not None:
+            hello["challenge"] = challenge
+        with conn:
+            if not send(hello):
+                return
+            threading.Thread(target=beat, daemon=True).start()
+            authenticated = challenge is None
+            try:
+                while True:
+                    message = recv_frame(conn)
+                    if message is None:
+                        break
+                    if message["type"] == "auth" and challenge is not None:
+                        proof = message.get("proof")
+                        authenticated = isinstance(proof, str) and hmac.compare_digest(
+                            proof, auth_proof(self.secret, challenge))
+                        if not authenticated:
+                            send(dict(type="error", job=None, message="authentication failed"))
+                            break
+                        send({"type": "welcome"})
+                    elif message["type"] == "scan":
+                        if not authenticated:
+                            send(dict(type="error", job=None, message="authentication required"))
+                            break
+                        threading.Thread(target=self._scan, args=(message, send), daemon=True).start()
+            except (OSError, ValueError):
+                pass
+            finally:
+                closed.set()
+
+    def _scan(self, message: Dict, send: Callable[[Dict], bool]) -> None:
+        job = message.get("job")
+        subnet = message.get("subnet")
+        try:
+            net = ipaddress.ip_network(subnet, strict=False)
+        except (TypeError, ValueError):
+            send(dict(type="error", job=job, message=f"invalid subnet {subnet!r}"))
+            return
+        if not self.any_subnet and not any(_contains(t.subnet, net) for t in self.networks):
+            send(dict(type="error", job=job, message=f"{subnet} is not on a network this agent offers"))
+            return
+        target = ScanTarget(self._interface_for(net), str(subnet))
+        try:
+            with self._limit(target.interface):
+                pipeline = self.pipeline_for(target)
+                for host in pipeline.discover_iter(target.subnet, updates=bool(message.get("updates", True))):
+                    record = dict(host_dict(host), interface=target.interface or "")
+                    record.pop("subnet", None)
+                    if not send(dict(type="host", job=job, **record)):
+                        return
+                skipped = pipeline.enrichment.skipped
+        except Exception as e:  # reported so the coordinator can hand the subnet to another agent
+            send(dict(type="error", job=job, message=f"{type(e).__name__}: {e}"))
+            return
+        send(dict(type="done", job=job, skipped=skipped))
+
+    def _interface_for(self, net) -> Optional[str]:
+        for target in self.networks:
+            if target.interface and _contains(target.subnet, net):
+                return target.interface
+        for target in self.networks:  # with any_subnet: a routed scan from an overlapping network
+            if target.interface and ipaddress.ip_network(target.subnet, strict=False).overlaps(net):
+                return target.interface
+        return None
+
+    def _limit(self, interface: Optional[str]) -> threading.Semaphore:
+        with self._lock:
+            return self._limits.setdefault(interface, threading.Semaphore(self.per_interface))
+
+class AgentSpec(NamedTuple):
+    """An agent to connect to and the subnets it must scan (none: the networks it advertises)."""
+    address: str
+    subnets: Tuple[str, ...] = ()
+
+class _AgentLink:
+    """Connection to one agent; a reader thread turns its frames into (index, message) events."""
+
+    def __init__(self, index: int, spec: AgentSpec, events: "queue.Queue[Tuple[int, Dict]]",
+                 connect_timeout: float, idle_timeout: float, secret: Optional[bytes] = None):
+        self.index = index
+        self.spec = spec
+        self.name = spec.address
+        self.networks: List[Tuple[str, ipaddress.IPv4Network]] = []
+        self.alive = True
+        self._events = events
+        self._connect_timeout = connect_timeout
+        self._idle_timeout = idle_timeout
+        self._secret = secret
+        self._sock: Optional[socket.socket] = None
+        self._closing = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def send(self, message: Dict) -> bool:
+        with self._lock:
+            sock = self._sock
+        if sock is None or not self.alive:
+            return False
+        try:
+            send_frame(sock, message)
+            return True
+        except OSError:
+            return False  # the reader reports the loss
+
+    def close(self) -> None:
+        with self._lock:
+            self._closing = True
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+    def _read(self) -> None:
+        greeted = False
+        try:
+            sock = connect_to(self.spec.address, self._connect_timeout)
+            with self._lock:
+                if self._closing:
+                    sock.close()
+                    return
+                self._sock = sock
+            hello = recv_frame(sock)
+            if hello is None or hello["type"] != "hello":
+                raise ValueError("no hello from agent")
+            if hello.get("version") != PROTOCOL_VERSION:
+                raise ValueError(f"agent speaks protocol version {hello.get('version')}, not {PROTOCOL_VERSION}")
+            challenge = hello.get("challenge")
+            if isinstance(challenge, str) and self._secret is not None:
+                send_frame(sock, dict(type="auth", proof=auth_proof(self._secret, challenge)))
+                # wait for the verdict, so a refusal is reported as this
+                # agent's loss instead of racing the first scan
+                reply = recv_frame(sock)
+                while reply is not None and reply["type"] == "alive":
+                    reply = recv_frame(sock)
+                if reply is not None and reply["type"] == "error":
+                    raise ValueError(str(reply.get("message") or "refused by agent"))
+                if reply is None or reply["type"] != "welcome":
+                    raise ValueError("agent did not answer the authentication")
+            elif challenge is not None:
+                raise ValueError("agent requires a shared secret")
+            elif self._secret is not None:
+                raise ValueError("agent does not check the shared secret")
+            sock.settimeout(self._idle_timeout)
+            greeted = True
+            self._events.put((self.index, hello))
+            while True:
+                message = recv_frame(sock)
+                if message is None:
+                    raise ValueError("agent closed the connection")
+                if message["type"] == "error" and message.get("job") is None:
+                    raise ValueError(str(message.get("message") or "refused by agent"))
+                if message["type"] != "alive":
+                    self._events.put((self.index, message))
+        except socket.timeout:
+            reason = f"silent for {self._idle_timeout:g}s" if greeted else "no answer within the connect timeout"
+        except (OSError, ValueError) as e:
+            reason = str(e) or type(e).__name__
+        if not self._closing:
+            self._events.put((self.index, dict(type="lost", reason=reason)))
+
+@dataclass
+class _Job:
+    id: int
+    subnet: str
+    candidates: List[int]  # agents still to try, in order
+    agent: Optional[int] = None
+    finished: bool = False
+    hosts: int = 0
+    started: float = field(default_factory=time.monotonic)
+    error: Optional[str] = None  # why the last agent gave it up
+
+class Coordinator:
+    """
+    Fans subnets out to remote agents and merges what they stream back.
+    Each subnet goes to one agent: the agent it was given to, else the
+    first agent with an advertised network that contains it (without subnets,
+    every network the agents advertise is scanned once). When an agent
+    errors, closes, or stays silent (no host or heartbeat) for
+    `idle_timeout` seconds, its unfinished subnets move to the next agent
+    on the same network; hosts it already sent are kept. Subnets still
+    running at `deadline` seconds, or with no agent left, are listed in
+    `failed`. Hosts from different agents merge with `Host.merge_from`
+    when IP and MAC agree; the same IP with another MAC (overlapping
+    address plans on separate segments) stays a separate host. Hosts are
+    tagged with their subnet and with "agent/interface". With a `secret`,
+    only agents that ask for it are used.
+    """
+
+    def __init__(
+        self,
+        agents: Sequence[AgentSpec],
+        *,
+        subnets: Sequence[str] = (),
+        connect_timeout: float = 5.0,
+        idle_timeout: float = 30.0,
+        deadline: Optional[float] = None,
+        secret: Optional[bytes] = None,
+    ):
+        self.agents = list(agents)
+        self.subnets = list(subnets)
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.deadline = deadline
+        self.secret = secret
+        self.skipped = 0
+        self.failed: List[Tuple[str, str]] = []  # (subnet, reason)
+        self.lost: List[Tuple[str, str]] = []    # (agent address, reason)
+        self._merged: Dict[str, List[Host]] = {}
+
+    def discover(self) -> List[Host]:
+        """Merged hosts in numeric IP order."""
+        for _host in self.discover_iter(updates=False):
+            pass
+        hosts = [h for copies in self._merged.values() for h in copies]
+        return sorted(hosts, key=lambda h: (int(ipaddress.ip_address(h.ip)), h.interface))
+
+    def discover_iter(self, *, updates: bool = True) -> Iterator[Host]:
+        """
+        With `updates=True`, a copy of a host is yielded when it first
+        arrives and whenever another report adds to it; with
+        `updates=False` every host is yielded once, as soon as an agent has
+        finished it.
+        """
+        self.skipped = 0
+        self.failed, self.lost = [], []
+        self._merged = {}
+        events: "queue.Queue[Tuple[int, Dict]]" = queue.Queue()
+        links = [_AgentLink(i, spec, events, self.connect_timeout, self.idle_timeout, self.secret)
+                 for i, spec in enumerate(self.agents)]
+        for link in links:
+            link.start()
+        try:
+            yield from self._run(links, events, updates)
+        finally:
+            for link in links:
+                link.close()
+
+    def _run(self, links: List[_AgentLink], events: "queue.Queue[Tuple[int, Dict]]", updates: bool) -> Iterator[Host]:
+        until = None if self.deadline is None else time.monotonic() + self.deadline
+        greeting = set(range(len(links)))
+        jobs: Optional[List[_Job]] = None
+        while jobs is None or not all(job.finished for job in jobs):
+            if jobs is None and not greeting:
+                jobs = self._plan(links)  # every agent has answered or is gone
+                for job in jobs:
+                    self._assign(job, links, updates)
+                continue
+            wait = None if until is None else until - time.monotonic()
+            try:
+                if wait is not None and wait <= 0:
+                    raise queue.Empty
+                i, message = events.get(timeout=wait)
+            except queue.Empty:
+                break
+            link = links[i]
+            kind = message["type"]
+            if kind == "hello":
+                link.name = str(message.get("name") or link.spec.address)
+                link.networks = _networks(message.get("networks"))
+                greeting.discard(i)
+            elif kind == "lost":
+                link.alive = False
+                self.lost.append((link.spec.address, message["reason"]))
+                greeting.discard(i)
+                for job in jobs or ():
+                    if job.agent == i and not job.finished:
+                        self._finish(job, links, f"agent lost: {message['reason']}")
+                        self._assign(job, links, updates)
+            elif jobs is not None:
+                job = _job(jobs, message.get("job"))
+                if job is None or job.agent != i or job.finished:
+                    continue  # late report for a subnet that moved on
+                if kind == "host":
+                    host = self._absorb(message, job, link, updates)
+                    if host is not None:
+                        yield replace(host)
+                elif kind == "done":
+                    self.skipped += int(message.get("skipped") or 0)
+                    self._finish(job, links)
+                elif kind == "error":
+                    self._finish(job, links, str(message.get("message") or "agent error"))
+                    self._assign(job, links, updates)
+        if jobs is None:
+            jobs = self._plan(links)  # deadline reached before every agent answered
+        for job in jobs:
+            if not job.finished:
+                job.finished = True
+                self.failed.append((job.subnet, "deadline reached"))
+                self._report(job, links, "deadline")
+
+    def _plan(self, links: List[_AgentLink]) -> List[_Job]:
+        jobs: List[_Job] = []
+        planned = set()
+
+        def add(subnet: str, first: Optional[int] = None) -> None:
+            net = ipaddress.ip_network(subnet, strict=False)
+            if net in planned:
+                return
+            planned.add(net)
+            covering = [l.index for l in links if l.alive and any(_contains(n, net) for _i, n in l.networks)]
+            candidates = ([first] if first is not None else []) + [i for i in covering if i != first]
+            jobs.append(_Job(len(jobs), subnet, candidates))
+
+        for link in links:
+            for subnet in link.spec.subnets:
+                add(subnet, link.index)
+        for subnet in self.subnets:
+            add(subnet)
+        if not self.subnets:
+            for link in links:
+                if not link.spec.subnets:
+                    for _iface, net in link.networks:
+                        add(str(net), link.index)
+        return jobs
+
+    def _assign(self, job: _Job, links: List[_AgentLink], updates: bool) -> None:
+        while job.candidates:
+            i = job.candidates.pop(0)
+            if links[i].send(dict(type="scan", job=job.id, subnet=job.subnet, updates=updates)):
+                job.agent, job.finished, job.started = i, False, time.monotonic()
+                return
+        job.finished = True
+        if job.agent is None:
+            self.failed.append((job.subnet, "no agent on this network"))
+        else:
+            self.failed.append((job.subnet, f"no agent left on this network (last: {job.error})"))
+
+    def _finish(self, job: _Job, links: List[_AgentLink], error: Optional[str] = None) -> None:
+        job.finished = True
+        job.error = error
+        self._report(job, links, error or "done")
+
+    @staticmethod
+    def _report(job: _Job, links: List[_AgentLink], status: str) -> None:
+        if job.agent is not None:
+            stats.emit("agent", name=links[job.agent].name, subnet=job.subnet, status=status,
+                       duration=round(time.monotonic() - job.started, 6), hosts=job.hosts)
+
+    def _absorb(self, message: Dict, job: _Job, link: _AgentLink, updates: bool) -> Optional[Host]:
+        """Merge one reported host; returns the merged host when it should be yielded."""
+        try:
+            ip = str(ipaddress.ip_address(message.get("ip")))
+        except ValueError:
+            return None
+        interface = str(message.get("interface") or "")
+        update = Host(
+            ip=ip,
+            hostname=message.get("hostname") or None,
+            mac=str(message.get("mac") or ""),
+            vendor=str(message.get("vendor") or ""),
+            interface=f"{link.name}/{interface}" if interface else link.name,
+            subnet=job.subnet,
+        )
+        copies = self._merged.setdefault(ip, [])
+        for host in copies:
+            if host.mac and update.mac and host.mac.lower() != update.mac.lower():
+                continue
+            before = (host.hostname, host.mac, host.vendor)
+            host.merge_from(update)
+            return host if updates and (host.hostname, host.mac, host.vendor) != before else None
+        copies.append(update)
+        job.hosts += 1
+        return update
+
+def _contains(network, net) -> bool:
+    network = ipaddress.ip_network(network, strict=False)
+    return network.version == net.version and net.subnet_of(network)
+
+def _job(jobs: List[_Job], job_id: object) -> Optional[_Job]:
+    if isinstance(job_id, int) and 0 <= job_id < len(jobs):
+        return jobs[job_id]
+    return None
+
+def _networks(raw: object) -> List[Tuple[str, ipaddress.IPv4Network]]:
+    networks = []
+    for entry in raw if isinstance(raw, list) else ():
+        try:
+            interface, subnet = entry
+            networks.append((str(interface), ipaddress.ip_network(subnet, strict=False)))
+        except (TypeError, ValueError):
+            continue  # a bad entry only loses that network
+    return networks
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import struct
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+TYPE_A = 1
+TYPE_PTR = 12
+CLASS_IN = 1
+FLAG_RD = 0x0100
+FLAG_QR = 0x8000
+RCODE_NXDOMAIN = 3
+
+@dataclass
+class Record:
+    name: str
+    rtype: int
+    rclass: int
+    ttl: int
+    value: str  # decoded rdata for A/PTR, hex otherwise
+
+@dataclass
+class Message:
+    txid: int
+    flags: int
+    questions: List[Tuple[str, int]] = field(default_factory=list)
+    answers: List[Record] = field(default_factory=list)
+
+    @property
+    def rcode(self) -> int:
+        return self.flags & 0x000F
+
+    @property
+    def is_response(self) -> bool:
+        return bool(self.flags & FLAG_QR)
+
+def reverse_name(ip: str) -> str:
+    return ".".join(reversed(ip.split("."))) + ".in-addr.arpa"
+
+def reverse_name_to_ip(name: str) -> Optional[str]:
+    name = name.rstrip(".").lower()
+    if not name.endswith(".in-addr.arpa"):
+        return None
+    octets = name[: -len(".in-addr.arpa")].split(".")
+    if len(octets) != 4 or not all(o.isdigit() and int(o) < 256 for o in octets):
+        return None
+    return ".".join(reversed(octets))
+
+def encode_name(name: str) -> bytes:
+    out = b""
+    for label in name.rstrip(".").split("."):
+        if label:
+            raw = label.encode()
+            out += bytes([len(raw)]) + raw
+    return out + b"\x00"
+
+def build_query(txid: int, questions: Sequence[Tuple[str, int]], flags: int = FLAG_RD, qclass: int = CLASS_IN) -> bytes:
+    packet = struct.pack("!HHHHHH", txid, flags, len(questions), 0, 0, 0)
+    for name, qtype in questions:
+        packet += encode_name(name) + struct.pack("!HH", qtype, qclass)
+    return packet
+
+def build_response(query: Message, answers: Sequence[Record], rcode: int = 0, flags: int = FLAG_QR | FLAG_RD | 0x0080) -> bytes:
+    """Encode a response (used by responders and test stubs); no compression."""
+    packet = struct.pack("!HHHHHH", query.txid, flags | rcode, len(query.questions), len(answers), 0, 0)
+    for name, qtype in query.questions:
+        packet += encode_name(name) + struct.pack("!HH", qtype, CLASS_IN)
+    for rr in answers:
+        if rr.rtype == TYPE_A:
+            rdata = bytes(int(o) for o in rr.value.split("."))
+        else:
+            rdata = encode_name(rr.value)
+        packet += encode_name(rr.name) + struct.pack("!HHIH", rr.rtype, rr.rclass, rr.ttl, len(rdata)) + rdata
+    return packet
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    labels: List[str] = []
+    end: Optional[int] = None
+    jumps = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("truncated name")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data) or jumps > 32:
+                raise ValueError("bad compression pointer")
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode(errors="replace"))
+        offset += length
+    return ".".join(labels), (end if end is not None else offset)
+
+def parse_message(data: bytes) -> Message:
+    """Decode header, questions and answer/additional records; raises ValueError on garbage."""
+    if len(data) < 12:
+        raise ValueError("short packet")
+    txid, flags, qd, an, ns, ar = struct.unpack("!HHHHHH", data[:12])
+    msg = Message(txid=txid, flags=flags)
+    offset = 12
+    for _ in range(qd):
+        name, offset = _read_name(data, offset)
+        qtype, _qclass = struct.unpack("!HH", data[offset:offset + 4])
+        offset += 4
+        msg.questions.append((name, qtype))
+    for idx in range(an + ns + ar):
+        name, offset = _read_name(data, offset)
+        if offset + 10 > len(data):
+            raise ValueError("truncated record")
+        rtype, rclass, ttl, rdlen = struct.unpack("!HHIH", data[offset:offset + 10])
+        offset += 10
+        rdata_at = offset
+        offset += rdlen
+        if offset > len(data):
+            raise ValueError("truncated rdata")
+        if an <= idx < an + ns:
+            continue  # authority section is not useful here
+        if rtype == TYPE_A and rdlen == 4:
+            value = ".".join(str(b) for b in data[rdata_at:offset])
+        elif rtype == TYPE_PTR:
+            value, _ = _read_name(data, rdata_at)
+        else:
+            value = data[rdata_at:offset].hex()
+        # mDNS uses the top class bit as cache-flush
+        msg.answers.append(Record(name, rtype, rclass & 0x7FFF, ttl, value))
+    return msg
@@ -0,0 +1,190 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import stats
+from mdns import MdnsResolver
+from models import Host
+from netbios import NetbiosResolver
+from oui import OuiDatabase
+from rdns import PtrResolver
+from resolvers import reverse_dns
+
+Lookup = Callable[[str], Optional[str]]
+BatchLookup = Callable[[List[str], float], Tuple[Dict[str, str], int]]
+
+# source kinds
+POOLED, BATCH = "pooled", "batch"
+# queries in flight for the native NBSTAT and PTR resolvers
+BATCH_INFLIGHT = 256
+
+class EnrichmentStage:
+    """
+    Hostname resolution stage: runs the name sources in priority order
+    (mDNS, NetBIOS, reverse DNS) for hosts that still lack a name, and
+    fills missing vendors from the local OUI index (`vendor_db`). Per-host
+    sources fan out over a bounded worker pool, batch sources (the native
+    mDNS, NBSTAT and PTR resolvers) take the remaining IP list at once.
+    Every lookup gets its own timeout, and the whole stage is capped by
+    `deadline` seconds. Each source may use an equal share of the time
+    left when it starts (what one leaves unused goes to the next), so a
+    slow source cannot starve the ones after it; lookups still
+    outstanding at a source's cut-off are cancelled and counted in
+    `skipped`.
+    """
+
+    def __init__(
+        self,
+        *,
+        enable_mdns: bool = True,
+        enable_netbios: bool = True,
+        enable_rdns: bool = True,
+        workers: int = 32,
+        lookup_timeout: float = 2.0,
+        deadline: float = 60.0,
+        dns_server: Optional[str] = None,
+        vendor_db: Optional[OuiDatabase] = None,
+    ):
+        self.enable_mdns = enable_mdns
+        self.enable_netbios = enable_netbios
+        self.enable_rdns = enable_rdns
+        self.workers = max(1, workers)
+        self.lookup_timeout = lookup_timeout
+        self.deadline = deadline
+        self.dns_server = dns_server
+        self.vendor_db = vendor_db
+        # kept across runs so names announced earlier stay available
+        self.mdns = MdnsResolver(window=lookup_timeout)
+        self.skipped = 0
+        # ip -> name of the source that resolved it in the last run
+        self.sources: Dict[str, str] = {}
+        # source name -> seconds it took in the last run
+        self.timings: Dict[str, float] = {}
+
+    def run(self, hosts: Iterable[Host]) -> int:
+        """Fill `hostname` (and NetBIOS MACs, OUI vendors) in place; returns the number of skipped lookups."""
+        for _ in self.run_iter(hosts):
+            pass
+        return self.skipped
+
+    def run_iter(
+        self, hosts: Iterable[Host], *, order: Optional[Sequence[str]] = None, deadline: Optional[float] = None,
+    ) -> Iterator[List[Host]]:
+        """
+        Like `run`, but yields the hosts a source updated after each source
+        finishes. `order` names the enabled sources to use, in that order
+        (default: all, by priority); `deadline` overrides the stage's own.
+        """
+        hosts = list(hosts)
+        until = time.monotonic() + (self.deadline if deadline is None else deadline)
+        self.skipped = 0
+        self.sources = {}
+        self.timings = {}
+
+        with_vendor = self._fill_vendors(hosts)
+        if with_vendor:
+            yield with_vendor
+        sources = self._sources({h.ip: h for h in hosts})
+        if order is not None:
+            by_name = {source[0]: source for source in sources}
+            sources = [by_name[name] for name in order if name in by_name]
+        for k, (name, kind, lookup) in enumerate(sources):
+            pending = [h for h in hosts if not h.hostname]
+            if not pending:
+                break
+            started = time.monotonic()
+            share = started + (until - started) / (len(sources) - k)
+            with stats.timed("resolver", name=name, queried=len(pending)) as ev:
+                names, skipped = self._fan_out(kind, lookup, [h.ip for h in pending], share)
+                ev.update(resolved=sum(1 for ip in names if names[ip]), skipped=skipped)
+            self.timings[name] = time.monotonic() - started
+            self.skipped += skipped
+            for h in pending:
+                if names.get(h.ip):
+                    h.hostname = names[h.ip]
+                    self.sources[h.ip] = name
+            # NetBIOS may also have filled MACs (and so vendors), so report every pending host
+            self._fill_vendors(pending)
+            yield pending
+
+    def _fill_vendors(self, hosts: List[Host]) -> List[Host]:
+        """Set `vendor` from the OUI index for hosts with a MAC but no vendor; returns those updated."""
+        if self.vendor_db is None:
+            return []
+        wanting = [h for h in hosts if h.mac and not h.vendor]
+        if not wanting:
+            return []
+        filled: List[Host] = []
+        with stats.timed("resolver", name="oui", queried=len(wanting)) as ev:
+            for h in wanting:
+                vendor = self.vendor_db.lookup(h.mac)
+                if vendor:
+                    h.vendor = vendor
+                    filled.append(h)
+            ev.update(resolved=len(filled), skipped=0)
+        return filled
+
+    def enabled_sources(self) -> List[str]:
+        """Names of the enabled name sources, in priority order."""
+        return [name for name, on in (("mdns", self.enable_mdns), ("netbios", self.enable_netbios),
+                                      ("rdns", self.enable_rdns)) if on]
+
+    def _sources(self, by_ip: Dict[str, Host]) -> List[Tuple[str, str, Callable]]:
+        # (name, kind, lookup) in priority order
+        sources: List[Tuple[str, str, Callable]] = []
+        if self.enable_mdns:
+            sources.append(("mdns", BATCH, self.mdns.resolve))
+        if self.enable_netbios:
+            sources.append(("netbios", BATCH, lambda ips, budget: self._netbios(by_ip, ips, budget)))
+        if self.enable_rdns:
+            ptr = PtrResolver(self.dns_server, timeout=self.lookup_timeout / 2, retries=1, max_inflight=BATCH_INFLIGHT)
+            if ptr.server:
+                sources.append(("rdns", BATCH, ptr.resolve))
+            else:
+                sources.append(("rdns", POOLED, reverse_dns))
+        return sources
+
+    def _fan_out(self, kind: str, lookup: Callable, ips: List[str], until: float) -> Tuple[Dict[str, str], int]:
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            return {}, len(ips)
+        if kind == BATCH:
+            return lookup(ips, remaining)
+
+        # Daemon workers rather than a ThreadPoolExecutor: gethostbyaddr has no
+        # timeout, and executor threads are joined at interpreter exit, so a
+        # stuck lookup would keep the process alive past the deadline.
+        queued = iter(ips)
+        answers: Dict[str, Optional[str]] = {}
+        cut_off = threading.Event()
+        lock = threading.Condition()
+
+        def work() -> None:
+            while True:
+                with lock:
+                    ip = None if cut_off.is_set() else next(queued, None)
+                if ip is None:
+                    return
+                try:
+                    name = lookup(ip)
+                except Exception:
+                    name = None
+                with lock:
+                    answers[ip] = name
+                    lock.notify()
+
+        for _ in range(min(self.workers, len(ips))):
+            threading.Thread(target=work, daemon=True).start()
+        with lock:
+            lock.wait_for(lambda: len(answers) == len(ips), timeout=remaining)
+            # lookups still running are abandoned, queued ones never start
+            cut_off.set()
+            return {ip: name for ip, name in answers.items() if name}, len(ips) - len(answers)
+
+    def _netbios(self, by_ip: Dict[str, Host], ips: List[str], budget: float) -> Tuple[Dict[str, str], int]:
+        resolver = NetbiosResolver(timeout=self.lookup_timeout / 2, retries=1, max_inflight=BATCH_INFLIGHT)
+        infos, skipped = resolver.resolve(ips, budget)
+        for ip, info in infos.items():
+            if info.mac and not by_ip[ip].mac:
+                by_ip[ip].mac = info.mac
+        return {ip: info.name for ip, info in infos.items() if info.name}, skipped
@@ -0,0 +1,136 @@
+from __future__ import annotations
+import socket
+import struct
+import sys
+from typing import Dict, Iterable, Iterator, Optional, Union
+from models import Host
+
+_IP = struct.Struct("!I")
+
+def ip_to_int(ip: str) -> int:
+    return _IP.unpack(socket.inet_aton(ip))[0]
+
+def int_to_ip(n: int) -> str:
+    return socket.inet_ntoa(_IP.pack(n))
+
+def mac_to_int(mac: str) -> Optional[int]:
+    """48-bit int for a canonical lower-case `aa:bb:cc:dd:ee:ff` MAC, else None."""
+    if len(mac) != 17 or mac != mac.lower():
+        return None
+    try:
+        value = int(mac.replace(":", ""), 16)
+    except ValueError:
+        return None
+    return value if int_to_mac(value) == mac else None
+
+def int_to_mac(n: int) -> str:
+    return n.to_bytes(6, "big").hex(":")
+
+def _intern(s: Optional[str]) -> Optional[str]:
+    return sys.intern(s) if s else s
+
+class HostRecord:
+    """One row of a HostTable; the IP is the table key."""
+    __slots__ = ("mac", "hostname", "vendor", "interface", "subnet")
+
+    def __init__(self, mac: Union[int, str], hostname: Optional[str], vendor: str,
+                 interface: str = "", subnet: str = ""):
+        # canonical MACs are packed into an int, anything else is kept verbatim
+        self.mac = mac
+        self.hostname = hostname
+        self.vendor = vendor
+        self.interface = interface
+        self.subnet = subnet
+
+class HostTable:
+    """
+    Host store for large scans, keyed by the IPv4 address as a 32-bit int.
+    It is the pipeline's working store: while a scan runs, rows are the
+    live `Host` objects that scanners and enrichment update in place
+    (`get`, `table[ip] = host`, `values()` in insertion order). `freeze()`
+    then packs the rows one at a time into compact records, with MACs as
+    48-bit ints and hostnames/vendors interned, so the result never exists
+    twice. Iteration yields hosts in numeric IP order: live rows as they
+    are, packed rows as `Host` views built one at a time.
+    """
+
+    def __init__(self, hosts: Iterable[Host] = ()):
+        self._rows: Dict[int, Union[Host, HostRecord]] = {}
+        for h in hosts:
+            self.add(h)
+
+    def add(self, host: Host) -> None:
+        """Insert `host` packed, or fill the missing fields of an existing row (same rules as `Host.merge_from`)."""
+        key = ip_to_int(host.ip)
+        row = self._rows.get(key)
+        if row is None:
+            self._rows[key] = self._pack(host)
+        elif row.__class__ is Host:
+            row.merge_from(host)
+        else:
+            if not row.mac and host.mac:
+                row.mac = self._pack_mac(host.mac)
+            if not row.vendor and host.vendor:
+                row.vendor = _intern(host.vendor)
+            if not row.hostname and host.hostname:
+                row.hostname = _intern(host.hostname)
+            if not row.subnet and host.subnet:
+                row.interface, row.subnet = _intern(host.interface) or "", _intern(host.subnet)
+
+    def __setitem__(self, ip: str, host: Host) -> None:
+        """Store `host` itself as the live row for `ip`, replacing what was there."""
+        self._rows[ip_to_int(ip)] = host
+
+    def get(self, ip: str) -> Optional[Host]:
+        """The live row for `ip`, or a view of its packed row; None when unknown."""
+        key = ip_to_int(ip)
+        row = self._rows.get(key)
+        if row is None or row.__class__ is Host:
+            return row
+        return self._view(key, row)
+
+    def values(self) -> Iterator[Host]:
+        """Rows in insertion order (discovery order), like `dict.values()`."""
+        view = self._view
+        for key, row in self._rows.items():
+            yield row if row.__class__ is Host else view(key, row)
+
+    def freeze(self) -> "HostTable":
+        """Pack every live row; the Host objects are released as their records replace them."""
+        rows = self._rows
+        for key, row in rows.items():
+            if row.__class__ is Host:
+                rows[key] = self._pack(row)
+        return self
+
+    def __contains__(self, ip: object) -> bool:
+        return isinstance(ip, str) and ip_to_int(ip) in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[Host]:
+        rows = self._rows
+        view = self._view
+        for key in sorted(rows):
+            row = rows[key]
+            yield row if row.__class__ is Host else view(key, row)
+
+    @classmethod
+    def _pack(cls, host: Host) -> HostRecord:
+        return HostRecord(cls._pack_mac(host.mac), _intern(host.hostname), _intern(host.vendor) or "",
+                          _intern(host.interface) or "", _intern(host.subnet) or "")
+
+    @staticmethod
+    def _pack_mac(mac: str) -> Union[int, str]:
+        if not mac:
+            return 0
+        packed = mac_to_int(mac)
+        return _intern(mac) if packed is None or packed == 0 else packed
+
+    @staticmethod
+    def _view(key: int, row: HostRecord) -> Host:
+        mac = row.mac
+        if mac.__class__ is int:
+            mac = mac.to_bytes(6, "big").hex(":") if mac else ""
+        return Host(socket.inet_ntoa(_IP.pack(key)), row.hostname, mac, row.vendor, row.interface, row.subnet)
@@ -0,0 +1,179 @@
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from models import Host
+
+def default_cache_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "localnet", "inventory.sqlite3")
+
+@dataclass
+class InventoryEntry:
+    ip: str
+    mac: str
+    hostname: str = ""
+    source: str = ""
+    vendor: str = ""
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+    hostname_at: float = 0.0
+    vendor_at: float = 0.0
+
+@dataclass
+class InventoryDiff:
+    appeared: List[Host] = field(default_factory=list)
+    disappeared: List[Host] = field(default_factory=list)
+    # (before, after) pairs for the same IP
+    changed: List[Tuple[Host, Host]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.appeared or self.disappeared or self.changed)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    ip TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    hostname TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    vendor TEXT NOT NULL DEFAULT '',
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    hostname_at REAL NOT NULL DEFAULT 0,
+    vendor_at REAL NOT NULL DEFAULT 0,
+    last_run INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ip, mac)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL
+);
+"""
+
+class InventoryStore:
+    """
+    On-disk host inventory (SQLite) keyed by IP+MAC. Resolved hostnames and
+    vendors are reused while younger than their TTL; entries not seen for
+    `forget_after` seconds are purged. Each recorded scan is a run, which
+    `diff` compares against. The store may be shared by pipelines running
+    in different threads (one per network); access is serialised.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        hostname_ttl: float = 3600,
+        vendor_ttl: float = 30 * 86400,
+        forget_after: float = 30 * 86400,
+    ):
+        self.path = path or default_cache_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.hostname_ttl = hostname_ttl
+        self.vendor_ttl = vendor_ttl
+        self.forget_after = forget_after
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.executescript(_SCHEMA)
+        self.lock = threading.RLock()
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+    def lookup(self, ip: str, mac: str) -> Optional[InventoryEntry]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT ip, mac, hostname, source, vendor, first_seen, last_seen, hostname_at, vendor_at"
+                " FROM hosts WHERE ip = ? AND mac = ?", (ip, _norm_mac(mac))
+            ).fetchone()
+        return InventoryEntry(*row) if row else None
+
+    def apply_cached(self, host: Host, now: Optional[float] = None) -> Tuple[bool, bool]:
+        """Fill missing hostname/vendor from a fresh entry; returns (name reused, vendor reused)."""
+        entry = self.lookup(host.ip, host.mac)
+        if entry is None:
+            return False, False
+        now = time.time() if now is None else now
+        vendor = name = False
+        if not host.vendor and entry.vendor and now - entry.vendor_at < self.vendor_ttl:
+            host.vendor = entry.vendor
+            vendor = True
+        if not host.hostname and entry.hostname and now - entry.hostname_at < self.hostname_ttl:
+            host.hostname = entry.hostname
+            name = True
+        return name, vendor
+
+    def previous_run(self) -> Dict[str, Host]:
+        with self.lock:
+            row = self.db.execute("SELECT MAX(id) FROM runs").fetchone()
+            if not row or row[0] is None:
+                return {}
+            rows = self.db.execute(
+                "SELECT ip, hostname, mac, vendor FROM hosts WHERE last_run = ?", (row[0],)
+            ).fetchall()
+        return {ip: Host(ip=ip, hostname=name or None, mac=mac, vendor=vendor) for ip, name, mac, vendor in rows}
+
+    def diff(self, hosts: Iterable[Host]) -> InventoryDiff:
+        """Compare `hosts` with the hosts recorded by the previous run."""
+        before = self.previous_run()
+        result = InventoryDiff()
+        seen = set()
+        for h in hosts:
+            seen.add(h.ip)
+            old = before.get(h.ip)
+            if old is None:
+                result.appeared.append(h)
+            elif (_norm_mac(old.mac), old.hostname or "", old.vendor) != (_norm_mac(h.mac), h.hostname or "", h.vendor or ""):
+                result.changed.append((old, h))
+        result.disappeared = [h for ip, h in before.items() if ip not in seen]
+        return result
+
+    def record(
+        self,
+        hosts: Iterable[Host],
+        sources: Optional[Dict[str, str]] = None,
+        cached_vendors: Iterable[str] = (),
+        now: Optional[float] = None,
+    ) -> int:
+        """
+        Upsert this run's hosts. `sources` maps IP -> name source ("cache"
+        for names reused via `apply_cached`); reused names and the vendors
+        in `cached_vendors` keep their original timestamp so TTLs expire.
+        """
+        now = time.time() if now is None else now
+        sources = sources or {}
+        cached_vendors = set(cached_vendors)
+        with self.lock, self.db:
+            run_id = self.db.execute("INSERT INTO runs (started) VALUES (?)", (now,)).lastrowid
+            for h in hosts:
+                mac = _norm_mac(h.mac)
+                src = sources.get(h.ip) or ("scan" if h.hostname else "")
+                fresh_name = bool(h.hostname) and src != "cache"
+                fresh_vendor = bool(h.vendor) and h.ip not in cached_vendors
+                self.db.execute(
+                    """
+                    INSERT INTO hosts (ip, mac, hostname, source, vendor, first_seen, last_seen,
+                                       hostname_at, vendor_at, last_run)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (ip, mac) DO UPDATE SET
+                        hostname = CASE WHEN excluded.hostname != '' THEN excluded.hostname ELSE hostname END,
+                        source = CASE WHEN excluded.hostname_at > 0 THEN excluded.source ELSE source END,
+                        hostname_at = MAX(hostname_at, excluded.hostname_at),
+                        vendor = CASE WHEN excluded.vendor != '' THEN excluded.vendor ELSE vendor END,
+                        vendor_at = MAX(vendor_at, excluded.vendor_at),
+                        last_seen = excluded.last_seen,
+                        last_run = excluded.last_run
+                    """,
+                    (h.ip, mac, h.hostname or "", src if fresh_name else "", h.vendor or "", now, now,
+                     now if fresh_name else 0, now if fresh_vendor else 0, run_id),
+                )
+            self.db.execute("DELETE FROM hosts WHERE last_seen < ?", (now - self.forget_after,))
+            self.db.execute("DELETE FROM runs WHERE id < ?", (run_id,))
+        return run_id
+
+def _norm_mac(mac: str) -> str:
+    return (mac or "").lower()
@@ -1,5 +1,11 @@
 #!/usr/bin/env python3
-from cli import main
+import sys
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:2] == ["ansible-inventory"]:
+        # Ansible runs this on every play: skip loading the scanners
+        from ansible_inventory import main as inventory_main
+        inventory_main(sys.argv[2:])
+    else:
+        from cli import main
+        main()
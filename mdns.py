@@ -0,0 +1,139 @@
+from __future__ import annotations
+import selectors
+import socket
+import struct
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from dnsproto import (
+    CLASS_IN, TYPE_A, TYPE_PTR, build_query, parse_message, reverse_name, reverse_name_to_ip,
+)
+
+MDNS_GROUP = "224.0.0.251"
+MDNS_PORT = 5353
+QU_BIT = 0x8000  # "unicast response requested" bit in the question class
+
+class MdnsResolver:
+    """
+    Native mDNS reverse lookups: sends reverse-address PTR questions in
+    batches to 224.0.0.251:5353 from an ephemeral port (one-shot queries,
+    answered by unicast), then collects answers for one listening window.
+    A records seen in any answer or announcement are cached in `announced`
+    and used for IPs that got no PTR answer.
+    """
+
+    def __init__(
+        self,
+        *,
+        group: str = MDNS_GROUP,
+        port: int = MDNS_PORT,
+        window: float = 2.0,
+        batch_size: int = 32,
+        listen_multicast: bool = True,
+        max_announced: int = 4096,
+    ):
+        self.group = group
+        self.port = port
+        self.window = window
+        self.batch_size = max(1, batch_size)
+        self.listen_multicast = listen_multicast
+        self.max_announced = max_announced
+        self.announced: Dict[str, str] = {}
+
+    def resolve(self, ips: Iterable[str], deadline: Optional[float] = None) -> Tuple[Dict[str, str], int]:
+        """Returns (names, number of IPs left unanswered because `deadline` cut the window short)."""
+        wanted = set(ips)
+        if not wanted:
+            return {}, 0
+        window = self.window if deadline is None else min(self.window, deadline)
+        names: Dict[str, str] = {}
+        socks = self._open_sockets()
+        if not socks:
+            return {}, 0
+        sel = selectors.DefaultSelector()
+        try:
+            for s in socks:
+                sel.register(s, selectors.EVENT_READ)
+            for packet in self._queries(sorted(wanted)):
+                socks[0].sendto(packet, (self.group, self.port))
+            until = time.monotonic() + window
+            while wanted - names.keys():
+                remaining = until - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in sel.select(remaining):
+                    try:
+                        data, _addr = key.fileobj.recvfrom(9000)
+                    except OSError:
+                        continue
+                    self._absorb(data, wanted, names)
+        except OSError:
+            pass
+        finally:
+            sel.close()
+            for s in socks:
+                s.close()
+
+        for ip in wanted - names.keys():
+            if ip in self.announced:
+                names[ip] = self.announced[ip]
+        cut_short = deadline is not None and deadline < self.window
+        return names, (len(wanted - names.keys()) if cut_short else 0)
+
+    def _queries(self, ips: List[str]) -> List[bytes]:
+        packets = []
+        for i in range(0, len(ips), self.batch_size):
+            questions = [(reverse_name(ip), TYPE_PTR) for ip in ips[i:i + self.batch_size]]
+            packets.append(build_query(0, questions, flags=0, qclass=CLASS_IN | QU_BIT))
+        return packets
+
+    def _absorb(self, data: bytes, wanted: set, names: Dict[str, str]) -> None:
+        try:
+            msg = parse_message(data)
+        except (ValueError, UnicodeError, struct.error):
+            return
+        if not msg.is_response:
+            return
+        for rr in msg.answers:
+            if rr.rtype == TYPE_PTR:
+                ip = reverse_name_to_ip(rr.name)
+                if ip:
+                    host = rr.value.rstrip(".")
+                    self._remember(ip, host)
+                    if ip in wanted:
+                        names[ip] = host
+            elif rr.rtype == TYPE_A and rr.value not in self.announced:
+                self._remember(rr.value, rr.name.rstrip("."))
+
+    def _remember(self, ip: str, name: str) -> None:
+        # bounded, oldest-first eviction so long-running watchers stay small
+        self.announced.pop(ip, None)
+        self.announced[ip] = name
+        while len(self.announced) > self.max_announced:
+            self.announced.pop(next(iter(self.announced)))
+
+    def _open_sockets(self) -> List[socket.socket]:
+        socks: List[socket.socket] = []
+        try:
+            q = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            q.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 255)
+            q.bind(("", 0))
+            q.setblocking(False)
+            socks.append(q)
+        except OSError:
+            return []
+        if self.listen_multicast:
+            # also catch multicast answers/announcements; best effort since
+            # another responder (avahi) may own the port without SO_REUSEPORT
+            try:
+                m = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                m.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                if hasattr(socket, "SO_REUSEPORT"):
+                    m.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                m.bind(("", MDNS_PORT))
+                mreq = struct.pack("4s4s", socket.inet_aton(MDNS_GROUP), socket.inet_aton("0.0.0.0"))
+                m.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+                m.setblocking(False)
+                socks.append(m)
+            except OSError:
+                pass
+        return socks
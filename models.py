@@ -2,12 +2,15 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class Host:
     ip: str
     hostname: Optional[str] = None
     mac: str = ""
     vendor: str = ""
+    # set when one run covers several interfaces/subnets: where the host was found
+    interface: str = ""
+    subnet: str = ""
 
     def merge_from(self, other: "Host") -> None:
         if not self.mac and other.mac:
@@ -16,3 +19,5 @@ class Host:
             self.vendor = other.vendor
         if not self.hostname and other.hostname:
             self.hostname = other.hostname
+        if not self.subnet and other.subnet:
+            self.interface, self.subnet = other.interface, other.subnet
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import asyncio
+import random
+import struct
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+NB_PORT = 137
+TYPE_NBSTAT = 0x21
+FLAG_GROUP = 0x8000
+
+@dataclass
+class NbstatInfo:
+    name: str = ""
+    domain: str = ""
+    mac: str = ""
+
+def encode_netbios_name(name: str = "*", suffix: int = 0x00) -> bytes:
+    """First-level encoding (RFC 1002 §4.1): 16 bytes -> 32 'A'-based nibbles."""
+    raw = name.upper().encode()[:15].ljust(15, b"\x00" if name == "*" else b" ") + bytes([suffix])
+    encoded = bytes(b for c in raw for b in (0x41 + (c >> 4), 0x41 + (c & 0x0F)))
+    return bytes([32]) + encoded + b"\x00"
+
+def build_nbstat_query(txid: int) -> bytes:
+    return struct.pack("!HHHHHH", txid, 0, 1, 0, 0, 0) + encode_netbios_name("*") + struct.pack("!HH", TYPE_NBSTAT, 1)
+
+def parse_nbstat_response(data: bytes) -> Tuple[int, Optional[NbstatInfo]]:
+    """Returns (txid, info); info is None if the packet is not a usable NBSTAT answer."""
+    if len(data) < 12:
+        return -1, None
+    txid, flags, _qd, an = struct.unpack("!HHHH", data[:8])
+    if not flags & 0x8000 or an < 1:
+        return txid, None
+    offset = 12
+    if offset < len(data) and data[offset] & 0xC0 == 0xC0:
+        offset += 2
+    else:
+        while offset < len(data) and data[offset] != 0:
+            offset += data[offset] + 1
+        offset += 1
+    if offset + 11 > len(data):
+        return txid, None
+    rtype, _rclass, _ttl, _rdlen, count = struct.unpack("!HHIHB", data[offset:offset + 11])
+    if rtype != TYPE_NBSTAT:
+        return txid, None
+    offset += 11
+    info = NbstatInfo()
+    for _ in range(count):
+        if offset + 18 > len(data):
+            return txid, None
+        name = data[offset:offset + 15].decode("ascii", errors="replace").rstrip(" \x00")
+        suffix = data[offset + 15]
+        nflags = struct.unpack("!H", data[offset + 16:offset + 18])[0]
+        offset += 18
+        if suffix != 0x00 or not name:
+            continue
+        if nflags & FLAG_GROUP:
+            info.domain = info.domain or name
+        else:
+            info.name = info.name or name
+    mac = data[offset:offset + 6]
+    if len(mac) == 6 and any(mac):
+        info.mac = ":".join(f"{b:02x}" for b in mac)
+    return txid, info
+
+class _NbstatProtocol(asyncio.DatagramProtocol):
+    def __init__(self) -> None:
+        self.pending: Dict[Tuple[str, int], asyncio.Future] = {}
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        txid, info = parse_nbstat_response(data)
+        fut = self.pending.get((addr[0], txid))
+        if fut is not None and not fut.done() and info is not None:
+            fut.set_result(info)
+
+    def error_received(self, exc) -> None:
+        pass
+
+class NetbiosResolver:
+    """
+    Native NetBIOS node-status (NBSTAT, UDP 137) lookups for a list of
+    live IPs: one socket, bounded in-flight requests, per-request retries.
+    """
+
+    def __init__(self, *, port: int = NB_PORT, timeout: float = 1.0, retries: int = 1, max_inflight: int = 64):
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.max_inflight = max(1, max_inflight)
+
+    def resolve(self, ips: Iterable[str], deadline: Optional[float] = None) -> Tuple[Dict[str, NbstatInfo], int]:
+        """Blocking wrapper; returns (infos, number of lookups cut off by `deadline`)."""
+        return asyncio.run(self.resolve_many(ips, deadline))
+
+    async def resolve_many(self, ips: Iterable[str], deadline: Optional[float] = None) -> Tuple[Dict[str, NbstatInfo], int]:
+        ips = list(dict.fromkeys(ips))
+        if not ips:
+            return {}, 0
+        loop = asyncio.get_running_loop()
+        transport, proto = await loop.create_datagram_endpoint(_NbstatProtocol, local_addr=("0.0.0.0", 0))
+        infos: Dict[str, NbstatInfo] = {}
+        queued = iter(ips)
+        finished = 0
+
+        async def worker() -> None:
+            nonlocal finished
+            for ip in queued:
+                info = await self._query(loop, transport, proto, ip)
+                finished += 1
+                if info is not None:
+                    infos[ip] = info
+
+        # a fixed set of workers, as in rdns.PtrResolver: cancelling a task
+        # per queued address made the deadline overrun by seconds
+        workers: List[asyncio.Future] = [asyncio.ensure_future(worker())
+                                         for _ in range(min(self.max_inflight, len(ips)))]
+        try:
+            _, not_done = await asyncio.wait(workers, timeout=deadline)
+            for t in not_done:
+                t.cancel()
+            return infos, len(ips) - finished
+        finally:
+            transport.close()
+
+    async def _query(self, loop, transport, proto: _NbstatProtocol, ip: str) -> Optional[NbstatInfo]:
+        for _ in range(self.retries + 1):
+            key = (ip, random.randrange(0x10000))
+            fut = loop.create_future()
+            proto.pending[key] = fut
+            try:
+                transport.sendto(build_nbstat_query(key[1]), (ip, self.port))
+                return await asyncio.wait_for(fut, self.timeout)
+            except (asyncio.TimeoutError, OSError):
+                continue
+            finally:
+                proto.pending.pop(key, None)
+        return None
@@ -0,0 +1,234 @@
+from __future__ import annotations
+import csv
+import io
+import mmap
+import os
+import re
+import struct
+import sys
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Index layout (little-endian):
+#   header   MAGIC, then (count, offset) for the 36-, 28- and 24-bit
+#            sections (MA-S, MA-M, MA-L), then (offset, size) of the names
+#   sections sorted u64 entries: prefix << 24 | offset of the name
+#   names    u8 length + UTF-8 bytes, deduplicated
+MAGIC = b"LNOUI\x00\x01\x00"
+PREFIX_BITS = (36, 28, 24)  # longest prefix first
+_HEADER = struct.Struct("<8s" + "II" * len(PREFIX_BITS) + "II")
+_ENTRY = struct.Struct("<Q")
+_NAME_BITS = 24
+
+# well-known copies of the IEEE registries shipped by distributions
+SYSTEM_SOURCES = (
+    "/usr/share/ieee-data/oui.csv",
+    "/usr/share/ieee-data/mam.csv",
+    "/usr/share/ieee-data/oui36.csv",
+    "/usr/share/arp-scan/ieee-oui.txt",
+    "/usr/share/arp-scan/ieee-iab.txt",
+    "/usr/share/wireshark/manuf",
+    "/usr/share/nmap/nmap-mac-prefixes",
+    "/usr/share/misc/oui.txt",
+)
+
+_HEX_LINE = re.compile(r"^([0-9A-Fa-f]{2})-([0-9A-Fa-f]{2})-([0-9A-Fa-f]{2})\s+\(hex\)\s*(.*)$")
+_BASE16_LINE = re.compile(r"^([0-9A-Fa-f]{6})(?:-([0-9A-Fa-f]{6}))?\s+\(base 16\)\s*(.*)$")
+_PLAIN_LINE = re.compile(r"^([0-9A-Fa-f]{6}|[0-9A-Fa-f]{7}|[0-9A-Fa-f]{9})\s+(\S.*)$")
+_HEX12 = re.compile(r"[0-9A-Fa-f]{12}")
+_MANUF_LINE = re.compile(r"^((?:[0-9A-Fa-f]{2}[:\-.]){2,5}[0-9A-Fa-f]{2})(?:/(\d+))?\s+(\S+)(?:\s+(\S.*))?$")
+
+def default_index_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "localnet", "oui.idx")
+
+def mac_value(mac: str) -> Optional[int]:
+    """48-bit value of a MAC in any common notation (aa:bb:.., AA-BB-.., aabb.ccdd.eeff)."""
+    digits = (mac or "").replace(":", "").replace("-", "").replace(".", "")
+    if not _HEX12.fullmatch(digits):
+        return None
+    return int(digits, 16)
+
+def _clean(name: str) -> str:
+    return " ".join(name.split())
+
+def parse_registry(text: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    Yield (prefix bits, prefix, organisation) from an IEEE registry export:
+    the CSV files (oui.csv, mam.csv, oui36.csv), the oui.txt/mam.txt/
+    oui36.txt listings, arp-scan/nmap style "HEX<space>Name" files and
+    Wireshark's manuf file.
+    """
+    if text.startswith(("Registry,", "\ufeffRegistry,")):
+        for row in csv.DictReader(io.StringIO(text.lstrip("\ufeff"))):
+            assignment = (row.get("Assignment") or "").strip()
+            name = _clean(row.get("Organization Name") or "")
+            if name and len(assignment) in (6, 7, 9):
+                try:
+                    yield len(assignment) * 4, int(assignment, 16), name
+                except ValueError:
+                    continue
+        return
+
+    block: Optional[int] = None  # 24-bit block of the last "(hex)" line
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        m = _HEX_LINE.match(line)
+        if m:
+            block = int("".join(m.group(1, 2, 3)), 16)
+            continue
+        m = _BASE16_LINE.match(line)
+        if m:
+            start, end, name = m.group(1), m.group(2), _clean(m.group(3))
+            if not name:
+                continue
+            if end is None:
+                yield 24, int(start, 16), name
+            elif block is not None:
+                # MA-M / MA-S: the range fixes the first 1 or 3 hex digits after the block
+                fixed = len(os.path.commonprefix([start.upper(), end.upper()]))
+                if fixed in (1, 3):
+                    yield 24 + 4 * fixed, (block << (4 * fixed)) | int(start[:fixed], 16), name
+            continue
+        m = _MANUF_LINE.match(line)
+        if m:
+            octets = re.split(r"[:\-.]", m.group(1))
+            bits = int(m.group(2)) if m.group(2) else 8 * len(octets)
+            if bits in PREFIX_BITS:
+                value = int("".join(octets), 16) << (48 - 8 * len(octets))
+                yield bits, value >> (48 - bits), _clean(m.group(4) or m.group(3))
+            continue
+        m = _PLAIN_LINE.match(line)
+        if m:
+            yield len(m.group(1)) * 4, int(m.group(1), 16), _clean(m.group(2))
+
+def build_index(sources: Iterable[str], path: Optional[str] = None) -> int:
+    """Compile registry files into an index at `path` (atomically); returns the number of prefixes."""
+    path = path or default_index_path()
+    prefixes: Dict[Tuple[int, int], str] = {}
+    for source in sources:
+        with open(source, encoding="utf-8", errors="replace") as f:
+            for bits, prefix, name in parse_registry(f.read()):
+                prefixes.setdefault((bits, prefix), name)  # earlier sources win
+
+    names = bytearray()
+    name_offsets: Dict[str, int] = {}
+    sections: List[List[int]] = [[] for _ in PREFIX_BITS]
+    for (bits, prefix), name in sorted(prefixes.items()):
+        if name not in name_offsets:
+            raw = name.encode("utf-8")[:255]
+            name_offsets[name] = len(names)
+            names += bytes([len(raw)]) + raw
+            if len(names) >= 1 << _NAME_BITS:
+                raise ValueError("vendor names exceed the index name table")
+        sections[PREFIX_BITS.index(bits)].append(prefix << _NAME_BITS | name_offsets[name])
+
+    header: List[int] = []
+    body = bytearray()
+    offset = _HEADER.size
+    for entries in sections:
+        header += [len(entries), offset + len(body)]
+        for entry in sorted(entries):
+            body += _ENTRY.pack(entry)
+    header += [offset + len(body), len(names)]
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, *header))
+        f.write(body)
+        f.write(names)
+    os.replace(tmp, path)
+    return len(prefixes)
+
+class OuiDatabase:
+    """
+    Vendor lookup on a compiled index: the file is memory-mapped (opening
+    costs one header read) and each lookup is a binary search per prefix
+    length, longest (MA-S) first. Locally administered MACs have no vendor.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            fields = _HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            self._mm.close()
+            raise ValueError(f"{path}: not an OUI index")
+        if fields[0] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path}: not an OUI index")
+        self.path = path
+        self._view = memoryview(self._mm)
+        self._sections = []
+        for i, bits in enumerate(PREFIX_BITS):
+            count, offset = fields[1 + 2 * i], fields[2 + 2 * i]
+            if sys.byteorder == "little":
+                entries = self._view[offset:offset + count * _ENTRY.size].cast("Q")
+            else:
+                entries = _BigEndianEntries(self._view, offset, count)
+            self._sections.append((bits, entries))
+        self._names_offset = fields[-2]
+        self._cache: Dict[int, Optional[str]] = {}
+
+    @classmethod
+    def open(cls, path: Optional[str] = None) -> Optional["OuiDatabase"]:
+        """The index at `path` (default location if None), or None when there is none."""
+        try:
+            return cls(path or default_index_path())
+        except (OSError, ValueError):
+            return None
+
+    def __len__(self) -> int:
+        return sum(len(entries) for _bits, entries in self._sections)
+
+    def lookup(self, mac: str) -> Optional[str]:
+        value = mac_value(mac)
+        if value is None or value >> 40 & 0x02:  # locally administered / randomised
+            return None
+        key36 = value >> 12
+        if key36 in self._cache:
+            return self._cache[key36]
+        name = None
+        for bits, entries in self._sections:
+            key = value >> (48 - bits)
+            i = bisect_left(entries, key << _NAME_BITS)
+            if i < len(entries) and entries[i] >> _NAME_BITS == key:
+                name = self._name(entries[i] & ((1 << _NAME_BITS) - 1))
+                break
+        self._cache[key36] = name
+        return name
+
+    def _name(self, offset: int) -> str:
+        start = self._names_offset + offset
+        length = self._mm[start]
+        return bytes(self._view[start + 1:start + 1 + length]).decode("utf-8", errors="replace")
+
+    def close(self) -> None:
+        for _bits, entries in self._sections:
+            if isinstance(entries, memoryview):
+                entries.release()
+        self._sections = []
+        self._view.release()
+        self._mm.close()
+
+    def __enter__(self) -> "OuiDatabase":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class _BigEndianEntries:
+    """Section accessor for big-endian hosts, where the u64 view cannot be cast directly."""
+
+    def __init__(self, view: memoryview, offset: int, count: int):
+        self.view, self.offset, self.count = view, offset, count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> int:
+        return _ENTRY.unpack_from(self.view, self.offset + i * _ENTRY.size)[0]
@@ -1,30 +1,119 @@
 from __future__ import annotations
 import json
-from typing import List
+from collections.abc import Collection
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, TextIO
+from inventory import InventoryDiff
 from models import Host
 
-def output_table(hosts: List[Host]) -> str:
-    rows = [["IP", "Hostname", "MAC", "Vendor"]]
-    for h in hosts:
-        rows.append([h.ip, h.hostname or "", h.mac or "", h.vendor or ""])
-    widths = [max(len(str(r[i])) for r in rows) for i in range(4)]
-    lines = []
-    for r in rows:
-        lines.append("  ".join(str(r[i]).ljust(widths[i]) for i in range(4)))
-    return "\n".join(lines)
+# Hosts tagged with the interface/subnet they were found on (multi-network
+# runs) get two extra columns/keys; single-network output is unchanged.
+
+def host_dict(h: Host) -> Dict[str, str]:
+    d = dict(ip=h.ip, hostname=h.hostname or "", mac=h.mac or "", vendor=h.vendor or "")
+    if h.subnet:
+        d.update(interface=h.interface, subnet=h.subnet)
+    return d
+
+def _csv_line(h: Host, tagged: bool = False) -> str:
+    line = f"{h.ip},{h.hostname or ''},{h.mac or ''},{h.vendor or ''}"
+    return f"{line},{h.interface},{h.subnet}" if tagged else line
+
+def _csv_header(tagged: bool) -> str:
+    return "ip,hostname,mac,vendor,interface,subnet" if tagged else "ip,hostname,mac,vendor"
+
+def _reiterable(hosts: Iterable[Host]) -> Iterable[Host]:
+    # a HostTable (or list) can be walked twice; only one-shot iterators are copied
+    return hosts if isinstance(hosts, Collection) else list(hosts)
+
+def output_table(hosts: Iterable[Host]) -> str:
+    hosts = _reiterable(hosts)
+    tagged = any(h.subnet for h in hosts)
+    header = ["IP", "Hostname", "MAC", "Vendor"] + (["Interface", "Subnet"] if tagged else [])
+
+    def rows() -> Iterator[List[str]]:
+        yield header
+        for h in hosts:
+            yield [h.ip, h.hostname or "", h.mac or "", h.vendor or ""] + ([h.interface, h.subnet] if tagged else [])
+
+    # two passes (column widths, then lines) instead of holding every row
+    widths = [0] * len(header)
+    for r in rows():
+        widths = [max(w, len(cell)) for w, cell in zip(widths, r)]
+    return "\n".join("  ".join(cell.ljust(w) for cell, w in zip(r, widths)) for r in rows())
 
-def output_csv(hosts: List[Host]) -> str:
-    lines = ["ip,hostname,mac,vendor"]
+def output_csv(hosts: Iterable[Host]) -> str:
+    hosts = _reiterable(hosts)
+    tagged = any(h.subnet for h in hosts)
+    lines = [_csv_header(tagged)]
     for h in hosts:
-        lines.append(f"{h.ip},{h.hostname or ''},{h.mac or ''},{h.vendor or ''}")
+        lines.append(_csv_line(h, tagged))
     return "\n".join(lines)
 
-def output_json(hosts: List[Host]) -> str:
-    payload = [dict(ip=h.ip, hostname=h.hostname or "", mac=h.mac or "", vendor=h.vendor or "") for h in hosts]
+def output_json(hosts: Iterable[Host]) -> str:
+    payload = [host_dict(h) for h in hosts]
     return json.dumps(payload, indent=2)
 
-def output_ansible(hosts: List[Host]) -> str:
+def output_ansible(hosts: Iterable[Host]) -> str:
     lines = ["[scanned]"]
     for h in hosts:
         lines.append(h.hostname or h.ip)
     return "\n".join(lines)
+
+# Streaming writers: consume an iterable (e.g. DiscoveryPipeline.discover_iter)
+# and write each record as it arrives instead of building the whole string.
+
+def write_ndjson(hosts: Iterable[Host], out: TextIO) -> int:
+    n = 0
+    for h in hosts:
+        out.write(json.dumps(host_dict(h)) + "\n")
+        out.flush()
+        n += 1
+    return n
+
+def write_csv(hosts: Iterable[Host], out: TextIO) -> int:
+    """The columns follow the first host: a multi-network run tags every host."""
+    hosts = iter(hosts)
+    first = next(hosts, None)
+    tagged = bool(first is not None and first.subnet)
+    out.write(_csv_header(tagged) + "\n")
+    n = 0
+    for h in chain([first] if first is not None else [], hosts):
+        out.write(_csv_line(h, tagged) + "\n")
+        out.flush()
+        n += 1
+    return n
+
+def write_json(hosts: Iterable[Host], out: TextIO) -> int:
+    """Same document as `output_json`, written one element at a time."""
+    n = 0
+    for h in hosts:
+        body = json.dumps(host_dict(h), indent=2).replace("\n", "\n  ")
+        out.write(("[\n  " if n == 0 else ",\n  ") + body)
+        out.flush()
+        n += 1
+    out.write("\n]\n" if n else "[]\n")
+    return n
+
+def output_diff(diff: InventoryDiff, fmt: str = "table") -> str:
+    if fmt in ("json", "ndjson"):
+        events = [dict(change="appeared", **host_dict(h)) for h in diff.appeared]
+        events += [dict(change="disappeared", **host_dict(h)) for h in diff.disappeared]
+        events += [dict(change="changed", **host_dict(new), before=host_dict(old)) for old, new in diff.changed]
+        if fmt == "ndjson":
+            return "\n".join(json.dumps(e) for e in events)
+        return json.dumps(events, indent=2)
+    lines = []
+    for h in diff.appeared:
+        lines.append(f"+ {h.ip}  {h.hostname or ''}  {h.mac or ''}  {h.vendor or ''}".rstrip())
+    for h in diff.disappeared:
+        lines.append(f"- {h.ip}  {h.hostname or ''}  {h.mac or ''}".rstrip())
+    for old, new in diff.changed:
+        changes = [
+            f"{label}: {a or '-'} -> {b or '-'}"
+            for label, a, b in (("hostname", old.hostname, new.hostname), ("mac", old.mac, new.mac),
+                                ("vendor", old.vendor, new.vendor))
+            if (a or "").lower() != (b or "").lower()
+        ]
+        lines.append(f"~ {new.ip}  " + ", ".join(changes))
+    return "\n".join(lines)
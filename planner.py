@@ -0,0 +1,250 @@
+from __future__ import annotations
+import ipaddress
+import threading
+import time
+from dataclasses import dataclass
+from typing import Collection, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+import stats
+from inventory import InventoryStore
+
+# A step is one scanner (by class name) or one name source ("mdns",
+# "netbios", "rdns"). Per subnet, the history keeps for every step a moving
+# average of its wall time (`cost`) and of what it contributed (`gain`): the
+# hosts it was the first active scanner in run order to find, or the names
+# that source resolved (sources run in order, so the first one wins there
+# too). Passive scanners only count hosts no active scanner found, since
+# the ARP cache and the listener mostly see what the active sweeps stirred.
+MIN_COST = 0.05  # seconds; keeps near-free steps from dividing by zero
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS step_stats (
+    subnet TEXT NOT NULL,
+    step TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    gain REAL NOT NULL DEFAULT 0,
+    last_run REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (subnet, step)
+);
+CREATE TABLE IF NOT EXISTS plan_runs (
+    subnet TEXT PRIMARY KEY,
+    since_full INTEGER NOT NULL DEFAULT 0,
+    last_full REAL NOT NULL DEFAULT 0
+);
+"""
+
+@dataclass
+class StepStats:
+    step: str
+    runs: int = 0
+    cost: float = 0.0
+    gain: float = 0.0
+    last_run: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Expected gain per second."""
+        return self.gain / max(self.cost, MIN_COST)
+
+class Plan(NamedTuple):
+    """Steps to run for one subnet, in order; `full` runs everything to refresh the statistics."""
+    scanners: List[str]
+    resolvers: List[str]
+    skipped: List[str]
+    full: bool
+
+class ScanHistory:
+    """
+    Step statistics per subnet, stored next to the hosts in the inventory
+    database. Averages are exponentially weighted (`alpha` for the newest
+    run) so they follow a network that changes.
+    """
+
+    def __init__(self, inventory: InventoryStore, *, alpha: float = 0.3):
+        self.inventory = inventory
+        self.alpha = alpha
+        with inventory.lock:
+            inventory.db.executescript(_SCHEMA)
+
+    def steps(self, subnet: str) -> Dict[str, StepStats]:
+        with self.inventory.lock:
+            rows = self.inventory.db.execute(
+                "SELECT step, runs, cost, gain, last_run FROM step_stats WHERE subnet = ?", (_key(subnet),)
+            ).fetchall()
+        return {row[0]: StepStats(*row) for row in rows}
+
+    def since_full(self, subnet: str) -> Tuple[int, float]:
+        """(runs since the last full scan, time of the last full scan; 0 = never)."""
+        with self.inventory.lock:
+            row = self.inventory.db.execute(
+                "SELECT since_full, last_full FROM plan_runs WHERE subnet = ?", (_key(subnet),)
+            ).fetchone()
+        return (row[0], row[1]) if row else (0, 0.0)
+
+    def record(
+        self, subnet: str, observations: Dict[str, Tuple[float, int]], full: bool, now: Optional[float] = None,
+    ) -> None:
+        """Fold this run's (duration, gain) per step into the averages."""
+        now = time.time() if now is None else now
+        key = _key(subnet)
+        a = self.alpha
+        with self.inventory.lock, self.inventory.db as db:
+            for step, (cost, gain) in observations.items():
+                db.execute(
+                    """
+                    INSERT INTO step_stats (subnet, step, runs, cost, gain, last_run) VALUES (?, ?, 1, ?, ?, ?)
+                    ON CONFLICT (subnet, step) DO UPDATE SET
+                        runs = runs + 1,
+                        cost = ? * excluded.cost + (1 - ?) * cost,
+                        gain = ? * excluded.gain + (1 - ?) * gain,
+                        last_run = excluded.last_run
+                    """,
+                    (key, step, cost, gain, now, a, a, a, a),
+                )
+            if full:
+                db.execute(
+                    "INSERT INTO plan_runs (subnet, since_full, last_full) VALUES (?, 0, ?)"
+                    " ON CONFLICT (subnet) DO UPDATE SET since_full = 0, last_full = excluded.last_full",
+                    (key, now),
+                )
+            else:
+                db.execute(
+                    "INSERT INTO plan_runs (subnet, since_full, last_full) VALUES (?, 1, 0)"
+                    " ON CONFLICT (subnet) DO UPDATE SET since_full = since_full + 1",
+                    (key,),
+                )
+
+class AdaptivePlanner:
+    """
+    Chooses the steps of a discovery run from the subnet's history. Steps
+    with fewer than `min_runs` observations always run, as do `required`
+    ones (passive listeners, the ARP cache seed). Learned steps run in
+    order of expected gain per second, and are skipped when they add less
+    than `min_gain` on average or would push the estimated run time past
+    `deadline`. Scanners count by their longest member when they run in
+    parallel and add up otherwise; name sources always add up. Every
+    `full_every` runs, or after `full_after` seconds, a full run measures
+    every step again so skipped ones can come back.
+    """
+
+    def __init__(
+        self,
+        history: ScanHistory,
+        *,
+        deadline: Optional[float] = None,
+        full_every: int = 10,
+        full_after: float = 86400.0,
+        min_runs: int = 2,
+        min_gain: float = 0.05,
+    ):
+        self.history = history
+        self.deadline = deadline
+        self.full_every = max(1, full_every)
+        self.full_after = full_after
+        self.min_runs = min_runs
+        self.min_gain = min_gain
+
+    def plan(
+        self,
+        subnet: str,
+        scanners: Sequence[str],
+        resolvers: Sequence[str],
+        *,
+        required: Collection[str] = (),
+        sequential: bool = False,
+        now: Optional[float] = None,
+    ) -> Plan:
+        now = time.time() if now is None else now
+        since_full, last_full = self.history.since_full(subnet)
+        if not last_full or since_full + 1 >= self.full_every or now - last_full >= self.full_after:
+            plan = Plan(list(scanners), list(resolvers), [], True)
+            stats.emit("plan", subnet=subnet, full=True, steps=plan.scanners + plan.resolvers, skipped=[])
+            return plan
+
+        learned = {n: s for n, s in self.history.steps(subnet).items() if s.runs >= self.min_runs}
+
+        def fixed(name: str) -> bool:
+            return name in required or name not in learned
+
+        # steps still being learned (and required ones) first, in configured order
+        candidates = [n for n in list(scanners) + list(resolvers) if fixed(n)]
+        candidates += sorted((n for n in list(scanners) + list(resolvers) if not fixed(n)),
+                             key=lambda n: -learned[n].rate)
+        chosen: Set[str] = set()
+        skipped: List[str] = []
+        scan_costs: List[float] = []
+        enrich_cost = 0.0
+        for name in candidates:
+            step = learned.get(name)
+            cost = step.cost if step is not None else 0.0
+            is_scanner = name in scanners
+            if not fixed(name):
+                if step.gain < self.min_gain:
+                    skipped.append(name)
+                    continue
+                if self.deadline is not None:
+                    with_step = scan_costs + [cost] if is_scanner else scan_costs
+                    scan = sum(with_step) if sequential else max(with_step, default=0.0)
+                    if scan + enrich_cost + (0.0 if is_scanner else cost) > self.deadline:
+                        skipped.append(name)
+                        continue
+            chosen.add(name)
+            if is_scanner:
+                scan_costs.append(cost)
+            else:
+                enrich_cost += cost
+
+        plan = Plan(
+            [n for n in candidates if n in chosen and n in scanners],
+            [n for n in candidates if n in chosen and n in resolvers],
+            skipped,
+            False,
+        )
+        stats.emit("plan", subnet=subnet, full=False, steps=plan.scanners + plan.resolvers, skipped=skipped)
+        return plan
+
+    def record(self, subnet: str, plan: Plan, observations: Dict[str, Tuple[float, int]]) -> None:
+        self.history.record(subnet, observations, plan.full)
+
+class StepLog:
+    """
+    Collects what each scanner of one run reported, from any thread: its
+    wall time (first start to last finish, over shards and retries) and
+    the addresses it found.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[str, List[float]] = {}
+        self._found: Dict[str, Set[str]] = {}
+
+    def add(self, step: str, start: float, end: float, ips: Iterable[str]) -> None:
+        with self._lock:
+            span = self._spans.setdefault(step, [start, end])
+            span[0], span[1] = min(span[0], start), max(span[1], end)
+            self._found.setdefault(step, set()).update(ips)
+
+    def observations(self, order: Sequence[str]) -> Dict[str, Tuple[float, int]]:
+        """
+        (wall time, gain) per step. Each address is credited to the first
+        step of `order` (the active scanners in run order) that found it;
+        addresses none of them found go to the other step that did, if it
+        is the only one.
+        """
+        rank = {step: i for i, step in enumerate(order)}
+        with self._lock:
+            finders: Dict[str, List[str]] = {}
+            for step, ips in self._found.items():
+                for ip in ips:
+                    finders.setdefault(ip, []).append(step)
+            gain = {step: 0 for step in self._spans}
+            for steps in finders.values():
+                ranked = [step for step in steps if step in rank]
+                if ranked:
+                    gain[min(ranked, key=rank.__getitem__)] += 1
+                elif len(steps) == 1:
+                    gain[steps[0]] += 1
+            return {step: (end - start, gain[step]) for step, (start, end) in self._spans.items()}
+
+def _key(subnet: str) -> str:
+    return str(ipaddress.ip_network(subnet, strict=False))
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import asyncio
+import random
+from typing import Dict, Iterable, Optional, Tuple
+from dnsproto import RCODE_NXDOMAIN, TYPE_PTR, build_query, parse_message, reverse_name
+
+def read_resolv_conf(path: str = "/etc/resolv.conf") -> Optional[str]:
+    """First `nameserver` entry of resolv.conf, or None."""
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    return parts[1].split("%")[0]
+    except OSError:
+        pass
+    return None
+
+class _PtrProtocol(asyncio.DatagramProtocol):
+    def __init__(self) -> None:
+        self.pending: Dict[int, Tuple[str, asyncio.Future]] = {}
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            msg = parse_message(data)
+        except (ValueError, UnicodeError):
+            return
+        slot = self.pending.get(msg.txid)
+        if slot is None or not msg.is_response:
+            return
+        qname, fut = slot
+        # guard against stray/late answers reusing a transaction ID
+        if not msg.questions or msg.questions[0][0].lower() != qname.lower() or fut.done():
+            return
+        if msg.rcode == RCODE_NXDOMAIN:
+            fut.set_result(None)
+            return
+        if msg.rcode != 0:
+            return  # let the retry logic have another go
+        name = next((a.value for a in msg.answers if a.rtype == TYPE_PTR), None)
+        fut.set_result(name.rstrip(".") if name else None)
+
+    def error_received(self, exc) -> None:
+        pass
+
+class PtrResolver:
+    """
+    Batched asyncio reverse-DNS resolver: pipelines in-addr.arpa PTR queries
+    over one UDP socket, matches answers by transaction ID and question,
+    and retries unanswered queries.
+    """
+
+    def __init__(
+        self,
+        server: Optional[str] = None,
+        *,
+        port: int = 53,
+        timeout: float = 1.0,
+        retries: int = 2,
+        max_inflight: int = 256,
+    ):
+        self.server = server or read_resolv_conf()
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.max_inflight = max(1, max_inflight)
+
+    def resolve(self, ips: Iterable[str], deadline: Optional[float] = None) -> Tuple[Dict[str, str], int]:
+        """Blocking wrapper; returns (names, number of lookups cut off by `deadline`)."""
+        return asyncio.run(self.resolve_many(ips, deadline))
+
+    async def resolve_many(self, ips: Iterable[str], deadline: Optional[float] = None) -> Tuple[Dict[str, str], int]:
+        ips = list(dict.fromkeys(ips))
+        if not ips or not self.server:
+            return {}, 0
+        loop = asyncio.get_running_loop()
+        transport, proto = await loop.create_datagram_endpoint(
+            _PtrProtocol, remote_addr=(self.server, self.port)
+        )
+        names: Dict[str, str] = {}
+        queued = iter(ips)
+        finished = 0
+
+        async def worker() -> None:
+            nonlocal finished
+            for ip in queued:
+                name = await self._query(loop, transport, proto, ip)
+                finished += 1
+                if name:
+                    names[ip] = name
+
+        # max_inflight workers share the queue rather than one task per
+        # address: cancelling tens of thousands of tasks parked on a
+        # semaphore at the deadline took longer than the lookups themselves
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(self.max_inflight, len(ips)))]
+        try:
+            _, not_done = await asyncio.wait(workers, timeout=deadline)
+            for t in not_done:
+                t.cancel()
+            return names, len(ips) - finished
+        finally:
+            transport.close()
+
+    async def _query(self, loop, transport, proto: _PtrProtocol, ip: str) -> Optional[str]:
+        qname = reverse_name(ip)
+        for _ in range(self.retries + 1):
+            txid = random.randrange(0x10000)
+            while txid in proto.pending:
+                txid = random.randrange(0x10000)
+            fut = loop.create_future()
+            proto.pending[txid] = (qname, fut)
+            try:
+                transport.sendto(build_query(txid, [(qname, TYPE_PTR)]))
+                return await asyncio.wait_for(fut, self.timeout)
+            except asyncio.TimeoutError:
+                continue
+            finally:
+                proto.pending.pop(txid, None)
+        return None
@@ -1,58 +1,106 @@
 from __future__ import annotations
 import re
 import socket
-from typing import Dict, Optional
-from utils import run, which
-
-def probe_ip_neigh_one(ip: str) -> Dict[str, str]:
-    if which("ip"):
-        rc, out, _ = run(["ip", "neigh", "show", ip])
-        if rc == 0 and out:
-            lines = [l.strip() for l in out.splitlines() if l.strip()]
-            line = next((l for l in lines if l.startswith(ip)), lines[0])
-            tokens = line.split()
-            res = {"ip": ip, "mac": "", "dev": "", "state": ""}
-            try:
-                i = tokens.index("dev")
-                if i + 1 < len(tokens): res["dev"] = tokens[i + 1]
-            except ValueError:
-                pass
-            try:
-                j = tokens.index("lladdr")
-                if j + 1 < len(tokens): res["mac"] = tokens[j + 1]
-            except ValueError:
-                pass
-            for t in reversed(tokens):
-                if t.isupper():
-                    res["state"] = t
-                    break
-            if not res["state"] and tokens:
-                res["state"] = tokens[-1]
-            return res
-
-    if which("arp"):
-        rc, out, _ = run(["arp", "-an"])
-        if rc == 0 and out:
-            for line in out.splitlines():
-                if ip in line:
-                    m = re.search(r"([0-9A-Fa-f:]{17})", line)
-                    mac = m.group(1) if m else ""
-                    return {"ip": ip, "mac": mac, "dev": "", "state": ""}
-    return {"ip": ip, "mac": "", "dev": "", "state": ""}
-
-def list_ip_neigh_all() -> list[str]:
-    ips: list[str] = []
-    if which("ip"):
+from typing import Dict, Iterator, Optional, Tuple
+from utils import LineStream, run, which
+
+_IPV4_RE = re.compile(r"^\d+\.\d+\.\d+\.\d+$")
+_MAC_RE = re.compile(r"^[0-9A-Fa-f]{2}(:[0-9A-Fa-f]{2}){5}$")
+
+NeighTable = Dict[str, Dict[str, str]]
+
+def _neigh_entry(ip: str, mac: str = "", dev: str = "", state: str = "") -> Dict[str, str]:
+    return {"ip": ip, "mac": mac, "dev": dev, "state": state}
+
+def _parse_ip_neigh(raw: str) -> NeighTable:
+    table: NeighTable = {}
+    for line in raw.splitlines():
+        tokens = line.split()
+        if not tokens or not _IPV4_RE.match(tokens[0]):
+            continue
+        entry = _neigh_entry(tokens[0])
+        if "dev" in tokens:
+            i = tokens.index("dev")
+            if i + 1 < len(tokens): entry["dev"] = tokens[i + 1]
+        if "lladdr" in tokens:
+            j = tokens.index("lladdr")
+            if j + 1 < len(tokens): entry["mac"] = tokens[j + 1]
+        for t in reversed(tokens):
+            if t.isupper():
+                entry["state"] = t
+                break
+        if not entry["state"]:
+            entry["state"] = tokens[-1]
+        table[tokens[0]] = entry
+    return table
+
+def _parse_proc_net_arp(raw: str) -> NeighTable:
+    # IP address  HW type  Flags  HW address  Mask  Device
+    table: NeighTable = {}
+    for line in raw.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) < 6 or not _IPV4_RE.match(parts[0]):
+            continue
+        mac = parts[3] if _MAC_RE.match(parts[3]) and parts[3] != "00:00:00:00:00:00" else ""
+        flags = int(parts[2], 16) if parts[2].startswith("0x") else 0
+        state = "PERMANENT" if flags & 0x4 else ("REACHABLE" if flags & 0x2 else "INCOMPLETE")
+        table[parts[0]] = _neigh_entry(parts[0], mac, parts[5], state)
+    return table
+
+def _parse_ip_addr(raw: str) -> Dict[str, str]:
+    """Map local IPv4 address -> device from `ip -4 -o addr show`."""
+    addrs: Dict[str, str] = {}
+    for line in raw.splitlines():
+        tokens = line.split()
+        if "inet" not in tokens or len(tokens) < 2:
+            continue
+        i = tokens.index("inet")
+        if i + 1 < len(tokens):
+            addrs[tokens[i + 1].split("/")[0]] = tokens[1].rstrip(":")
+    return addrs
+
+def _read_text(path: str) -> str:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return ""
+
+def read_neigh_table(include_local: bool = True) -> NeighTable:
+    """
+    Snapshot the kernel neighbour table once and index it by IPv4 address.
+    Uses a single `ip -4 neigh show` (falling back to /proc/net/arp); local
+    interface addresses are added with state LOCAL so the scanning host
+    gets its own MAC too.
+    """
+    table: NeighTable = {}
+    has_ip = bool(which("ip"))
+    if has_ip:
         rc, out, _ = run(["ip", "-4", "neigh", "show"])
-        if rc == 0 and out:
-            for line in out.splitlines():
-                line = line.strip()
-                if not line or "FAILED" in line:
+        if rc == 0:
+            table = _parse_ip_neigh(out)
+    if not table:
+        table = _parse_proc_net_arp(_read_text("/proc/net/arp"))
+
+    if include_local and has_ip:
+        rc, out, _ = run(["ip", "-4", "-o", "addr", "show"])
+        if rc == 0:
+            for ip, dev in _parse_ip_addr(out).items():
+                if ip.startswith("127.") or ip in table:
                     continue
-                m = re.match(r"^(\d+\.\d+\.\d+\.\d+)\b", line)
-                if m:
-                    ips.append(m.group(1))
-    return ips
+                mac = _read_text(f"/sys/class/net/{dev}/address").strip()
+                table[ip] = _neigh_entry(ip, mac, dev, "LOCAL")
+    return table
+
+def probe_ip_neigh_one(ip: str, table: Optional[NeighTable] = None) -> Dict[str, str]:
+    if table is None:
+        table = read_neigh_table()
+    return dict(table.get(ip) or _neigh_entry(ip))
+
+def list_ip_neigh_all(table: Optional[NeighTable] = None) -> list[str]:
+    if table is None:
+        table = read_neigh_table(include_local=False)
+    return [ip for ip, e in table.items() if e["state"] not in ("FAILED", "INCOMPLETE", "LOCAL")]
 
 def resolve_mdns(ip: str, timeout: int) -> Optional[str]:
     if not which("avahi-resolve-address"):
@@ -68,15 +116,20 @@ def reverse_dns(ip: str) -> Optional[str]:
     except Exception:
         return None
 
-def run_nbtscan_range(subnet: str, timeout: int) -> Dict[str, str]:
+def _parse_nbtscan_line(line: str) -> Optional[Tuple[str, str]]:
+    parts = re.split(r"\s+", line.strip())
+    if len(parts) >= 2 and _IPV4_RE.match(parts[0]):
+        return parts[0], parts[1]
+    return None
+
+def iter_nbtscan_range(subnet: str, timeout: int) -> Iterator[Tuple[str, str]]:
+    """Yield (ip, NetBIOS name) pairs as nbtscan prints them."""
     if not which("nbtscan"):
-        return {}
-    rc, out, _ = run(["nbtscan", subnet], timeout=timeout)
-    res: Dict[str, str] = {}
-    if rc != 0 or not out:
-        return res
-    for line in out.splitlines():
-        parts = re.split(r"\s+", line.strip())
-        if parts and re.match(r"^\d+\.\d+\.\d+\.\d+$", parts[0]):
-            res[parts[0]] = parts[1]
-    return res
+        return
+    for line in LineStream(["nbtscan", subnet], timeout=timeout):
+        row = _parse_nbtscan_line(line)
+        if row is not None:
+            yield row
+
+def run_nbtscan_range(subnet: str, timeout: int) -> Dict[str, str]:
+    return dict(iter_nbtscan_range(subnet, timeout))
@@ -1,10 +1,15 @@
 from .base import Scanner, HostScanner, IpScanner
 from .seed_arp import SeedArpCacheScanner
 from .arp_scan import ArpScanScanner
+from .arp import ArpSweepScanner
 from .nmap import NmapPingScanner
 from .fping import FpingSweepScanner
+from .icmp import IcmpEchoScanner
+from .tcp_connect import TcpConnectScanner
+from .passive import PassiveListenerScanner
 
 __all__ = [
     "Scanner", "HostScanner", "IpScanner",
-    "SeedArpCacheScanner", "ArpScanScanner", "NmapPingScanner", "FpingSweepScanner"
+    "SeedArpCacheScanner", "ArpScanScanner", "ArpSweepScanner", "NmapPingScanner", "FpingSweepScanner",
+    "IcmpEchoScanner", "TcpConnectScanner", "PassiveListenerScanner",
 ]
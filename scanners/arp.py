@@ -0,0 +1,210 @@
+from __future__ import annotations
+import fcntl
+import ipaddress
+import select
+import socket
+import struct
+import time
+from typing import Callable, Iterator, List, Optional, Protocol, Sequence, Tuple
+from models import Host
+
+ETH_P_ARP = 0x0806
+ETH_P_IP = 0x0800
+ARP_REQUEST = 1
+ARP_REPLY = 2
+BROADCAST = b"\xff" * 6
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891B
+
+_ARP = struct.Struct("!HHBBH6s4s6s4s")
+
+def build_arp_request(src_mac: bytes, src_ip: bytes, target_ip: bytes) -> bytes:
+    """Broadcast Ethernet frame asking who has `target_ip` (4 packed bytes)."""
+    arp = _ARP.pack(1, ETH_P_IP, 6, 4, ARP_REQUEST, src_mac, src_ip, b"\x00" * 6, target_ip)
+    return BROADCAST + src_mac + struct.pack("!H", ETH_P_ARP) + arp
+
+def parse_arp_reply(frame: bytes) -> Optional[Tuple[bytes, bytes]]:
+    """(sender IP, sender MAC) of an ARP reply frame, else None."""
+    if len(frame) < 14 + _ARP.size or frame[12:14] != b"\x08\x06":
+        return None
+    htype, ptype, hlen, plen, op, sha, spa, _tha, _tpa = _ARP.unpack_from(frame, 14)
+    if (htype, ptype, hlen, plen, op) != (1, ETH_P_IP, 6, 4, ARP_REPLY):
+        return None
+    return spa, sha
+
+class ArpTransport(Protocol):
+    """Packet I/O for the ARP engine: a link plus our own addresses on it."""
+    mac: bytes  # 6 bytes
+    ip: bytes   # 4 bytes, the sender address of our requests
+
+    def send(self, frame: bytes) -> None:
+        ...
+
+    def recv(self, timeout: float) -> List[bytes]:
+        """Frames received within `timeout` seconds (returns as soon as there are some)."""
+        ...
+
+    def close(self) -> None:
+        ...
+
+class PacketSocketTransport:
+    """AF_PACKET socket bound to `interface`, receiving ARP frames only. Needs CAP_NET_RAW."""
+
+    def __init__(self, interface: str):
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+        try:
+            self.sock.bind((interface, ETH_P_ARP))
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 21)
+            self.sock.setblocking(False)
+            self.mac = self.sock.getsockname()[4]
+            ip = _interface_address(interface, SIOCGIFADDR)
+            if ip is None:
+                raise OSError(f"{interface} has no IPv4 address")
+            self.ip = ip
+        except OSError:
+            self.sock.close()
+            raise
+
+    def send(self, frame: bytes) -> None:
+        try:
+            self.sock.send(frame)
+        except BlockingIOError:
+            pass  # transmit queue full: the target is retried like a lost reply
+
+    def recv(self, timeout: float) -> List[bytes]:
+        ready, _, _ = select.select([self.sock], [], [], max(0.0, timeout))
+        frames: List[bytes] = []
+        while ready:
+            try:
+                frames.append(self.sock.recv(2048))
+            except BlockingIOError:
+                break
+        return frames
+
+    def close(self) -> None:
+        self.sock.close()
+
+def _interface_address(interface: str, request: int) -> Optional[bytes]:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            ifreq = fcntl.ioctl(s.fileno(), request, struct.pack("256s", interface.encode()[:15]))
+        except OSError:
+            return None
+    return ifreq[20:24]
+
+def interface_for(subnet: str) -> Optional[str]:
+    """The local interface whose IPv4 network overlaps `subnet`, if any."""
+    net = ipaddress.ip_network(subnet, strict=False)
+    for _index, name in socket.if_nameindex():
+        addr = _interface_address(name, SIOCGIFADDR)
+        mask = _interface_address(name, SIOCGIFNETMASK)
+        if addr is None or mask is None or addr[0] == 127:
+            continue
+        local = ipaddress.ip_network(f"{socket.inet_ntoa(addr)}/{socket.inet_ntoa(mask)}", strict=False)
+        if local.overlaps(net):
+            return name
+    return None
+
+def open_packet_transport(interface: Optional[str], subnet: str) -> Optional[ArpTransport]:
+    try:
+        interface = interface or interface_for(subnet)
+        return PacketSocketTransport(interface) if interface else None
+    except (AttributeError, OSError):
+        return None  # not Linux, no CAP_NET_RAW, or no address on the interface
+
+TransportFactory = Callable[[Optional[str], str], Optional[ArpTransport]]
+
+class ArpSweepScanner:
+    """
+    Built-in ARP sweep without arp-scan: paced who-has broadcasts at `rate`
+    frames per second over a pluggable transport (an AF_PACKET socket by
+    default), a single receive loop matching replies to outstanding
+    targets, and resends to non-responders only. Hosts are yielded with
+    their MAC as the replies arrive. Without an interface, the one whose
+    network contains the subnet is used, so the subnet is always honoured.
+    """
+    supports_targets = True
+    supports_rate = True
+    supports_patience = True
+
+    def __init__(
+        self, *, rate: int = 1000, retries: int = 2, wait: float = 0.5,
+        transport: TransportFactory = open_packet_transport,
+    ):
+        self.rate = max(1, rate)
+        self.retries = retries
+        self.wait = wait
+        self.transport = transport
+
+    def scan_hosts(
+        self, subnet: str, *, timeout: int, interface: str | None = None, targets: Optional[Sequence[str]] = None,
+        rate: Optional[float] = None, patience: float = 1.0,
+    ) -> List[Host]:
+        return list(self.iter_hosts(subnet, timeout=timeout, interface=interface, targets=targets, rate=rate,
+                                    patience=patience))
+
+    def iter_hosts(
+        self, subnet: str, *, timeout: int, interface: str | None = None, targets: Optional[Sequence[str]] = None,
+        rate: Optional[float] = None, patience: float = 1.0,
+    ) -> Iterator[Host]:
+        """
+        `rate` lowers the send rate below the configured one, e.g. to a
+        share of a --pps budget; `patience` stretches the wait for replies.
+        """
+        if targets is None:
+            net = ipaddress.ip_network(subnet, strict=False)
+            hosts = net.hosts() if net.num_addresses > 2 else iter(net)
+            packed = [addr.packed for addr in hosts]
+        else:
+            packed = [socket.inet_aton(ip) for ip in targets]
+        if not packed:
+            return
+        link = self.transport(interface, subnet)
+        if link is None:
+            return
+        try:
+            yield from self._sweep(link, [ip for ip in packed if ip != link.ip], time.monotonic() + timeout,
+                                   rate, patience)
+        finally:
+            link.close()
+
+    def _sweep(
+        self, link: ArpTransport, targets: List[bytes], until: float, rate: Optional[float] = None,
+        patience: float = 1.0,
+    ) -> Iterator[Host]:
+        wanted = set(targets)
+        alive = set()
+        interval = 1.0 / (min(self.rate, rate) if rate else self.rate)
+        pending = targets
+
+        def drain(wait: float) -> Iterator[Host]:
+            for frame in link.recv(wait):
+                reply = parse_arp_reply(frame)
+                if reply is None:
+                    continue
+                ip, mac = reply
+                if ip in wanted and ip not in alive:
+                    alive.add(ip)
+                    yield Host(ip=socket.inet_ntoa(ip), mac=mac.hex(":"))
+
+        for _attempt in range(self.retries + 1):
+            next_send = time.monotonic()
+            for ip in pending:
+                if time.monotonic() >= until:
+                    break
+                if ip in alive:
+                    continue  # answered a previous round late
+                link.send(build_arp_request(link.mac, link.ip, ip))
+                next_send += interval
+                yield from drain(0.0)
+                while (gap := next_send - time.monotonic()) > 0:
+                    yield from drain(gap)
+            settle = min(until, time.monotonic() + self.wait * max(1.0, patience))
+            while len(alive) < len(wanted):
+                remaining = settle - time.monotonic()
+                if remaining <= 0:
+                    break
+                yield from drain(remaining)
+            pending = [ip for ip in pending if ip not in alive]
+            if not pending or time.monotonic() >= until:
+                break
@@ -1,27 +1,61 @@
 from __future__ import annotations
 import re
-from typing import List
+from typing import Iterator, List, Optional, Sequence
 from models import Host
-from utils import run, which
+from utils import LineStream, target_file, which
+
+_HOST_LINE = re.compile(r"^\d+\.\d+\.\d+\.\d+\s+([0-9A-Fa-f:]{17})")
+
+def _parse_arp_scan_line(line: str) -> Optional[Host]:
+    line = line.strip()
+    if not _HOST_LINE.match(line):
+        return None
+    parts = re.split(r"\s{2,}|\t|\s+", line, maxsplit=2)
+    ip = parts[0]
+    mac = parts[1] if len(parts) > 1 else ""
+    vendor = parts[2] if len(parts) > 2 else ""
+    return Host(ip=ip, mac=mac, vendor=vendor)
 
 def _parse_arp_scan_output(raw: str) -> List[Host]:
-    hosts: List[Host] = []
-    for line in raw.splitlines():
-        line = line.strip()
-        if re.match(r"^\d+\.\d+\.\d+\.\d+\s+([0-9A-Fa-f:]{17})", line):
-            parts = re.split(r"\s{2,}|\t|\s+", line, maxsplit=2)
-            ip = parts[0]
-            mac = parts[1] if len(parts) > 1 else ""
-            vendor = parts[2] if len(parts) > 2 else ""
-            hosts.append(Host(ip=ip, mac=mac, vendor=vendor))
-    return hosts
+    return [h for h in map(_parse_arp_scan_line, raw.splitlines()) if h is not None]
 
 class ArpScanScanner:
-    def scan_hosts(self, subnet: str, *, timeout: int, interface: str | None = None) -> List[Host]:
+    supports_targets = True
+    supports_rate = True
+    supports_patience = True
+
+    def scan_hosts(
+        self, subnet: str, *, timeout: int, interface: str | None = None, targets: Optional[Sequence[str]] = None,
+        rate: Optional[float] = None, patience: float = 1.0,
+    ) -> List[Host]:
+        return list(self.iter_hosts(subnet, timeout=timeout, interface=interface, targets=targets, rate=rate,
+                                    patience=patience))
+
+    def iter_hosts(
+        self, subnet: str, *, timeout: int, interface: str | None = None, targets: Optional[Sequence[str]] = None,
+        rate: Optional[float] = None, patience: float = 1.0,
+    ) -> Iterator[Host]:
+        """
+        Yield hosts as arp-scan prints them; on timeout the ones already
+        printed are kept. Only `subnet` (or `targets`) is probed, never the
+        whole local network, so every shard sweeps just its own addresses.
+        """
         if not which("arp-scan"):
-            return []
-        cmd = ["arp-scan", "-I", interface, subnet] if interface else ["arp-scan", "--localnet"]
-        rc, out, _ = run(cmd, timeout=timeout)
-        if rc != 0 or not out:
-            return []
-        return _parse_arp_scan_output(out)
+            return
+        # minimum gap between requests, in microseconds
+        pacing = [f"--interval={max(1, round(1e6 / rate))}u"] if rate else []
+        if patience > 1:
+            pacing.append(f"--timeout={round(500 * patience)}")  # per-host reply timeout, 500 ms by default
+        iface = ["-I", interface] if interface else []
+        if targets is None:
+            yield from self._stream(["arp-scan", *pacing, *iface, subnet], timeout)
+        elif targets:
+            with target_file(targets) as path:
+                yield from self._stream(["arp-scan", *pacing, *iface, "-f", path], timeout)
+
+    @staticmethod
+    def _stream(cmd: List[str], timeout: int) -> Iterator[Host]:
+        for line in LineStream(cmd, timeout=timeout):
+            host = _parse_arp_scan_line(line)
+            if host is not None:
+                yield host
@@ -10,5 +10,32 @@ class HostScanner(Protocol):
     def scan_hosts(self, subnet: str, *, timeout: int, interface: str | None = None) -> List[Host]:
         ...
 
+# Scanners may set a class attribute `passive = True` when they send no
+# probes (e.g. reading the neighbour cache): the pipeline then runs them
+# once per scan instead of once per shard and exempts them from the
+# packets-per-second budget.
+#
+# Scanners that can probe an explicit address list set `supports_targets =
+# True` and accept a `targets=` keyword (addresses inside `subnet`; None
+# means the whole subnet). The pipeline's targeted mode and retry pass
+# use it to probe only addresses not yet confirmed alive.
+#
+# Scanners that can pace their own probes set `supports_rate = True` and
+# accept a `rate=` keyword (packets per second; None means their default).
+# Under a --pps budget the pipeline passes every job its share of the
+# budget, so each shard's probes are spread out instead of leaving in one
+# burst; other active scanners take their shard's probe count from the
+# token bucket before they start.
+#
+# Scanners with a per-probe reply timeout set `supports_patience = True` and
+# accept a `patience=` keyword: a factor (>= 1) on how long they wait for
+# each reply. The --retry-timeout pass uses it, so slow responders get more
+# time per probe and not only a longer limit on the whole tool run.
+#
+# Scanners wrapping a long-running tool may also provide `iter_hosts` /
+# `iter_ips` generators taking the same arguments: the pipeline prefers
+# them and merges each result as it is produced, so later stages see the
+# first hosts while the sweep is still running.
+
 # Marker type for union-like typing in Aggregator
 Scanner = IpScanner | HostScanner
@@ -1,14 +1,45 @@
 from __future__ import annotations
-from typing import List
-from utils import run, which
+import math
+from typing import Iterator, List, Optional, Sequence
+from utils import LineStream, target_file, which
 
 class FpingSweepScanner:
     """Fast ICMP sweep (optional, used in --deep mode)."""
-    def scan_ips(self, subnet: str, *, timeout: int) -> List[str]:
+    supports_targets = True
+    supports_rate = True
+    supports_patience = True
+
+    def __init__(self, *, interface: Optional[str] = None):
+        # IpScanners get no interface at scan time; bind at construction (fping -I)
+        self.interface = interface
+
+    def scan_ips(
+        self, subnet: str, *, timeout: int, targets: Optional[Sequence[str]] = None, rate: Optional[float] = None,
+        patience: float = 1.0,
+    ) -> List[str]:
+        return list(self.iter_ips(subnet, timeout=timeout, targets=targets, rate=rate, patience=patience))
+
+    def iter_ips(
+        self, subnet: str, *, timeout: int, targets: Optional[Sequence[str]] = None, rate: Optional[float] = None,
+        patience: float = 1.0,
+    ) -> Iterator[str]:
+        """Yield alive addresses as fping reports them (-a prints one per line)."""
         if not which("fping"):
-            return []
-        cmd = ["fping", "-a", "-g", "-r", "0", "-t", "200", subnet]
-        rc, out, _ = run(cmd, timeout=timeout)
-        if rc in (0, 1) and out:
-            return [l.strip() for l in out.splitlines() if l.strip()]
-        return []
+            return
+        reply_ms = round(200 * max(1.0, patience))
+        cmd = ["fping", "-a", "-r", "0", "-t", str(reply_ms)] + (["-I", self.interface] if self.interface else [])
+        if rate:
+            cmd += ["-i", str(max(1, math.ceil(1000 / rate)))]  # ms between pings (-r 0: one per target)
+        if targets is None:
+            yield from self._stream(cmd + ["-g", subnet], timeout)
+        elif targets:
+            with target_file(targets) as path:
+                yield from self._stream(cmd + ["-f", path], timeout)
+
+    @staticmethod
+    def _stream(cmd: List[str], timeout: int) -> Iterator[str]:
+        # exit status 1 only means some targets were unreachable
+        for line in LineStream(cmd, timeout=timeout):
+            line = line.strip()
+            if line:
+                yield line
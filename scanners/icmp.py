@@ -0,0 +1,152 @@
+from __future__ import annotations
+import ipaddress
+import os
+import random
+import select
+import socket
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+def icmp_checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+def build_echo_request(ident: int, seq: int, payload: bytes = b"localnet") -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = icmp_checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, ident, seq) + payload
+
+def parse_echo_reply(data: bytes, raw: bool) -> Optional[Tuple[int, int]]:
+    """Returns (identifier, sequence) of an echo reply, else None."""
+    if raw:
+        if len(data) < 20:
+            return None
+        data = data[(data[0] & 0x0F) * 4:]
+    if len(data) < 8 or data[0] != ICMP_ECHO_REPLY:
+        return None
+    _t, _c, _csum, ident, seq = struct.unpack("!BBHHH", data[:8])
+    return ident, seq
+
+def open_icmp_socket() -> Tuple[Optional[socket.socket], bool]:
+    """
+    Unprivileged ping socket (SOCK_DGRAM/IPPROTO_ICMP, allowed by
+    net.ipv4.ping_group_range) first, raw socket as fallback.
+    Returns (socket, is_raw).
+    """
+    for kind, raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+        try:
+            return socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP), raw
+        except OSError:
+            continue
+    return None, False
+
+class IcmpEchoScanner:
+    """
+    Native ICMP echo sweep without subprocesses: paced sends at `rate`
+    packets per second, a single receive loop matching replies by
+    identifier and sequence number, and resends to non-responders only.
+    """
+    supports_targets = True
+    supports_rate = True
+    supports_patience = True
+
+    def __init__(self, *, rate: int = 2000, retries: int = 1, wait: float = 1.0, interface: Optional[str] = None):
+        self.rate = max(1, rate)
+        self.retries = retries
+        self.wait = wait
+        self.interface = interface
+
+    def scan_ips(
+        self, subnet: str, *, timeout: int, targets: Optional[Sequence[str]] = None, rate: Optional[float] = None,
+        patience: float = 1.0,
+    ) -> List[str]:
+        """
+        `rate` lowers the send rate below the configured one, e.g. to a
+        share of a --pps budget; `patience` stretches the wait for replies.
+        """
+        if targets is None:
+            targets = [str(ip) for ip in ipaddress.ip_network(subnet, strict=False).hosts()]
+        else:
+            targets = list(targets)
+        sock, raw = open_icmp_socket()
+        if sock is None or not targets:
+            return []
+        if self.interface:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, self.interface.encode())
+            except OSError:
+                pass  # needs CAP_NET_RAW; the routing table still picks the interface
+        try:
+            return self._sweep(sock, raw, targets, time.monotonic() + timeout, rate, patience)
+        finally:
+            sock.close()
+
+    def _sweep(
+        self, sock: socket.socket, raw: bool, targets: List[str], until: float, rate: Optional[float] = None,
+        patience: float = 1.0,
+    ) -> List[str]:
+        sock.setblocking(False)
+        if raw:
+            ident = (os.getpid() ^ random.randrange(0x10000)) & 0xFFFF
+        else:
+            # ping sockets: the kernel rewrites the identifier to the local "port"
+            sock.bind(("", 0))
+            ident = sock.getsockname()[1]
+        # sequence numbers index the target list; beyond 65536 targets the
+        # identifier is bumped (raw mode) so every (ident, seq) pair stays unique
+        position = {ip: i for i, ip in enumerate(targets)}
+        alive: Dict[str, None] = {}
+        interval = 1.0 / (min(self.rate, rate) if rate else self.rate)
+        pending = list(range(len(targets)))
+
+        def expected(i: int) -> Tuple[int, int]:
+            return (ident + i // 0x10000) & 0xFFFF, i & 0xFFFF
+
+        def drain(wait: float) -> None:
+            ready, _, _ = select.select([sock], [], [], wait)
+            while ready:
+                try:
+                    data, addr = sock.recvfrom(2048)
+                except OSError:
+                    return
+                reply = parse_echo_reply(data, raw)
+                i = position.get(addr[0])
+                if reply is None or i is None:
+                    continue
+                want = expected(i)
+                # ping sockets are demultiplexed by the kernel, so only the
+                # sequence number is meaningful there
+                if reply[1] == want[1] and (not raw or reply[0] == want[0]):
+                    alive[addr[0]] = None
+
+        for _attempt in range(self.retries + 1):
+            next_send = time.monotonic()
+            for i in pending:
+                if time.monotonic() >= until:
+                    break
+                try:
+                    sock.sendto(build_echo_request(*expected(i)), (targets[i], 0))
+                except OSError:
+                    pass
+                next_send += interval
+                drain(0.0)
+                while (gap := next_send - time.monotonic()) > 0:
+                    drain(gap)
+            settle = min(until, time.monotonic() + self.wait * max(1.0, patience))
+            while len(alive) < len(targets):
+                remaining = settle - time.monotonic()
+                if remaining <= 0:
+                    break
+                drain(remaining)
+            pending = [i for i in pending if targets[i] not in alive]
+            if not pending or time.monotonic() >= until:
+                break
+        return [ip for ip in targets if ip in alive]
@@ -1,21 +1,112 @@
 from __future__ import annotations
-from typing import List
-from utils import run, which
-
-def _parse_nmap_grepable(raw: str) -> List[str]:
-    ips: List[str] = []
-    for line in raw.splitlines():
-        if line.startswith("Host:"):
-            fields = line.split()
-            if len(fields) >= 2:
-                ips.append(fields[1])
-    return ips
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Optional, Sequence
+from models import Host
+from utils import LineStream, target_file, which
+
+class NmapXmlParser:
+    """
+    Incremental parser for `nmap -oX -` output: feed it chunks as they
+    arrive and it returns the hosts completed so far. Finished <host>
+    elements are dropped right away, and a truncated document (nmap killed
+    on timeout) still yields every host that was written in full.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: Optional[ET.Element] = None
+        self.broken = False
+
+    def feed(self, chunk: str) -> List[Host]:
+        if self.broken:
+            return []
+        hosts: List[Host] = []
+        try:
+            self._parser.feed(chunk)
+            for event, elem in self._parser.read_events():
+                if event == "start":
+                    if self._root is None:
+                        self._root = elem
+                    continue
+                if elem.tag != "host":
+                    continue
+                host = _host_from_xml(elem)
+                if host is not None:
+                    hosts.append(host)
+                if self._root is not None:
+                    try:
+                        self._root.remove(elem)
+                    except ValueError:
+                        elem.clear()  # not a direct child (unexpected nesting)
+        except ET.ParseError:
+            self.broken = True
+        return hosts
+
+def _host_from_xml(elem: ET.Element) -> Optional[Host]:
+    status = elem.find("status")
+    if status is not None and status.get("state") != "up":
+        return None
+    ip = mac = vendor = ""
+    for addr in elem.iter("address"):
+        kind = addr.get("addrtype")
+        if kind == "ipv4":
+            ip = addr.get("addr", "")
+        elif kind == "mac":
+            mac = addr.get("addr", "").lower()
+            vendor = addr.get("vendor", "")
+    if not ip:
+        return None
+    name = elem.find("hostnames/hostname")
+    return Host(ip=ip, hostname=name.get("name") if name is not None else None, mac=mac, vendor=vendor)
+
+def parse_nmap_xml(raw: str) -> List[Host]:
+    return NmapXmlParser().feed(raw)
 
 class NmapPingScanner:
-    def scan_ips(self, subnet: str, *, timeout: int) -> List[str]:
+    """
+    nmap ping sweep (-sn) with XML output. Run as root on the local link,
+    nmap ARP-pings and reports each host's MAC and vendor, so this is a
+    HostScanner returning complete records; `scan_ips` is kept for
+    callers that only want addresses.
+    """
+    supports_targets = True
+    supports_rate = True
+    supports_patience = True
+
+    def scan_hosts(
+        self, subnet: str, *, timeout: int, interface: str | None = None, targets: Optional[Sequence[str]] = None,
+        rate: Optional[float] = None, patience: float = 1.0,
+    ) -> List[Host]:
+        return list(self.iter_hosts(subnet, timeout=timeout, interface=interface, targets=targets, rate=rate,
+                                    patience=patience))
+
+    def iter_hosts(
+        self, subnet: str, *, timeout: int, interface: str | None = None, targets: Optional[Sequence[str]] = None,
+        rate: Optional[float] = None, patience: float = 1.0,
+    ) -> Iterator[Host]:
+        """Yield each host as soon as nmap closes its <host> element."""
         if not which("nmap"):
-            return []
-        rc, out, _ = run(["nmap", "-sn", "-n", subnet], timeout=timeout)
-        if rc != 0 or not out:
-            return []
-        return _parse_nmap_grepable(out)
+            return
+        cmd = ["nmap", "-sn", "-n", "-oX", "-"] + (["-e", interface] if interface else [])
+        if rate:
+            cmd += ["--max-rate", f"{rate:.2f}"]
+        if patience > 1:
+            # nmap waits 1 s for a first reply and at most 10 s
+            cmd += ["--initial-rtt-timeout", f"{min(10000, round(1000 * patience))}ms"]
+        if targets is None:
+            yield from self._stream(cmd + [subnet], timeout)
+        elif targets:
+            with target_file(targets) as path:
+                yield from self._stream(cmd + ["-iL", path], timeout)
+
+    @staticmethod
+    def _stream(cmd: List[str], timeout: int) -> Iterator[Host]:
+        parser = NmapXmlParser()
+        for line in LineStream(cmd, timeout=timeout):
+            yield from parser.feed(line + "\n")
+
+    def scan_ips(
+        self, subnet: str, *, timeout: int, targets: Optional[Sequence[str]] = None, rate: Optional[float] = None,
+        patience: float = 1.0,
+    ) -> List[str]:
+        return [h.ip for h in self.scan_hosts(subnet, timeout=timeout, targets=targets, rate=rate, patience=patience)]
@@ -0,0 +1,265 @@
+from __future__ import annotations
+import ipaddress
+import select
+import socket
+import struct
+import time
+from dataclasses import replace
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from dnsproto import TYPE_A, TYPE_PTR, parse_message, reverse_name_to_ip
+from models import Host
+
+ETH_P_ALL = 0x0003
+ETH_P_IP = 0x0800
+ETH_P_ARP = 0x0806
+_VLAN_TYPES = (0x8100, 0x88A8)
+PACKET_OUTGOING = 4  # sll_pkttype of frames this host sent
+MDNS_PORT = 5353
+DHCP_SERVER_PORT = 67
+DHCP_MAGIC = b"\x63\x82\x53\x63"
+DHCP_OPT_HOSTNAME = 12
+DHCP_OPT_REQUESTED_IP = 50
+
+LINKTYPE_ETHERNET = 1
+# magic -> (byte order, timestamp fraction unit)
+_PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+
+class Sighting(NamedTuple):
+    """What one frame says about one host; `ip` is empty when only the MAC is known (DHCPDISCOVER)."""
+    ip: str
+    mac: str = ""
+    hostname: Optional[str] = None
+
+def _ip(raw: bytes) -> str:
+    return socket.inet_ntoa(raw)
+
+def parse_frame(frame: bytes) -> List[Sighting]:
+    """Sightings in one Ethernet frame: ARP senders, mDNS speakers and their A/PTR records, DHCP clients."""
+    if len(frame) < 14:
+        return []
+    (ethertype,) = struct.unpack_from("!H", frame, 12)
+    offset = 14
+    while ethertype in _VLAN_TYPES and len(frame) >= offset + 4:
+        (ethertype,) = struct.unpack_from("!H", frame, offset + 2)
+        offset += 4
+    if ethertype == ETH_P_ARP:
+        return _parse_arp(frame[offset:])
+    if ethertype == ETH_P_IP:
+        return _parse_ipv4(frame[offset:], frame[6:12].hex(":"))
+    return []
+
+def _parse_arp(p: bytes) -> List[Sighting]:
+    if len(p) < 28:
+        return []
+    htype, ptype, hlen, plen = struct.unpack_from("!HHBB", p, 0)
+    if (htype, ptype, hlen, plen) != (1, ETH_P_IP, 6, 4):
+        return []
+    sha, spa = p[8:14], p[14:18]
+    # requests and replies (gratuitous ones included) vouch for the sender;
+    # an ARP probe (sender 0.0.0.0) only announces an address being claimed
+    if spa == b"\x00\x00\x00\x00" or sha == b"\x00" * 6:
+        return []
+    return [Sighting(_ip(spa), sha.hex(":"))]
+
+def _parse_ipv4(p: bytes, src_mac: str) -> List[Sighting]:
+    if len(p) < 20 or p[0] >> 4 != 4 or p[9] != socket.IPPROTO_UDP:
+        return []
+    ihl = (p[0] & 0x0F) * 4
+    if len(p) < ihl + 8:
+        return []
+    src = _ip(p[12:16])
+    sport, dport, length = struct.unpack_from("!HHH", p, ihl)
+    payload = p[ihl + 8:ihl + max(8, length)]
+    if MDNS_PORT in (sport, dport):
+        return _parse_mdns(payload, src, src_mac)
+    if dport == DHCP_SERVER_PORT:
+        return _parse_dhcp_request(payload)
+    return []
+
+def _parse_mdns(payload: bytes, src: str, src_mac: str) -> List[Sighting]:
+    sightings = [] if src == "0.0.0.0" else [Sighting(src, src_mac)]
+    try:
+        msg = parse_message(payload)
+    except (ValueError, struct.error):
+        return sightings
+    if not msg.is_response:
+        return sightings
+    for rr in msg.answers:
+        if rr.rtype == TYPE_A:
+            ip, name = rr.value, rr.name
+        elif rr.rtype == TYPE_PTR and reverse_name_to_ip(rr.name):
+            ip, name = reverse_name_to_ip(rr.name), rr.value
+        else:
+            continue
+        name = name.rstrip(".")
+        if name and ip != "0.0.0.0":
+            sightings.append(Sighting(ip, src_mac if ip == src else "", name))
+    return sightings
+
+def _parse_dhcp_request(payload: bytes) -> List[Sighting]:
+    if len(payload) < 240 or payload[0] != 1 or payload[1:3] != b"\x01\x06" or payload[236:240] != DHCP_MAGIC:
+        return []
+    mac = payload[28:34].hex(":")
+    ciaddr = payload[12:16]
+    options = _dhcp_options(payload[240:])
+    name = options.get(DHCP_OPT_HOSTNAME, b"").decode(errors="replace").strip("\x00 ") or None
+    requested = options.get(DHCP_OPT_REQUESTED_IP, b"")
+    if ciaddr != b"\x00\x00\x00\x00":
+        ip = _ip(ciaddr)
+    elif len(requested) == 4:
+        ip = _ip(requested)
+    else:
+        ip = ""  # DHCPDISCOVER: the address comes later, remember the name by MAC
+    if not ip and not name:
+        return []
+    return [Sighting(ip, mac, name)]
+
+def _dhcp_options(data: bytes) -> Dict[int, bytes]:
+    options: Dict[int, bytes] = {}
+    i = 0
+    while i < len(data):
+        code = data[i]
+        if code == 255:
+            break
+        if code == 0:
+            i += 1
+            continue
+        if i + 1 >= len(data):
+            break
+        length = data[i + 1]
+        options.setdefault(code, data[i + 2:i + 2 + length])
+        i += 2 + length
+    return options
+
+def read_pcap(f: BinaryIO) -> Iterator[Tuple[float, bytes]]:
+    """(timestamp, frame) pairs from a classic libpcap file with Ethernet link type."""
+    header = f.read(24)
+    if len(header) < 24 or header[:4] not in _PCAP_MAGIC:
+        raise ValueError("not a pcap file (pcapng is not supported)")
+    order, unit = _PCAP_MAGIC[header[:4]]
+    (linktype,) = struct.unpack(order + "I", header[20:24])
+    if linktype & 0x0FFFFFFF != LINKTYPE_ETHERNET:
+        raise ValueError(f"unsupported pcap link type {linktype}")
+    record = struct.Struct(order + "IIII")
+    while True:
+        head = f.read(record.size)
+        if len(head) < record.size:
+            return
+        sec, frac, caplen, _origlen = record.unpack(head)
+        frame = f.read(caplen)
+        if len(frame) < caplen:
+            return  # truncated capture
+        yield sec + frac * unit, frame
+
+class PassiveSightings:
+    """
+    Folds sightings into hosts. Names learned from a DHCPDISCOVER (MAC
+    only) are attached once the same MAC shows up with an address.
+    """
+
+    def __init__(self, subnet: Optional[str] = None):
+        self.net = ipaddress.ip_network(subnet, strict=False) if subnet else None
+        self.hosts: Dict[str, Host] = {}
+        self._ip_by_mac: Dict[str, str] = {}
+        self._name_by_mac: Dict[str, str] = {}
+
+    def add(self, sighting: Sighting) -> Optional[Host]:
+        """Record `sighting`; returns a copy of the host when it taught us something new."""
+        ip, mac, name = sighting
+        if mac and name:
+            self._name_by_mac.setdefault(mac, name)
+        if not ip:
+            ip = self._ip_by_mac.get(mac, "")
+            if not ip:
+                return None
+        elif not self._wanted(ip):
+            return None
+        if mac:
+            self._ip_by_mac[mac] = ip
+        update = Host(ip=ip, mac=mac, hostname=name or self._name_by_mac.get(mac))
+        host = self.hosts.get(ip)
+        if host is None:
+            self.hosts[ip] = host = update
+        else:
+            before = (host.mac, host.hostname)
+            host.merge_from(update)
+            if (host.mac, host.hostname) == before:
+                return None
+        return replace(host)
+
+    def _wanted(self, ip: str) -> bool:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        if addr.is_multicast or addr.is_unspecified or addr.is_loopback or str(addr) == "255.255.255.255":
+            return False
+        return self.net is None or addr in self.net
+
+class PassiveListenerScanner:
+    """
+    Zero-probe discovery: listens for `window` seconds (capped by the
+    scan timeout) on an AF_PACKET socket and reports hosts heard in ARP
+    traffic, mDNS and DHCP requests, with hostnames from mDNS records and
+    DHCP option 12. With `pcap` set, replays that capture instead. Live
+    capture needs CAP_NET_RAW; without it the scanner finds nothing.
+    """
+    passive = True  # sends no probes; run once per scan, not per shard
+
+    def __init__(self, *, window: float = 10.0, pcap: Optional[str] = None):
+        self.window = window
+        self.pcap = pcap
+
+    def scan_hosts(self, subnet: str, *, timeout: int, interface: str | None = None) -> List[Host]:
+        hosts: Dict[str, Host] = {}
+        for host in self.iter_hosts(subnet, timeout=timeout, interface=interface):
+            hosts[host.ip] = host  # later copies carry everything learned so far
+        return list(hosts.values())
+
+    def iter_hosts(self, subnet: str, *, timeout: int, interface: str | None = None) -> Iterator[Host]:
+        """Yield a host whenever a frame adds to what is known about it (first sighting, MAC or name)."""
+        sightings = PassiveSightings(subnet)
+        frames = self._replay() if self.pcap else self._capture(interface, min(self.window, timeout))
+        for frame in frames:
+            for sighting in parse_frame(frame):
+                host = sightings.add(sighting)
+                if host is not None:
+                    yield host
+
+    def _replay(self) -> Iterator[bytes]:
+        with open(self.pcap, "rb") as f:
+            for _ts, frame in read_pcap(f):
+                yield frame
+
+    def _capture(self, interface: Optional[str], window: float) -> Iterator[bytes]:
+        try:
+            sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        except (AttributeError, OSError):
+            return  # not Linux, or no CAP_NET_RAW
+        with sock:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 21)
+                if interface:
+                    sock.bind((interface, 0))
+            except OSError:
+                return
+            sock.setblocking(False)
+            deadline = time.monotonic() + window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                readable, _, _ = select.select([sock], [], [], remaining)
+                if not readable:
+                    continue
+                try:
+                    frame, addr = sock.recvfrom(65535)
+                except BlockingIOError:
+                    continue
+                if addr[2] != PACKET_OUTGOING:
+                    yield frame
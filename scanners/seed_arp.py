@@ -1,14 +1,19 @@
 from __future__ import annotations
-import re
-from typing import List
+from typing import List, Optional
 from models import Host
-from resolvers import list_ip_neigh_all
+from resolvers import NeighTable, list_ip_neigh_all, read_neigh_table
 
 class SeedArpCacheScanner:
-    """Passive seed: collect IPs from local ARP/neighbour cache."""
+    """Passive seed: collect IPs (and MACs) from one snapshot of the ARP/neighbour cache."""
+    passive = True  # sends no probes; run once per scan, not per shard
+
+    def __init__(self, table: Optional[NeighTable] = None):
+        # a snapshot shared by several pipelines (multi-network runs); None = read one per scan
+        self.table = table
+
     def scan_hosts(self, subnet: str, *, timeout: int, interface: str | None = None) -> List[Host]:
+        table = self.table if self.table is not None else read_neigh_table(include_local=False)
         hosts: List[Host] = []
-        for ip in list_ip_neigh_all():
-            if re.match(r"^\d+\.\d+\.\d+\.\d+$", ip):
-                hosts.append(Host(ip=ip))
+        for ip in list_ip_neigh_all(table):
+            hosts.append(Host(ip=ip, mac=table.get(ip, {}).get("mac", "")))
         return hosts
@@ -0,0 +1,95 @@
+from __future__ import annotations
+import asyncio
+import ipaddress
+from typing import Iterable, List, Optional, Sequence
+
+DEFAULT_PORTS = (22, 80, 443, 445)
+
+class TcpConnectScanner:
+    """
+    Liveness via non-blocking TCP connects for ICMP-filtered networks:
+    a completed handshake or a RST (connection refused) both mean the host
+    is up. Ports of one host are tried concurrently and the remaining
+    attempts are cancelled on the first answer; `max_inflight` caps the
+    number of open connection attempts overall. With a `rate`, hosts are
+    started so that no more than `rate` SYNs per second leave on average,
+    and `patience` stretches `connect_timeout`.
+    """
+    supports_targets = True
+    supports_rate = True
+    supports_patience = True
+
+    def __init__(
+        self,
+        ports: Iterable[int] = DEFAULT_PORTS,
+        *,
+        connect_timeout: float = 1.0,
+        max_inflight: int = 512,
+    ):
+        self.ports = list(ports)
+        self.connect_timeout = connect_timeout
+        self.max_inflight = max(1, max_inflight)
+
+    def scan_ips(
+        self, subnet: str, *, timeout: int, targets: Optional[Sequence[str]] = None, rate: Optional[float] = None,
+        patience: float = 1.0,
+    ) -> List[str]:
+        if targets is None:
+            targets = [str(ip) for ip in ipaddress.ip_network(subnet, strict=False).hosts()]
+        else:
+            targets = list(targets)
+        if not targets or not self.ports:
+            return []
+        return asyncio.run(self._sweep(targets, timeout, rate, self.connect_timeout * max(1.0, patience)))
+
+    async def _sweep(
+        self, targets: List[str], timeout: float, rate: Optional[float] = None, connect_timeout: Optional[float] = None,
+    ) -> List[str]:
+        sem = asyncio.Semaphore(self.max_inflight)
+        alive: set = set()
+        # every host costs one SYN per port
+        gap = len(self.ports) / rate if rate else 0.0
+
+        async def host(ip: str, start: float) -> None:
+            if start:
+                await asyncio.sleep(start)
+            if await self._probe_host(ip, sem, connect_timeout):
+                alive.add(ip)
+
+        tasks = [asyncio.ensure_future(host(ip, i * gap)) for i, ip in enumerate(targets)]
+        _, not_done = await asyncio.wait(tasks, timeout=timeout)
+        for t in not_done:
+            t.cancel()
+        if not_done:
+            await asyncio.gather(*not_done, return_exceptions=True)
+        return [ip for ip in targets if ip in alive]
+
+    async def _probe_host(self, ip: str, sem: asyncio.Semaphore, connect_timeout: Optional[float] = None) -> bool:
+        attempts = [asyncio.ensure_future(self._probe(ip, port, sem, connect_timeout)) for port in self.ports]
+        try:
+            for next_done in asyncio.as_completed(attempts):
+                if await next_done:
+                    return True
+            return False
+        finally:
+            for a in attempts:
+                a.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+    async def _probe(
+        self, ip: str, port: int, sem: asyncio.Semaphore, connect_timeout: Optional[float] = None,
+    ) -> Optional[bool]:
+        async with sem:
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port),
+                                                   connect_timeout or self.connect_timeout)
+            except ConnectionRefusedError:
+                return True  # RST: something answered
+            except (asyncio.TimeoutError, OSError):
+                return False
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+            return True
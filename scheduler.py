@@ -0,0 +1,53 @@
+from __future__ import annotations
+import ipaddress
+import threading
+import time
+from typing import Callable, List, Optional
+
+def shard_subnet(subnet: str, prefix: Optional[int] = 24) -> List[str]:
+    """Split `subnet` into /`prefix` shards; networks already that small are returned as-is."""
+    net = ipaddress.ip_network(subnet, strict=False)
+    if prefix is None or net.prefixlen >= prefix:
+        return [subnet]
+    return [str(s) for s in net.subnets(new_prefix=prefix)]
+
+def host_count(subnet: str) -> int:
+    net = ipaddress.ip_network(subnet, strict=False)
+    return max(1, net.num_addresses - (2 if net.prefixlen < 31 else 0))
+
+class RateBudget:
+    """
+    Thread-safe token bucket for a global packets-per-second budget.
+    `acquire(n)` blocks until `n` probes may be sent; a request larger than
+    one second of budget is admitted once the bucket is full, and the
+    debt is paid off before anyone else is admitted.
+    """
+
+    def __init__(
+        self,
+        pps: Optional[float],
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.pps = pps
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(pps or 0)
+        self.stamp = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, n: int) -> None:
+        if not self.pps:
+            return
+        need = min(float(n), float(self.pps))
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(float(self.pps), self.tokens + (now - self.stamp) * self.pps)
+                self.stamp = now
+                if self.tokens >= need:
+                    self.tokens -= n  # may go negative: large requests are paid off later
+                    return
+                wait = (need - self.tokens) / self.pps
+            self.sleep(wait)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import fcntl
+import ipaddress
+import json
+import os
+import re
+import subprocess
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:  # the inventory entry point loads this module on every Ansible run
+    from models import Host
+
+# Snapshot layout: one JSON object
+#   {"format": FORMAT, "version": VERSION, "created": <epoch seconds>,
+#    "fields": [<column names>], "hosts": [[<one value per column>], ...]}
+# Rows are positional to keep the file small: json.load reads a few
+# thousand hosts in milliseconds. Readers go by "fields", ignoring columns
+# they do not know, so a column can be added without a version bump; a
+# new VERSION means an incompatible layout.
+FORMAT = "localnet-snapshot"
+VERSION = 1
+FIELDS = ("ip", "hostname", "mac", "vendor", "interface", "subnet", "source", "last_seen")
+
+def default_snapshot_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "localnet", "snapshot.json")
+
+class SnapshotHost(NamedTuple):
+    ip: str
+    hostname: str = ""
+    mac: str = ""
+    vendor: str = ""
+    interface: str = ""
+    subnet: str = ""
+    source: str = ""  # where the hostname came from: mdns, netbios, rdns, cache, scan
+    last_seen: int = 0
+
+class Snapshot(NamedTuple):
+    created: int
+    hosts: List[SnapshotHost]
+
+def write_snapshot(
+    path: str,
+    hosts: Iterable[Host],
+    *,
+    sources: Optional[Dict[str, str]] = None,
+    networks: Sequence[Tuple[Optional[str], str]] = (),
+    keep: float = 0.0,
+    now: Optional[float] = None,
+) -> int:
+    """
+    Write a run's `hosts` to `path` atomically: readers see the previous
+    snapshot or this one, never a partial file. `sources` maps IP -> name
+    source (None when unknown). Untagged hosts get the interface and subnet
+    of the (interface, subnet) `networks` entry that contains them. Hosts
+    of the previous snapshot this run did not see stay listed, with their
+    old last_seen, for `keep` seconds. Returns the number of hosts written.
+    """
+    now = int(time.time() if now is None else now)
+    nets = [(ipaddress.ip_network(subnet, strict=False), interface or "") for interface, subnet in networks]
+    rows: List[SnapshotHost] = []
+    for h in hosts:
+        interface, subnet = h.interface or "", h.subnet or ""
+        if not subnet:
+            interface, subnet = _network_of(h.ip, nets)
+        source = "" if sources is None else sources.get(h.ip) or ("scan" if h.hostname else "")
+        rows.append(SnapshotHost(h.ip, h.hostname or "", h.mac or "", h.vendor or "", interface, subnet,
+                                 source, now))
+    if keep > 0:
+        seen = {row.ip for row in rows}
+        try:
+            previous = read_snapshot(path).hosts
+        except (OSError, ValueError):
+            previous = []
+        rows += [row for row in previous if row.ip not in seen and now - row.last_seen <= keep]
+    rows.sort(key=_ip_key)
+
+    data = {"format": FORMAT, "version": VERSION, "created": now, "fields": list(FIELDS),
+            "hosts": [list(row) for row in rows]}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return len(rows)
+
+def read_snapshot(path: str) -> Snapshot:
+    """Load a snapshot: OSError when it cannot be read, ValueError when it is not one this version reads."""
+    with open(path, "rb") as f:
+        try:
+            data = json.load(f)
+        except ValueError:
+            raise ValueError(f"{path} is not a localnet snapshot")
+    if not isinstance(data, dict) or data.get("format") != FORMAT:
+        raise ValueError(f"{path} is not a localnet snapshot")
+    if data.get("version") != VERSION:
+        raise ValueError(f"{path} has snapshot version {data.get('version')}, this localnet reads {VERSION}")
+    try:
+        fields = data["fields"]
+        if tuple(fields) == FIELDS:
+            hosts = [SnapshotHost._make(row) for row in data["hosts"]]
+        else:
+            columns = [(name, i) for i, name in enumerate(fields) if name in FIELDS]
+            hosts = [SnapshotHost(**{name: row[i] for name, i in columns}) for row in data["hosts"]]
+        return Snapshot(int(data["created"]), hosts)
+    except (KeyError, TypeError, IndexError, ValueError):
+        raise ValueError(f"{path} is a damaged localnet snapshot")
+
+def ansible_inventory(snapshot: Snapshot) -> Dict[str, dict]:
+    """
+    Ansible dynamic-inventory JSON: every host in "scanned" (as in the
+    ansible output format), grouped by vendor_*, subnet_* and iface_*, with
+    its variables under _meta so Ansible needs no --host call per host.
+    Hosts are named by hostname, or by address when the name is missing
+    or already taken.
+    """
+    hostvars: Dict[str, Dict[str, object]] = {}
+    groups: Dict[str, List[str]] = {"scanned": []}
+    names: Dict[Tuple[str, str], str] = {}
+    for h in snapshot.hosts:
+        name = h.hostname if h.hostname and h.hostname not in hostvars else h.ip
+        n = 1
+        while name in hostvars:
+            n += 1
+            name = f"{h.ip}_{n}"
+        variables: Dict[str, object] = {"ansible_host": h.ip, "ip": h.ip}
+        for key, value in (("hostname", h.hostname), ("mac", h.mac), ("vendor", h.vendor),
+                           ("hostname_source", h.source), ("interface", h.interface), ("subnet", h.subnet)):
+            if value:
+                variables[key] = value
+        variables["last_seen"] = h.last_seen
+        hostvars[name] = variables
+        groups["scanned"].append(name)
+        for prefix, value in (("vendor", h.vendor), ("subnet", h.subnet), ("iface", h.interface)):
+            if value:
+                group = names.get((prefix, value))
+                if group is None:
+                    group = names[prefix, value] = group_name(prefix, value)
+                groups.setdefault(group, []).append(name)
+    inventory: Dict[str, dict] = {name: {"hosts": members} for name, members in groups.items()}
+    inventory["all"] = {"children": sorted(groups)}
+    inventory["_meta"] = {"hostvars": hostvars}
+    return inventory
+
+def group_name(prefix: str, value: str) -> str:
+    """Ansible-safe group name: "Apple, Inc." -> vendor_apple_inc, 10.0.0.0/24 -> subnet_10_0_0_0_24."""
+    return f"{prefix}_" + re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")
+
+def start_rescan(path: str, command: Sequence[str]) -> Optional[subprocess.Popen]:
+    """
+    Run `command --snapshot PATH` in the background, detached from the
+    caller, unless a rescan of `path` is already running; returns the
+    process, or None when one was running. The rescan inherits the lock
+    on PATH.lock and holds it until it exits; its stderr goes to PATH.log.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        with open(f"{path}.log", "wb") as log:
+            return subprocess.Popen(
+                [*command, "--snapshot", path, "--output", os.devnull],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=log,
+                pass_fds=(fd,), start_new_session=True,
+            )
+    finally:
+        os.close(fd)
+
+def _network_of(ip: str, nets: Sequence[Tuple[object, str]]) -> Tuple[str, str]:
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return "", ""
+    for net, interface in nets:
+        if addr in net:
+            return interface, str(net)
+    return "", ""
+
+def _ip_key(row: SnapshotHost) -> Tuple[int, int, str]:
+    try:
+        addr = ipaddress.ip_address(row.ip)
+    except ValueError:
+        return (0, 0, row.ip)
+    return (addr.version, int(addr), row.mac)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Instrumentation events are plain dicts with a `kind` and a `ts`:
+#   subprocess  tool, cmd, duration, rc, timed_out, stdout_bytes, stderr_bytes
+#   scanner     name, subnet, duration, hosts, targets (when probing a target list)
+#   resolver    name, duration, queried, resolved, skipped
+#   stage       name (scan/neigh/inventory/enrich), duration, hosts
+#   agent       name, subnet, status (done/deadline/error text), duration, hosts
+#   plan        subnet, full, steps (in run order), skipped (--plan auto)
+Event = Dict[str, object]
+Listener = Callable[[Event], None]
+
+_listeners: List[Listener] = []
+_lock = threading.Lock()
+
+def add_listener(listener: Listener) -> None:
+    """Receive every instrumentation event (from any thread) until removed."""
+    with _lock:
+        _listeners.append(listener)
+
+def remove_listener(listener: Listener) -> None:
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+@contextmanager
+def listening(listener: Listener) -> Iterator[Listener]:
+    add_listener(listener)
+    try:
+        yield listener
+    finally:
+        remove_listener(listener)
+
+def enabled() -> bool:
+    return bool(_listeners)
+
+def emit(kind: str, **fields) -> None:
+    if not _listeners:
+        return
+    event: Event = dict(kind=kind, ts=round(time.time(), 3), **fields)
+    with _lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(event)
+        except Exception:
+            pass  # a broken metrics sink must not break the scan
+
+@contextmanager
+def timed(kind: str, **fields) -> Iterator[Dict[str, object]]:
+    """Emit a `kind` event with the block's duration; fields set on the yielded dict are included."""
+    start = time.monotonic()
+    extra: Dict[str, object] = {}
+    try:
+        yield extra
+    finally:
+        emit(kind, duration=round(time.monotonic() - start, 6), **fields, **extra)
+
+class StatsCollector:
+    """
+    Listener that folds events into a JSON-ready summary: subprocesses per
+    tool (count, time, timeouts, output bytes) plus the slowest commands,
+    stage timings, per-scanner/per-resolver/per-agent totals, and the
+    steps chosen by --plan auto.
+    """
+
+    def __init__(self, slowest: int = 10):
+        self.started = time.monotonic()
+        self.slowest_n = slowest
+        self.subprocesses: Dict[str, Dict[str, float]] = {}
+        self.slowest: List[Dict[str, object]] = []
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.scanners: Dict[str, Dict[str, float]] = {}
+        self.resolvers: Dict[str, Dict[str, float]] = {}
+        self.agents: Dict[str, Dict[str, float]] = {}
+        self.plans: List[Dict[str, object]] = []
+        self.lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        with self.lock:
+            kind = event["kind"]
+            if kind == "subprocess":
+                self._subprocess(event)
+            elif kind == "stage":
+                self._add(self.stages, event, ("hosts",))
+            elif kind == "scanner":
+                self._add(self.scanners, event, ("hosts", "targets"))
+            elif kind == "resolver":
+                self._add(self.resolvers, event, ("queried", "resolved", "skipped"))
+            elif kind == "agent":
+                self._add(self.agents, event, ("hosts",))
+            elif kind == "plan":
+                self.plans.append({k: event[k] for k in ("subnet", "full", "steps", "skipped")})
+
+    def _subprocess(self, event: Event) -> None:
+        row = self.subprocesses.setdefault(str(event["tool"]), dict(
+            count=0, duration=0.0, max_duration=0.0, timeouts=0, failures=0, stdout_bytes=0, stderr_bytes=0))
+        row["count"] += 1
+        row["duration"] += event["duration"]
+        row["max_duration"] = max(row["max_duration"], event["duration"])
+        row["timeouts"] += bool(event["timed_out"])
+        row["failures"] += event["rc"] not in (0, 124)
+        row["stdout_bytes"] += event["stdout_bytes"]
+        row["stderr_bytes"] += event["stderr_bytes"]
+        self.slowest.append(dict(cmd=event["cmd"], duration=event["duration"], rc=event["rc"]))
+        self.slowest.sort(key=lambda e: -e["duration"])
+        del self.slowest[self.slowest_n:]
+
+    @staticmethod
+    def _add(table: Dict[str, Dict[str, float]], event: Event, counters) -> None:
+        row = table.setdefault(str(event["name"]), dict(calls=0, duration=0.0, **{c: 0 for c in counters}))
+        row["calls"] += 1
+        row["duration"] += event["duration"]
+        for c in counters:
+            row[c] += event.get(c) or 0
+
+    def summary(self) -> Dict[str, object]:
+        with self.lock:
+            procs = {tool: _rounded(row) for tool, row in sorted(self.subprocesses.items())}
+            return dict(
+                wall=round(time.monotonic() - self.started, 3),
+                subprocesses=dict(
+                    count=sum(r["count"] for r in procs.values()),
+                    duration=round(sum(r["duration"] for r in procs.values()), 3),
+                    by_tool=procs,
+                    slowest=[dict(e, duration=round(e["duration"], 3)) for e in self.slowest],
+                ),
+                stages={k: _rounded(v) for k, v in self.stages.items()},
+                scanners={k: _rounded(v) for k, v in sorted(self.scanners.items())},
+                resolvers={k: _rounded(v) for k, v in self.resolvers.items()},
+                agents={k: _rounded(v) for k, v in sorted(self.agents.items())},
+                plans=list(self.plans),
+            )
+
+    def write(self, target: Optional[str]) -> None:
+        """Write the summary as JSON to `target` ("-" or None = stderr)."""
+        payload = json.dumps(self.summary(), indent=2)
+        if not target or target == "-":
+            print(payload, file=sys.stderr)
+            return
+        with open(os.path.expanduser(target), "w") as f:
+            f.write(payload + "\n")
+
+def _rounded(row: Dict[str, float]) -> Dict[str, float]:
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in row.items()}
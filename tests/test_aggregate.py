@@ -1,7 +1,11 @@
+import threading
 import unittest
 from unittest.mock import patch
 from models import Host
-from aggregate import DiscoveryPipeline
+from aggregate import DiscoveryPipeline, MultiNetworkDiscovery, ScanTarget
+from hoststore import HostTable
+from inventory import InventoryStore
+from netbios import NbstatInfo
 
 class DummyHostScanner:
     def __init__(self, hosts):
@@ -16,11 +20,12 @@ class DummyIpScanner:
         return list(self._ips)
 
 class TestAggregate(unittest.TestCase):
-    @patch("aggregate.reverse_dns", side_effect=lambda ip: "server.local" if ip=="192.168.0.10" else None)
-    @patch("aggregate.resolve_mdns", side_effect=lambda ip, timeout=30: "printer.local" if ip=="192.168.0.2" else None)
-    @patch("aggregate.probe_ip_neigh_one", side_effect=lambda ip: {"ip": ip, "mac": "AA:BB:CC:DD:EE:FF" if ip=="192.168.0.3" else "", "dev":"", "state":""})
-    @patch("aggregate.run_nbtscan_range", return_value={"192.168.0.3": "WINHOST<00>"})
-    def test_pipeline_merge_enrich_sort(self, m_nbts, m_probe, m_mdns, m_rdns):
+    @patch("rdns.read_resolv_conf", return_value=None)
+    @patch("enrichment.reverse_dns", side_effect=lambda ip: "server.local" if ip=="192.168.0.10" else None)
+    @patch("enrichment.MdnsResolver.resolve", side_effect=lambda ips, deadline=None: ({"192.168.0.2": "printer.local"} if "192.168.0.2" in ips else {}, 0))
+    @patch("aggregate.read_neigh_table", return_value={"192.168.0.3": {"ip": "192.168.0.3", "mac": "AA:BB:CC:DD:EE:FF", "dev": "", "state": "REACHABLE"}})
+    @patch("enrichment.NetbiosResolver.resolve", side_effect=lambda ips, deadline=None: ({"192.168.0.3": NbstatInfo("WINHOST", "WORKGROUP", "aa:bb:cc:dd:ee:ff")} if "192.168.0.3" in ips else {}, 0))
+    def test_pipeline_merge_enrich_sort(self, m_nbts, m_probe, m_mdns, m_rdns, m_resolv):
         host_scanners = [DummyHostScanner([
             Host(ip="192.168.0.2", mac="00:11:22:33:44:02", vendor="V1"),
             Host(ip="192.168.0.10", mac="00:11:22:33:44:0A", vendor="V2"),
@@ -39,3 +44,287 @@ class TestAggregate(unittest.TestCase):
         self.assertTrue(h3.hostname.startswith("WINHOST"))
         h10 = next(h for h in hosts if h.ip == "192.168.0.10")
         self.assertEqual(h10.hostname, "server.local")
+
+class SlowHostScanner(DummyHostScanner):
+    def __init__(self, hosts, delay):
+        super().__init__(hosts)
+        self._delay = delay
+    def scan_hosts(self, subnet, *, timeout, interface=None):
+        import time
+        time.sleep(self._delay)
+        return list(self._hosts)
+
+class TestAggregateConcurrent(unittest.TestCase):
+    @patch("rdns.read_resolv_conf", return_value=None)
+    @patch("enrichment.reverse_dns", return_value=None)
+    @patch("enrichment.MdnsResolver.resolve", return_value=({}, 0))
+    @patch("aggregate.read_neigh_table", return_value={})
+    @patch("enrichment.NetbiosResolver.resolve", return_value=({}, 0))
+    def test_merge_order_independent_of_finish_order(self, *_):
+        # first scanner finishes last but must still win the merge
+        first = SlowHostScanner([Host(ip="10.0.0.1", mac="00:00:00:00:00:01", vendor="First")], delay=0.2)
+        second = DummyHostScanner([Host(ip="10.0.0.1", mac="00:00:00:00:00:02", vendor="Second")])
+        for max_parallel in (None, 1, 2):
+            pipe = DiscoveryPipeline([first, second], [DummyIpScanner(["10.0.0.2"])],
+                                     timeout=5, max_parallel=max_parallel)
+            hosts = list(pipe.discover("10.0.0.0/24"))
+            self.assertEqual([h.ip for h in hosts], ["10.0.0.1", "10.0.0.2"])
+            self.assertEqual(hosts[0].vendor, "First")
+            self.assertEqual(hosts[0].mac, "00:00:00:00:00:01")
+
+    @patch("rdns.read_resolv_conf", return_value=None)
+    @patch("enrichment.reverse_dns", return_value=None)
+    @patch("enrichment.MdnsResolver.resolve", return_value=({}, 0))
+    @patch("aggregate.read_neigh_table", return_value={})
+    @patch("enrichment.NetbiosResolver.resolve", return_value=({}, 0))
+    def test_scanners_overlap(self, *_):
+        import time
+        scanners = [SlowHostScanner([Host(ip=f"10.0.0.{i}")], delay=0.2) for i in range(1, 5)]
+        pipe = DiscoveryPipeline(scanners, [], timeout=5)
+        start = time.monotonic()
+        hosts = pipe.discover("10.0.0.0/24")
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual(len(hosts), 4)
+
+class TestAggregateStreaming(unittest.TestCase):
+    @patch("rdns.read_resolv_conf", return_value=None)
+    @patch("enrichment.reverse_dns", side_effect=lambda ip: "b.lan" if ip == "10.0.0.2" else None)
+    @patch("enrichment.MdnsResolver.resolve", return_value=({}, 0))
+    @patch("aggregate.read_neigh_table", return_value={"10.0.0.2": {"ip": "10.0.0.2", "mac": "aa:aa:aa:aa:aa:02", "dev": "", "state": "REACHABLE"}})
+    @patch("enrichment.NetbiosResolver.resolve", return_value=({}, 0))
+    def test_discover_iter_yields_updates(self, *_):
+        pipe = DiscoveryPipeline(
+            [DummyHostScanner([Host(ip="10.0.0.1", mac="aa:aa:aa:aa:aa:01")])],
+            [DummyIpScanner(["10.0.0.2", "10.0.0.1"])],
+            timeout=5,
+        )
+        events = [(h.ip, h.hostname, h.mac) for h in pipe.discover_iter("10.0.0.0/24")]
+        self.assertEqual(events, [
+            ("10.0.0.1", None, "aa:aa:aa:aa:aa:01"),
+            ("10.0.0.2", None, ""),
+            ("10.0.0.2", None, "aa:aa:aa:aa:aa:02"),
+            ("10.0.0.2", "b.lan", "aa:aa:aa:aa:aa:02"),
+        ])
+        once = list(pipe.discover_iter("10.0.0.0/24", updates=False))
+        # named hosts come as soon as their source finishes, unnamed ones at the end
+        self.assertEqual([(h.ip, h.hostname) for h in once], [("10.0.0.2", "b.lan"), ("10.0.0.1", None)])
+
+    @patch("rdns.read_resolv_conf", return_value=None)
+    @patch("enrichment.reverse_dns", return_value=None)
+    @patch("enrichment.MdnsResolver.resolve", side_effect=lambda ips, deadline=None: ({"10.0.0.1": "a.local"}, 0))
+    @patch("aggregate.read_neigh_table", return_value={})
+    @patch("enrichment.NetbiosResolver.resolve", return_value=({}, 0))
+    def test_discover_iter_once_yields_before_later_sources(self, m_nbts, m_neigh, m_mdns, m_rdns, m_resolv):
+        pipe = DiscoveryPipeline([], [DummyIpScanner(["10.0.0.1", "10.0.0.2"])], timeout=5)
+        once = pipe.discover_iter("10.0.0.0/24", updates=False)
+        first = next(once)
+        self.assertEqual((first.ip, first.hostname), ("10.0.0.1", "a.local"))
+        m_nbts.assert_not_called()
+        m_rdns.assert_not_called()
+        self.assertEqual([h.ip for h in once], ["10.0.0.2"])
+        m_rdns.assert_called_once_with("10.0.0.2")
+
+class GatedHostScanner:
+    """Streams one host, then blocks until the test has seen it merged."""
+    def __init__(self):
+        self.gate = threading.Event()
+    def iter_hosts(self, subnet, *, timeout, interface=None):
+        yield Host(ip="10.0.0.1", mac="aa:aa:aa:aa:aa:01")
+        if not self.gate.wait(5):
+            raise AssertionError("first host was not merged while the scanner was running")
+        yield Host(ip="10.0.0.2", mac="aa:aa:aa:aa:aa:02")
+    def scan_hosts(self, subnet, *, timeout, interface=None):
+        return list(self.iter_hosts(subnet, timeout=timeout, interface=interface))
+
+class TestAggregateIncremental(unittest.TestCase):
+    def test_hosts_are_merged_while_the_sweep_runs(self):
+        gated = GatedHostScanner()
+        pipe = DiscoveryPipeline([gated], [DummyIpScanner(["10.0.0.3"])], timeout=5)
+        hosts_by_ip = HostTable()
+        seen = []
+        for touched in pipe._scan_iter("10.0.0.0/24", hosts_by_ip):
+            seen.append([h.ip for h in touched])
+            gated.gate.set()
+        self.assertEqual(seen, [["10.0.0.1"], ["10.0.0.2"], ["10.0.0.3"]])
+
+class TestAggregateInventory(unittest.TestCase):
+    @patch("rdns.read_resolv_conf", return_value=None)
+    @patch("enrichment.reverse_dns", return_value="fresh.lan")
+    @patch("enrichment.MdnsResolver.resolve", return_value=({}, 0))
+    @patch("aggregate.read_neigh_table", return_value={})
+    @patch("enrichment.NetbiosResolver.resolve", return_value=({}, 0))
+    def test_cached_hosts_skip_resolution(self, m_nb, m_neigh, m_mdns, m_rdns, m_resolv):
+        from inventory import InventoryStore
+        store = InventoryStore(":memory:")
+        store.record([Host(ip="10.0.0.1", hostname="known.lan", mac="aa:00:00:00:00:01")], {"10.0.0.1": "mdns"})
+        pipe = DiscoveryPipeline(
+            [DummyHostScanner([Host(ip="10.0.0.1", mac="aa:00:00:00:00:01"), Host(ip="10.0.0.2", mac="aa:00:00:00:00:02")])],
+            [], timeout=5, inventory=store,
+        )
+        hosts = pipe.discover("10.0.0.0/24")
+        self.assertEqual([h.hostname for h in hosts], ["known.lan", "fresh.lan"])
+        m_rdns.assert_called_once_with("10.0.0.2")
+        self.assertEqual([h.ip for h in pipe.last_diff.appeared], ["10.0.0.2"])
+        self.assertEqual(store.lookup("10.0.0.2", "aa:00:00:00:00:02").source, "rdns")
+        store.close()
+
+class RecordingIpScanner:
+    def __init__(self, alive, slow_shard=None):
+        self.alive = alive
+        self.calls = []
+        self.slow_shard = slow_shard
+    def scan_ips(self, subnet, *, timeout):
+        import ipaddress, time
+        self.calls.append(subnet)
+        if subnet == self.slow_shard:
+            time.sleep(0.2)
+        net = ipaddress.ip_network(subnet)
+        return [ip for ip in self.alive if ipaddress.ip_address(ip) in net]
+
+class PassiveScanner(DummyHostScanner):
+    passive = True
+    calls = 0
+    def scan_hosts(self, subnet, *, timeout, interface=None):
+        PassiveScanner.calls += 1
+        return list(self._hosts)
+
+class TestAggregateSharding(unittest.TestCase):
+    def test_large_subnet_is_sharded(self):
+        PassiveScanner.calls = 0
+        active = RecordingIpScanner(["10.0.0.7", "10.0.1.9", "10.0.3.1"], slow_shard="10.0.0.0/24")
+        passive = PassiveScanner([Host(ip="10.0.1.9", mac="aa:00:00:00:01:09"), Host(ip="192.168.9.9")])
+        pipe = DiscoveryPipeline([passive], [active], timeout=5, shard_prefix=24, max_shards=2)
+        order = []
+        hosts_by_ip = HostTable()
+        for touched in pipe._scan_iter("10.0.0.0/22", hosts_by_ip):
+            order.extend(h.ip for h in touched)
+        self.assertEqual(sorted(active.calls), ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24", "10.0.3.0/24"])
+        self.assertEqual(PassiveScanner.calls, 1)
+        # passive group first, then shards as they complete (the slow first shard last)
+        self.assertEqual(order[:2], ["10.0.1.9", "192.168.9.9"])
+        self.assertEqual(order[-1], "10.0.0.7")
+        self.assertEqual(hosts_by_ip.get("10.0.1.9").mac, "aa:00:00:00:01:09")
+        self.assertEqual({h.ip for h in hosts_by_ip}, {"10.0.0.7", "10.0.1.9", "10.0.3.1", "192.168.9.9"})
+
+    def test_small_subnet_is_not_sharded(self):
+        active = RecordingIpScanner(["10.0.0.7"])
+        pipe = DiscoveryPipeline([], [active], timeout=5)
+        self.assertEqual([h.ip for h in pipe.scan("10.0.0.0/24")], ["10.0.0.7"])
+        self.assertEqual(active.calls, ["10.0.0.0/24"])
+
+class PacedIpScanner(RecordingIpScanner):
+    supports_rate = True
+    def scan_ips(self, subnet, *, timeout, rate=None):
+        self.calls.append((subnet, rate))
+        return []
+
+class TestAggregateRate(unittest.TestCase):
+    def test_shards_get_their_share_of_the_budget(self):
+        paced, unpaced = PacedIpScanner([]), RecordingIpScanner([])
+        pipe = DiscoveryPipeline([], [paced, unpaced], timeout=5, shard_prefix=24, max_shards=2, pps=1000)
+        with patch("aggregate.RateBudget.acquire") as m_acquire:
+            list(pipe._scan_iter("10.0.0.0/22", HostTable()))
+        # two scanners on two shards at a time: four jobs share the budget
+        self.assertEqual(sorted(paced.calls), [(f"10.0.{i}.0/24", 250.0) for i in range(4)])
+        self.assertEqual([c.args for c in m_acquire.call_args_list], [(254,)] * 4)
+
+    def test_no_rate_without_a_budget(self):
+        paced = PacedIpScanner([])
+        list(DiscoveryPipeline([], [paced], timeout=5)._scan_iter("10.0.0.0/24", HostTable()))
+        self.assertEqual(paced.calls, [("10.0.0.0/24", None)])
+
+class TargetedIpScanner:
+    supports_targets = True
+    supports_patience = True
+    def __init__(self, alive, slow_to_answer=()):
+        self.alive = alive
+        self.slow_to_answer = set(slow_to_answer)
+        self.calls = []
+        self.patience = []
+    def scan_ips(self, subnet, *, timeout, targets=None, patience=1.0):
+        self.calls.append((subnet, None if targets is None else list(targets), timeout))
+        self.patience.append(patience)
+        probed = targets if targets is not None else self.alive
+        # hosts in `slow_to_answer` only reply when each probe waits longer
+        return [ip for ip in probed if ip in self.alive and (ip not in self.slow_to_answer or patience > 1)]
+
+class TestAggregateTargeted(unittest.TestCase):
+    def test_followup_scanners_probe_only_unknown(self):
+        arp = DummyHostScanner([Host(ip="10.0.0.1", mac="aa:00:00:00:00:01"), Host(ip="10.0.0.2")])
+        plain = RecordingIpScanner(["10.0.0.3"])
+        first = TargetedIpScanner(["10.0.0.1", "10.0.0.4"])
+        second = TargetedIpScanner(["10.0.0.4", "10.0.0.5"])
+        pipe = DiscoveryPipeline([arp], [plain, first, second], timeout=5, targeted=True)
+        hosts = pipe.scan("10.0.0.0/29")
+        self.assertEqual({h.ip for h in hosts}, {"10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4", "10.0.0.5"})
+        # untargetable scanners and the first targetable one sweep the whole subnet
+        self.assertEqual(plain.calls, ["10.0.0.0/29"])
+        self.assertEqual(first.calls, [("10.0.0.0/29", None, 5)])
+        self.assertEqual(second.calls, [("10.0.0.0/29", ["10.0.0.5", "10.0.0.6"], 5)])
+
+    def test_retry_pass_uses_longer_timeout(self):
+        scanner = TargetedIpScanner(["10.0.0.1", "10.0.0.2"], slow_to_answer=["10.0.0.2"])
+        pipe = DiscoveryPipeline([], [scanner], timeout=5, retry_timeout=15)
+        self.assertEqual([h.ip for h in pipe.scan("10.0.0.0/30")], ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(scanner.calls, [("10.0.0.0/30", None, 5), ("10.0.0.0/30", ["10.0.0.2"], 15)])
+        self.assertEqual(scanner.patience, [1.0, 3.0])
+
+class TestAggregateNeighbour(unittest.TestCase):
+    @patch("aggregate.read_neigh_table")
+    def test_neighbour_table_only_for_hosts_without_mac(self, m_neigh):
+        hosts = [Host(ip="10.0.0.1", mac="00:11:22:33:44:01"), Host(ip="10.0.0.2", mac="00:11:22:33:44:02")]
+        self.assertEqual(DiscoveryPipeline._apply_neigh(hosts), 0)
+        m_neigh.assert_not_called()
+        m_neigh.return_value = {"10.0.0.1": {"ip": "10.0.0.1", "mac": "ff:ff:ff:ff:ff:01", "dev": "", "state": "STALE"},
+                                "10.0.0.3": {"ip": "10.0.0.3", "mac": "00:11:22:33:44:03", "dev": "", "state": "REACHABLE"}}
+        hosts.append(Host(ip="10.0.0.3"))
+        self.assertEqual(DiscoveryPipeline._apply_neigh(hosts), 1)
+        self.assertEqual([h.mac for h in hosts], ["00:11:22:33:44:01", "00:11:22:33:44:02", "00:11:22:33:44:03"])
+
+def quiet_pipeline(scanners, inventory=None):
+    return DiscoveryPipeline(scanners, [], timeout=5, enable_mdns=False, enable_nbtscan=False, enable_rdns=False,
+                             inventory=inventory)
+
+class TestMultiNetwork(unittest.TestCase):
+    @patch("aggregate.read_neigh_table", return_value={})
+    def test_hosts_are_merged_and_tagged_by_owning_network(self, _):
+        store = InventoryStore(":memory:")
+        self.addCleanup(store.close)
+        eth0 = quiet_pipeline([DummyHostScanner([
+            Host(ip="10.0.0.1", mac="00:00:00:00:00:01"),
+            Host(ip="10.0.1.7"),  # ARP-cache style entry of the other network
+            Host(ip="172.16.0.9", mac="00:00:00:00:00:09"),
+        ])], store)
+        vlan = quiet_pipeline([DummyHostScanner([
+            Host(ip="10.0.1.7", mac="00:00:00:00:00:07"),
+            Host(ip="172.16.0.9"),
+        ])], store)
+        multi = MultiNetworkDiscovery([(ScanTarget("eth0", "10.0.0.0/24"), eth0),
+                                       (ScanTarget("eth0.20", "10.0.1.5/24"), vlan)], inventory=store)
+        hosts = multi.discover()
+        self.assertEqual([(h.ip, h.mac, h.interface, h.subnet) for h in hosts], [
+            ("10.0.0.1", "00:00:00:00:00:01", "eth0", "10.0.0.0/24"),
+            ("10.0.1.7", "00:00:00:00:00:07", "eth0.20", "10.0.1.0/24"),
+            ("172.16.0.9", "00:00:00:00:00:09", "eth0", "10.0.0.0/24"),
+        ])
+        # the merged run is recorded once, not once per network
+        self.assertEqual(sorted(store.previous_run()), ["10.0.0.1", "10.0.1.7", "172.16.0.9"])
+        self.assertEqual(len(multi.last_diff.appeared), 3)
+
+    @patch("aggregate.read_neigh_table", return_value={})
+    def test_single_network_is_not_tagged(self, _):
+        multi = MultiNetworkDiscovery([(ScanTarget(None, "10.0.0.0/24"), quiet_pipeline([DummyHostScanner([Host(ip="10.0.0.1")])]))])
+        self.assertEqual([(h.interface, h.subnet) for h in multi.discover()], [("", "")])
+
+    @patch("aggregate.read_neigh_table", return_value={})
+    def test_per_interface_limit(self, _):
+        import time
+        def target(iface, n):
+            return ScanTarget(iface, f"10.0.{n}.0/24"), quiet_pipeline([SlowHostScanner([Host(ip=f"10.0.{n}.1")], delay=0.2)])
+        multi = MultiNetworkDiscovery([target("eth0", 1), target("eth0", 2), target("eth1", 3)], per_interface=1)
+        start = time.monotonic()
+        self.assertEqual(len(multi.discover()), 3)
+        elapsed = time.monotonic() - start
+        # eth0's two networks run one after the other, eth1 alongside them
+        self.assertGreaterEqual(elapsed, 0.4)
+        self.assertLess(elapsed, 0.6)
@@ -0,0 +1,43 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from benchmarks.bench import compare
+from benchmarks.fake_tools import Segment, arp_scan, fping, ip_cmd, nmap
+from resolvers import _parse_ip_neigh
+from scanners.arp_scan import _parse_arp_scan_output
+from scanners.nmap import parse_nmap_xml
+
+def _run(handler, seg, args):
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        handler(seg, args)
+    return buf.getvalue()
+
+class TestFakeTools(unittest.TestCase):
+    """The fake binaries must produce output the real parsers accept."""
+
+    def setUp(self):
+        self.seg = Segment("127.64.0.0/24", silent=0.5, named=0.5)
+        self.live = list(self.seg.live_hosts())
+
+    def test_segment_is_deterministic(self):
+        self.assertTrue(60 < len(self.live) < 200)
+        self.assertNotIn("127.64.0.1", self.live)  # the scanning host
+        self.assertEqual(self.live, list(Segment("127.64.0.0/24", 0.5, 0.5).live_hosts()))
+        self.assertEqual(list(self.seg.live_hosts("127.64.0.0/25")), [ip for ip in self.live if int(ip.split(".")[3]) < 128])
+
+    def test_outputs_parse(self):
+        hosts = _parse_arp_scan_output(_run(arp_scan, self.seg, ["-I", "bench0", "127.64.0.0/24"]))
+        self.assertEqual([h.ip for h in hosts], self.live)
+        self.assertEqual(hosts[0].mac, Segment.mac(self.live[0]))
+        xml_hosts = parse_nmap_xml(_run(nmap, self.seg, ["-sn", "-n", "-oX", "-", "127.64.0.0/24"]))
+        self.assertEqual([h.ip for h in xml_hosts], self.live)
+        self.assertEqual(xml_hosts[0].mac, Segment.mac(self.live[0]))
+        self.assertEqual(_run(fping, self.seg, ["-a", "-g", "127.64.0.0/24"]).split(), self.live)
+        self.assertEqual(sorted(_parse_ip_neigh(_run(ip_cmd, self.seg, ["-4", "neigh", "show"]))), sorted(self.live))
+
+class TestCompare(unittest.TestCase):
+    def test_flags_growth_over_threshold(self):
+        base = {"cli/256": dict(wall_s=1.0, subprocesses=5, peak_rss_kib=1000)}
+        results = [dict(scenario="cli/256", wall_s=1.1, subprocesses=7, peak_rss_kib=1000)]
+        self.assertEqual(compare(results, base, 0.2), ["cli/256: subprocesses 5 -> 7 (+40%)"])
@@ -18,3 +18,67 @@ class TestCli(unittest.TestCase):
         # sanity: has scanners lists with at least one element each
         self.assertTrue(len(pipe.host_scanners) >= 1)
         self.assertTrue(len(pipe.ip_scanners) >= 1)
+
+    @patch("cli.watch_main")
+    def test_watch_subcommand_dispatch(self, m_watch):
+        cli.main(["watch", "--subnet", "10.0.0.0/24", "--sweep-interval", "60"])
+        m_watch.assert_called_once_with(["--subnet", "10.0.0.0/24", "--sweep-interval", "60"])
+        args = cli.build_parser(watch=True).parse_args(["--subnet", "10.0.0.0/24", "--sweep-interval", "60"])
+        self.assertEqual((args.sweep_interval, args.refresh_interval, args.socket), (60.0, 10.0, None))
+
+    def test_passive_mode_sends_nothing(self):
+        pipe = cli.build_pipeline(interface=None, timeout=5, deep=True, no_arpscan=False, icmp_rate=100,
+                                  passive_only=True, pcap="capture.pcap")
+        self.assertEqual([type(s).__name__ for s in pipe.host_scanners],
+                         ["SeedArpCacheScanner", "PassiveListenerScanner"])
+        self.assertEqual(pipe.ip_scanners, [])
+        self.assertFalse(pipe.enable_mdns or pipe.enable_nbtscan or pipe.enable_rdns)
+
+class TestCliTargets(unittest.TestCase):
+    IP_ADDR = (
+        "2: eth0    inet 192.168.0.110/24 brd 192.168.0.255 scope global eth0\n"
+        "3: eth0.20@eth0    inet 10.20.0.5/22 brd 10.20.3.255 scope global eth0.20\n"
+        "4: wg0    inet 10.99.0.1/32 scope global wg0"
+    )
+
+    @patch("cli.which", return_value="/usr/bin/ip")
+    def test_auto_finds_every_network(self, m_which):
+        with patch("cli.run", return_value=(0, self.IP_ADDR, "")):
+            targets = cli.detect_targets(auto=True, subnets=None)
+            self.assertEqual(targets, [("eth0", "192.168.0.0/24"), ("eth0.20", "10.20.0.0/22"), ("wg0", "10.99.0.1/32")])
+            self.assertEqual(cli.detect_targets(auto=True, subnets=None, interface="eth0.20"),
+                             [("eth0.20", "10.20.0.0/22")])
+
+    @patch("cli.which", return_value="/usr/bin/ip")
+    def test_given_subnets_are_bound_to_their_interface(self, m_which):
+        with patch("cli.run", return_value=(0, self.IP_ADDR, "")):
+            targets = cli.detect_targets(auto=False, subnets=["10.20.1.0/24", "172.16.0.0/24"])
+        self.assertEqual(targets, [("eth0.20", "10.20.1.0/24"), (None, "172.16.0.0/24")])
+        self.assertEqual(cli.detect_targets(False, ["172.16.0.0/24"], interface="eth1"), [("eth1", "172.16.0.0/24")])
+        with self.assertRaises(SystemExit):
+            cli.detect_targets(False, ["not-a-subnet"], interface="eth1")
+
+    def test_subnet_is_repeatable(self):
+        args = cli.build_parser().parse_args(["-s", "10.0.0.0/24", "--subnet", "10.0.1.0/24", "--per-interface", "2"])
+        self.assertEqual((args.subnet, args.per_interface), (["10.0.0.0/24", "10.0.1.0/24"], 2))
+        with self.assertRaises(SystemExit):
+            cli.watch_main(["--subnet", "10.0.0.0/24", "--subnet", "10.0.1.0/24"])
+
+    def test_agent_specs(self):
+        self.assertEqual(cli.parse_agent("10.0.0.5:7707"), ("10.0.0.5:7707", ()))
+        self.assertEqual(cli.parse_agent("/run/a.sock=10.1.0.0/24,10.2.0.0/24"),
+                         ("/run/a.sock", ("10.1.0.0/24", "10.2.0.0/24")))
+        for bad in ("host:port", "box=10.1.0.0/33"):
+            with self.assertRaises(cli.argparse.ArgumentTypeError):
+                cli.parse_agent(bad)
+        args = cli.build_parser(agent=True).parse_args(["--bind", "/run/a.sock", "--subnet", "10.1.0.0/24", "--deep"])
+        self.assertEqual((args.bind, args.subnet, args.deep), ("/run/a.sock", ["10.1.0.0/24"], True))
+        self.assertFalse(hasattr(args, "format"))
+
+    @patch("cli.listen_on")
+    def test_public_agent_needs_a_secret(self, m_listen):
+        with patch("cli.detect_targets", return_value=[cli.ScanTarget("eth0", "10.1.0.0/24")]):
+            with self.assertRaises(SystemExit) as cm:
+                cli.agent_main(["--bind", "0.0.0.0:7707"])
+        self.assertIn("--secret-file", str(cm.exception))
+        m_listen.assert_not_called()
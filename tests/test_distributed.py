@@ -0,0 +1,197 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from aggregate import ScanTarget
+from distributed import (
+    PROTOCOL_VERSION, Agent, AgentSpec, Coordinator, connect_to, listen_on, parse_address, recv_frame, send_frame,
+)
+from models import Host
+
+class FakeEnrichment:
+    skipped = 0
+
+class FakePipeline:
+    """discover_iter over a fixed host list per subnet, optionally slow or failing."""
+    def __init__(self, hosts, delay=0.0, fail=False):
+        self.hosts = hosts
+        self.delay = delay
+        self.fail = fail
+        self.enrichment = FakeEnrichment()
+    def discover_iter(self, subnet, *, updates=True):
+        for h in self.hosts.get(subnet, []):
+            time.sleep(self.delay)
+            yield Host(**h)
+        if self.fail:
+            raise RuntimeError("scanner crashed")
+
+class TestFrames(unittest.TestCase):
+    def test_round_trip_and_errors(self):
+        a, b = socket.socketpair()
+        with a, b:
+            send_frame(a, {"type": "host", "ip": "10.0.0.1"})
+            self.assertEqual(recv_frame(b), {"type": "host", "ip": "10.0.0.1"})
+            a.sendall(b"\x00\x00\x00\x02[]")
+            with self.assertRaises(ValueError):
+                recv_frame(b)
+            a.sendall(b"\x00\x00\x00\x09{}")
+            a.shutdown(socket.SHUT_WR)
+            with self.assertRaises(ValueError):  # closed inside a frame
+                recv_frame(b)
+        c, d = socket.socketpair()
+        with d:
+            c.close()
+            self.assertIsNone(recv_frame(d))
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("unix:/run/agent.sock"), (socket.AF_UNIX, "/run/agent.sock"))
+        self.assertEqual(parse_address("./agent.sock"), (socket.AF_UNIX, "./agent.sock"))
+        self.assertEqual(parse_address("10.1.2.3:9000"), (socket.AF_INET, ("10.1.2.3", 9000)))
+        self.assertEqual(parse_address("scanner-a"), (socket.AF_INET, ("scanner-a", 7707)))
+        self.assertEqual(parse_address("[::1]:9000"), (socket.AF_INET6, ("::1", 9000)))
+        with self.assertRaises(ValueError):
+            parse_address("host:http")
+
+class TestCoordinator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.stop = threading.Event()
+        self.servers = []
+
+    def tearDown(self):
+        self.stop.set()
+        for s in self.servers:
+            s.close()
+        self.tmp.cleanup()
+
+    def agent(self, name, networks, pipeline, **kwargs):
+        path = os.path.join(self.tmp.name, f"{name}.sock")
+        server = listen_on(path)
+        self.servers.append(server)
+        agent = Agent(lambda target: pipeline, [ScanTarget(i, n) for i, n in networks], name=name, **kwargs)
+        threading.Thread(target=agent.serve, args=(server, self.stop), daemon=True).start()
+        return path
+
+    def silent_agent(self, name, networks):
+        """Says hello, then never answers nor sends heartbeats."""
+        path = os.path.join(self.tmp.name, f"{name}.sock")
+        server = listen_on(path)
+        self.servers.append(server)
+
+        def serve():
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            send_frame(conn, dict(type="hello", version=PROTOCOL_VERSION, name=name, networks=networks))
+            self.stop.wait()
+            conn.close()
+        threading.Thread(target=serve, daemon=True).start()
+        return path
+
+    def test_advertised_networks_merged_and_tagged(self):
+        a = self.agent("a", [("eth0", "10.0.1.0/24")], FakePipeline({
+            "10.0.1.0/24": [dict(ip="10.0.1.5", mac="aa:00:00:00:00:05"), dict(ip="10.0.1.2", hostname="nas")],
+        }))
+        b = self.agent("b", [("vlan20", "10.0.2.0/24"), ("vlan30", "10.0.3.0/24")], FakePipeline({
+            "10.0.2.0/24": [dict(ip="10.0.2.9", mac="bb:00:00:00:00:09", vendor="Acme")],
+            "10.0.3.0/24": [dict(ip="10.0.3.1")],
+        }))
+        c = Coordinator([AgentSpec(a), AgentSpec(b)])
+        hosts = c.discover()
+        self.assertEqual([(h.ip, h.interface, h.subnet) for h in hosts], [
+            ("10.0.1.2", "a/eth0", "10.0.1.0/24"), ("10.0.1.5", "a/eth0", "10.0.1.0/24"),
+            ("10.0.2.9", "b/vlan20", "10.0.2.0/24"), ("10.0.3.1", "b/vlan30", "10.0.3.0/24"),
+        ])
+        self.assertEqual(hosts[2].vendor, "Acme")
+        self.assertEqual((c.failed, c.lost), ([], []))
+
+    def test_merge_by_ip_and_mac(self):
+        a = self.agent("a", [("eth0", "10.0.0.0/24")], FakePipeline({
+            "10.0.0.0/24": [dict(ip="10.0.0.7", mac="AA:00:00:00:00:07", hostname="printer"),
+                            dict(ip="10.0.0.8", mac="aa:00:00:00:00:08")],
+        }))
+        b = self.agent("b", [("eth1", "10.0.0.0/24")], FakePipeline({
+            "10.0.0.0/25": [dict(ip="10.0.0.7", mac="aa:00:00:00:00:07", vendor="HP"),
+                            dict(ip="10.0.0.8", mac="cc:00:00:00:00:08")],  # another segment, same plan
+        }))
+        c = Coordinator([AgentSpec(a, ("10.0.0.0/24",)), AgentSpec(b, ("10.0.0.0/25",))])
+        hosts = c.discover()
+        self.assertEqual([(h.ip, h.mac.lower(), h.hostname, h.vendor) for h in hosts], [
+            ("10.0.0.7", "aa:00:00:00:00:07", "printer", "HP"),
+            ("10.0.0.8", "aa:00:00:00:00:08", None, ""),
+            ("10.0.0.8", "cc:00:00:00:00:08", None, ""),
+        ])
+
+    def test_failed_agent_hands_subnet_over(self):
+        crashing = self.agent("a", [("eth0", "10.0.0.0/24")], FakePipeline(
+            {"10.0.0.0/24": [dict(ip="10.0.0.1")]}, fail=True))
+        backup = self.agent("b", [("eth0", "10.0.0.0/24")], FakePipeline(
+            {"10.0.0.0/24": [dict(ip="10.0.0.1", hostname="gw"), dict(ip="10.0.0.2")]}))
+        c = Coordinator([AgentSpec(crashing), AgentSpec(backup)])
+        hosts = c.discover()
+        self.assertEqual([(h.ip, h.hostname) for h in hosts], [("10.0.0.1", "gw"), ("10.0.0.2", None)])
+        self.assertEqual(c.failed, [])
+
+    def test_silent_agent_is_lost_and_missing_agent_reported(self):
+        silent = self.silent_agent("a", [["eth0", "10.0.0.0/24"]])
+        backup = self.agent("b", [("eth0", "10.0.0.0/24")], FakePipeline({"10.0.0.0/24": [dict(ip="10.0.0.3")]}),
+                            heartbeat=0.1)
+        missing = os.path.join(self.tmp.name, "nobody.sock")
+        c = Coordinator([AgentSpec(silent), AgentSpec(missing), AgentSpec(backup)],
+                        subnets=["10.0.0.0/24", "10.9.0.0/24"], idle_timeout=0.3)
+        hosts = c.discover()
+        self.assertEqual([h.ip for h in hosts], ["10.0.0.3"])
+        self.assertEqual(sorted(a for a, _ in c.lost), sorted([silent, missing]))
+        self.assertEqual(c.failed, [("10.9.0.0/24", "no agent on this network")])
+
+    def test_deadline_keeps_partial_results(self):
+        slow = self.agent("a", [("eth0", "10.0.0.0/24")], FakePipeline(
+            {"10.0.0.0/24": [dict(ip=f"10.0.0.{i}") for i in range(1, 50)]}, delay=0.05), heartbeat=0.1)
+        c = Coordinator([AgentSpec(slow)], deadline=0.4)
+        seen = [h.ip for h in c.discover_iter()]
+        self.assertTrue(0 < len(seen) < 49)
+        self.assertEqual(c.failed, [("10.0.0.0/24", "deadline reached")])
+
+    def test_subnets_outside_the_offered_networks_are_refused(self):
+        hosts = {"192.168.5.0/24": [dict(ip="192.168.5.1")], "10.0.0.0/16": [dict(ip="10.0.9.1")]}
+        strict = self.agent("a", [("eth0", "10.0.0.0/24")], FakePipeline(hosts))
+        c = Coordinator([AgentSpec(strict, ("192.168.5.0/24",))], subnets=["10.0.0.0/16"])
+        self.assertEqual(c.discover(), [])
+        self.assertEqual(c.failed, [
+            ("10.0.0.0/16", "no agent on this network"),  # overlapping is not enough
+            ("192.168.5.0/24", "no agent left on this network (last: 192.168.5.0/24 is not on a network "
+                               "this agent offers)"),
+        ])
+        routed = self.agent("b", [("eth0", "10.0.0.0/24")], FakePipeline(hosts), any_subnet=True)
+        c = Coordinator([AgentSpec(routed, ("192.168.5.0/24",))])
+        self.assertEqual([(h.ip, h.interface) for h in c.discover()], [("192.168.5.1", "b")])  # routed, unbound
+
+    def test_shared_secret(self):
+        pipeline = FakePipeline({"10.0.0.0/24": [dict(ip="10.0.0.1")]})
+        path = self.agent("a", [("eth0", "10.0.0.0/24")], pipeline, secret=b"s3cret")
+        c = Coordinator([AgentSpec(path)], secret=b"s3cret")
+        self.assertEqual([h.ip for h in c.discover()], ["10.0.0.1"])
+        for secret, reason in ((b"guess", "authentication failed"), (None, "agent requires a shared secret")):
+            c = Coordinator([AgentSpec(path)], secret=secret)
+            self.assertEqual(c.discover(), [])
+            self.assertEqual(c.lost, [(path, reason)])
+        # a peer that skips the challenge is refused before anything is scanned
+        with connect_to(path, 5) as sock:
+            self.assertIn("challenge", recv_frame(sock))
+            send_frame(sock, dict(type="scan", job=0, subnet="10.0.0.0/24", updates=True))
+            reply = recv_frame(sock)
+            while reply["type"] == "alive":
+                reply = recv_frame(sock)
+            self.assertEqual(reply, dict(type="error", job=None, message="authentication required"))
+            self.assertIsNone(recv_frame(sock))
+        # and a coordinator with a secret does not trust an agent that never asks for it
+        open_agent = self.agent("b", [("eth0", "10.0.0.0/24")], pipeline)
+        c = Coordinator([AgentSpec(open_agent)], secret=b"s3cret")
+        c.discover()
+        self.assertEqual(c.lost, [(open_agent, "agent does not check the shared secret")])
+
+if __name__ == "__main__":
+    unittest.main()
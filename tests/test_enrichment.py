@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from models import Host
+from enrichment import EnrichmentStage
+from netbios import NbstatInfo
+
+def _slow_rdns(ip):
+    if ip.endswith(".9"):
+        time.sleep(1.0)
+    return f"h{ip.rsplit('.', 1)[1]}.lan"
+
+class FakePtrResolver:
+    calls = []
+    def __init__(self, server, **kw):
+        self.server = server or "127.0.0.53"
+    def resolve(self, ips, deadline=None):
+        FakePtrResolver.calls.append(list(ips))
+        return {ip: "rdns.lan" for ip in ips}, 0
+
+class FakeMdnsResolver:
+    def __init__(self, **kw):
+        self.window = kw.get("window")
+    def resolve(self, ips, deadline=None):
+        return ({"10.0.0.1": "m.local"} if "10.0.0.1" in ips else {}), 0
+
+class FakeNetbiosResolver:
+    made = []
+    def __init__(self, **kw):
+        FakeNetbiosResolver.made.append(kw)
+    def resolve(self, ips, deadline=None):
+        time.sleep(deadline)  # nobody answers: uses its whole share
+        return {}, len(ips)
+
+class TestEnrichmentStage(unittest.TestCase):
+    @patch("enrichment.PtrResolver", FakePtrResolver)
+    @patch("enrichment.NetbiosResolver.resolve", return_value=({"10.0.0.2": NbstatInfo("NB", "WG", "00:11:22:33:44:55")}, 0))
+    @patch("enrichment.MdnsResolver", FakeMdnsResolver)
+    def test_priority_order(self, m_nb):
+        FakePtrResolver.calls = []
+        hosts = [Host(ip="10.0.0.1"), Host(ip="10.0.0.2"), Host(ip="10.0.0.3"), Host(ip="10.0.0.4", hostname="keep")]
+        stage = EnrichmentStage(lookup_timeout=1.5)
+        skipped = stage.run(hosts)
+        self.assertEqual(skipped, 0)
+        self.assertEqual([h.hostname for h in hosts], ["m.local", "NB", "rdns.lan", "keep"])
+        self.assertEqual(hosts[1].mac, "00:11:22:33:44:55")
+        self.assertEqual(m_nb.call_args.args[0], ["10.0.0.2", "10.0.0.3"])
+        self.assertEqual(stage.mdns.window, 1.5)
+        self.assertEqual(FakePtrResolver.calls, [["10.0.0.3"]])
+
+    @patch("enrichment.PtrResolver", FakePtrResolver)
+    @patch("enrichment.NetbiosResolver", FakeNetbiosResolver)
+    def test_a_slow_source_leaves_time_for_the_next(self):
+        FakePtrResolver.calls = []
+        FakeNetbiosResolver.made = []
+        hosts = [Host(ip=f"10.0.0.{i}") for i in range(1, 4)]
+        stage = EnrichmentStage(enable_mdns=False, deadline=0.4)
+        skipped = stage.run(hosts)
+        self.assertEqual(FakeNetbiosResolver.made[0]["max_inflight"], 256)
+        self.assertLess(stage.timings["netbios"], 0.3)  # its half of the deadline
+        self.assertEqual(FakePtrResolver.calls, [["10.0.0.1", "10.0.0.2", "10.0.0.3"]])
+        self.assertEqual([h.hostname for h in hosts], ["rdns.lan"] * 3)
+        self.assertEqual((skipped, stage.sources["10.0.0.1"]), (3, "rdns"))
+
+    @patch("rdns.read_resolv_conf", return_value=None)
+    @patch("enrichment.reverse_dns", side_effect=_slow_rdns)
+    def test_deadline_returns_partial_results(self, m_rdns, m_resolv):
+        hosts = [Host(ip=f"10.0.0.{i}") for i in range(1, 10)]
+        stage = EnrichmentStage(enable_mdns=False, enable_netbios=False, workers=4, deadline=0.3)
+        start = time.monotonic()
+        skipped = stage.run(hosts)
+        self.assertLess(time.monotonic() - start, 0.8)
+        self.assertEqual(skipped, 1)
+        self.assertEqual(stage.skipped, 1)
+        self.assertEqual(hosts[0].hostname, "h1.lan")
+        self.assertIsNone(hosts[-1].hostname)
+
+    @patch("rdns.read_resolv_conf", return_value=None)
+    @patch("enrichment.reverse_dns")
+    def test_stuck_lookups_do_not_hold_up_exit(self, m_rdns, m_resolv):
+        release = threading.Event()
+        daemon = []
+        def stuck(ip):
+            daemon.append(threading.current_thread().daemon)
+            release.wait(5)
+        m_rdns.side_effect = stuck
+        hosts = [Host(ip=f"10.0.0.{i}") for i in range(1, 10)]
+        stage = EnrichmentStage(enable_mdns=False, enable_netbios=False, workers=4, deadline=0.2)
+        try:
+            self.assertEqual(stage.run(hosts), 9)
+            # gethostbyaddr cannot be interrupted; the interpreter must not wait for it at exit
+            self.assertEqual(daemon, [True] * 4)
+        finally:
+            release.set()
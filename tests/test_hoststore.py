@@ -0,0 +1,46 @@
+import unittest
+from hoststore import HostTable, int_to_ip, int_to_mac, ip_to_int, mac_to_int
+from models import Host
+
+class TestHostStore(unittest.TestCase):
+    def test_conversions(self):
+        self.assertEqual(ip_to_int("10.0.0.1"), 0x0A000001)
+        self.assertEqual(int_to_ip(0x0A000001), "10.0.0.1")
+        self.assertEqual(mac_to_int("aa:bb:cc:00:11:22"), 0xAABBCC001122)
+        self.assertEqual(int_to_mac(0xAABBCC001122), "aa:bb:cc:00:11:22")
+        self.assertIsNone(mac_to_int("AA:BB:CC:00:11:22"))
+        self.assertIsNone(mac_to_int("aa-bb-cc-00-11-22"))
+
+    def test_numeric_order_and_merge(self):
+        table = HostTable([
+            Host(ip="10.0.0.10", mac="aa:bb:cc:00:00:0a"),
+            Host(ip="10.0.0.9", hostname="nine"),
+            Host(ip="10.0.0.10", hostname="ten", mac="ff:ff:ff:ff:ff:ff", vendor="Acme"),
+        ])
+        self.assertEqual(len(table), 2)
+        self.assertEqual([h.ip for h in table], ["10.0.0.9", "10.0.0.10"])
+        ten = table.get("10.0.0.10")
+        self.assertEqual((ten.hostname, ten.mac, ten.vendor), ("ten", "aa:bb:cc:00:00:0a", "Acme"))
+        self.assertIn("10.0.0.9", table)
+        self.assertNotIn("10.0.0.11", table)
+        self.assertIsNone(table.get("10.0.0.11"))
+
+    def test_live_rows_until_frozen(self):
+        table = HostTable()
+        b = Host(ip="10.0.0.2", mac="aa:bb:cc:00:00:02")
+        a = Host(ip="10.0.0.1")
+        table["10.0.0.2"] = b
+        table["10.0.0.1"] = a
+        self.assertIs(table.get("10.0.0.2"), b)
+        b.hostname = "two"  # updated in place, as enrichment does
+        table.add(Host(ip="10.0.0.1", vendor="Acme"))
+        self.assertEqual(a.vendor, "Acme")
+        self.assertEqual([h.ip for h in table.values()], ["10.0.0.2", "10.0.0.1"])
+        self.assertIs(table.freeze(), table)
+        self.assertIsNot(table.get("10.0.0.2"), b)
+        self.assertEqual([(h.ip, h.hostname, h.mac) for h in table],
+                         [("10.0.0.1", None, ""), ("10.0.0.2", "two", "aa:bb:cc:00:00:02")])
+
+    def test_non_canonical_mac_kept_verbatim(self):
+        table = HostTable([Host(ip="10.0.0.1", mac="AA-BB-CC-00-11-22"), Host(ip="10.0.0.2")])
+        self.assertEqual([h.mac for h in table], ["AA-BB-CC-00-11-22", ""])
@@ -0,0 +1,53 @@
+import unittest
+from models import Host
+from inventory import InventoryStore
+
+class TestInventoryStore(unittest.TestCase):
+    def setUp(self):
+        self.store = InventoryStore(":memory:", hostname_ttl=100, vendor_ttl=1000)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_fresh_entries_are_reused_until_ttl(self):
+        self.store.record([Host(ip="10.0.0.1", hostname="a.lan", mac="AA:BB:CC:DD:EE:01", vendor="V")],
+                          {"10.0.0.1": "rdns"}, now=1000)
+        h = Host(ip="10.0.0.1", mac="aa:bb:cc:dd:ee:01")
+        self.assertEqual(self.store.apply_cached(h, now=1050), (True, True))
+        self.assertEqual((h.hostname, h.vendor), ("a.lan", "V"))
+        self.assertEqual(self.store.lookup("10.0.0.1", "aa:bb:cc:dd:ee:01").source, "rdns")
+
+        # reusing a cached name does not refresh its timestamp
+        self.store.record([h], {"10.0.0.1": "cache"}, cached_vendors={"10.0.0.1"}, now=1050)
+        stale = Host(ip="10.0.0.1", mac="aa:bb:cc:dd:ee:01")
+        self.assertEqual(self.store.apply_cached(stale, now=1150), (False, True))
+        self.assertIsNone(stale.hostname)
+
+    def test_mac_change_is_a_different_entry(self):
+        self.store.record([Host(ip="10.0.0.1", hostname="a.lan", mac="aa:bb:cc:dd:ee:01")], {"10.0.0.1": "mdns"}, now=1)
+        h = Host(ip="10.0.0.1", mac="aa:bb:cc:dd:ee:99")
+        self.assertEqual(self.store.apply_cached(h, now=2), (False, False))
+
+    def test_diff_against_previous_run(self):
+        self.store.record([
+            Host(ip="10.0.0.1", hostname="a.lan", mac="aa:00:00:00:00:01"),
+            Host(ip="10.0.0.2", mac="aa:00:00:00:00:02"),
+        ], now=1)
+        current = [
+            Host(ip="10.0.0.1", hostname="a2.lan", mac="aa:00:00:00:00:01"),
+            Host(ip="10.0.0.3", mac="aa:00:00:00:00:03"),
+        ]
+        diff = self.store.diff(current)
+        self.assertEqual([h.ip for h in diff.appeared], ["10.0.0.3"])
+        self.assertEqual([h.ip for h in diff.disappeared], ["10.0.0.2"])
+        self.assertEqual([(o.hostname, n.hostname) for o, n in diff.changed], [("a.lan", "a2.lan")])
+        self.store.record(current, now=2)
+        self.assertFalse(self.store.diff(current))
+
+    def test_forget_after(self):
+        store = InventoryStore(":memory:", forget_after=10)
+        store.record([Host(ip="10.0.0.1", mac="aa")], now=1)
+        store.record([Host(ip="10.0.0.2", mac="bb")], now=20)
+        self.assertIsNone(store.lookup("10.0.0.1", "aa"))
+        self.assertIsNotNone(store.lookup("10.0.0.2", "bb"))
+        store.close()
@@ -0,0 +1,75 @@
+import socket
+import threading
+import time
+import unittest
+from dnsproto import CLASS_IN, TYPE_A, TYPE_PTR, Record, build_response, parse_message, reverse_name_to_ip
+from mdns import QU_BIT, MdnsResolver
+
+class LoopbackResponder:
+    """Stand-in for mDNS responders: answers PTR questions for known IPs on 127.0.0.1
+    and additionally sends one unsolicited A-record announcement."""
+    def __init__(self, names, announce=None):
+        self.names = names
+        self.announce = announce or {}
+        self.questions = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.1)
+        self.port = self.sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sock.close()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                data, addr = self.sock.recvfrom(9000)
+            except socket.timeout:
+                continue
+            q = parse_message(data)
+            self.questions.append(q)
+            for qname, qtype in q.questions:
+                ip = reverse_name_to_ip(qname)
+                if ip in self.names:
+                    q.questions = [(qname, qtype)]
+                    self.sock.sendto(build_response(q, [Record(qname, TYPE_PTR, CLASS_IN, 120, self.names[ip])], flags=0x8400), addr)
+            for ip, name in self.announce.items():
+                q.questions = []
+                self.sock.sendto(build_response(q, [Record(name, TYPE_A, CLASS_IN, 120, ip)], flags=0x8400), addr)
+
+class TestMdnsResolver(unittest.TestCase):
+    def test_batched_query_and_answers(self):
+        ips = [f"192.168.1.{i}" for i in range(1, 80)]
+        with LoopbackResponder({"192.168.1.5": "printer.local", "192.168.1.70": "tv.local"},
+                               announce={"192.168.1.9": "nas.local"}) as resp:
+            r = MdnsResolver(group="127.0.0.1", port=resp.port, window=0.5, batch_size=32, listen_multicast=False)
+            start = time.monotonic()
+            names, skipped = r.resolve(ips)
+            elapsed = time.monotonic() - start
+        self.assertEqual(names, {"192.168.1.5": "printer.local", "192.168.1.70": "tv.local", "192.168.1.9": "nas.local"})
+        self.assertEqual(skipped, 0)
+        self.assertLess(elapsed, 1.0)
+        # 79 questions in batches of 32 -> 3 packets, all asking for unicast replies
+        self.assertEqual(len(resp.questions), 3)
+        self.assertTrue(all(len(q.questions) <= 32 for q in resp.questions))
+        self.assertEqual(r.announced["192.168.1.9"], "nas.local")
+
+    def test_returns_early_when_all_answered(self):
+        with LoopbackResponder({"10.1.1.1": "a.local"}) as resp:
+            r = MdnsResolver(group="127.0.0.1", port=resp.port, window=3, listen_multicast=False)
+            start = time.monotonic()
+            names, _ = r.resolve(["10.1.1.1"])
+            self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(names, {"10.1.1.1": "a.local"})
+
+    def test_qu_bit(self):
+        packet = MdnsResolver()._queries(["10.0.0.1"])[0]
+        self.assertEqual(packet[-2:], (CLASS_IN | QU_BIT).to_bytes(2, "big"))
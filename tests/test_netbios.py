@@ -0,0 +1,89 @@
+import socket
+import struct
+import threading
+import time
+import unittest
+from netbios import (
+    TYPE_NBSTAT, NetbiosResolver, build_nbstat_query, encode_netbios_name, parse_nbstat_response,
+)
+
+def nbstat_reply(txid, names, mac):
+    body = bytes([len(names)])
+    for name, suffix, flags in names:
+        body += name.encode().ljust(15, b" ") + bytes([suffix]) + struct.pack("!H", flags)
+    body += mac + b"\x00" * 40
+    return (struct.pack("!HHHHHH", txid, 0x8400, 0, 1, 0, 0) + encode_netbios_name("*")
+            + struct.pack("!HHIH", TYPE_NBSTAT, 1, 0, len(body)) + body)
+
+class UdpResponder:
+    """NBSTAT responder bound to one loopback address; `drop` first N requests."""
+    def __init__(self, ip, port, names, mac, drop=0):
+        self.names, self.mac, self.drop = names, mac, drop
+        self.requests = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((ip, port))
+        self.sock.settimeout(0.1)
+        self.port = self.sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.sock.close()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            self.requests += 1
+            if self.requests <= self.drop:
+                continue
+            txid = struct.unpack("!H", data[:2])[0]
+            self.sock.sendto(nbstat_reply(txid, self.names, self.mac), addr)
+
+class TestNetbios(unittest.TestCase):
+    def test_query_encoding(self):
+        q = build_nbstat_query(0xBEEF)
+        self.assertEqual(q[:2], b"\xbe\xef")
+        self.assertEqual(q[12:14], b"\x20C")  # '*' = 0x2A -> 'C','K'
+        self.assertEqual(q[13:15], b"CK")
+        self.assertEqual(q[-4:], struct.pack("!HH", TYPE_NBSTAT, 1))
+
+    def test_parse_name_table(self):
+        raw = nbstat_reply(7, [("WORKGROUP", 0x00, 0x8400), ("DESKTOP-1", 0x00, 0x0400), ("DESKTOP-1", 0x20, 0x0400)],
+                           bytes.fromhex("001122aabbcc"))
+        txid, info = parse_nbstat_response(raw)
+        self.assertEqual(txid, 7)
+        self.assertEqual((info.name, info.domain, info.mac), ("DESKTOP-1", "WORKGROUP", "00:11:22:aa:bb:cc"))
+        self.assertEqual(parse_nbstat_response(raw[:40])[1], None)
+
+    def test_resolver_against_local_responders(self):
+        probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        a = UdpResponder("127.0.0.2", port, [("ALPHA", 0x00, 0x0400)], bytes.fromhex("0000000000aa"))
+        b = UdpResponder("127.0.0.3", port, [("BETA", 0x00, 0x0400), ("LAB", 0x00, 0x8400)], bytes(6), drop=1)
+        try:
+            infos, skipped = NetbiosResolver(port=port, timeout=0.3, retries=2).resolve(
+                ["127.0.0.2", "127.0.0.3", "127.0.0.4"])
+        finally:
+            a.close()
+            b.close()
+        self.assertEqual(skipped, 0)
+        self.assertEqual(set(infos), {"127.0.0.2", "127.0.0.3"})
+        self.assertEqual(infos["127.0.0.2"].mac, "00:00:00:00:00:aa")
+        self.assertEqual((infos["127.0.0.3"].name, infos["127.0.0.3"].domain, infos["127.0.0.3"].mac), ("BETA", "LAB", ""))
+
+    def test_deadline_holds_for_large_batches(self):
+        # nothing answers on 127.1.x.x: all but the first wave are still queued at the deadline
+        ips = [f"127.1.{i // 256}.{i % 256}" for i in range(20000)]
+        start = time.monotonic()
+        infos, skipped = NetbiosResolver(timeout=0.3, retries=0, max_inflight=256).resolve(ips, 0.5)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(infos, {})
+        self.assertEqual(skipped, 20000 - 256)
@@ -0,0 +1,88 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import cli
+from enrichment import EnrichmentStage
+from models import Host
+from oui import OuiDatabase, build_index, mac_value, parse_registry
+
+CSV = (
+    "Registry,Assignment,Organization Name,Organization Address\n"
+    'MA-L,00000C,"Cisco Systems, Inc",170 WEST TASMAN DRIVE SAN JOSE CA US 95134\n'
+    "MA-L,70B3D5,IEEE Registration Authority,445 Hoes Lane Piscataway NJ US 08554\n"
+    "MA-M,70B3D5E,Acme Sensors,Somewhere\n"
+    "MA-S,70B3D5123,Tiny Widgets,Elsewhere\n"
+)
+OUI_TXT = (
+    "00-22-72   (hex)\t\tAmerican Micro-Fuel Device Corp.\n"
+    "002272     (base 16)\t\tAmerican Micro-Fuel Device Corp.\n"
+    "\t\t\t\t2181 Buchanan Loop\n"
+    "\n"
+    "8C-1F-64   (hex)\t\tSmall Block Vendor\n"
+    "FFF000-FFFFFF     (base 16)\t\tSmall Block Vendor\n"
+)
+MANUF = (
+    "# Wireshark manuf\n"
+    "00:00:0C\tCisco\tCisco Systems, Inc\n"
+    "00:1B:C5:00:00:00/36\tConverge\tConverging Systems Inc.\n"
+)
+
+class TestOui(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_parse_formats(self):
+        self.assertIn((28, 0x70B3D5E, "Acme Sensors"), list(parse_registry(CSV)))
+        self.assertEqual(list(parse_registry(OUI_TXT)),
+                         [(24, 0x002272, "American Micro-Fuel Device Corp."), (36, 0x8C1F64FFF, "Small Block Vendor")])
+        self.assertEqual(list(parse_registry(MANUF)),
+                         [(24, 0x00000C, "Cisco Systems, Inc"), (36, 0x001BC5000, "Converging Systems Inc.")])
+        self.assertEqual(list(parse_registry("000000\tXEROX CORPORATION\n")), [(24, 0, "XEROX CORPORATION")])
+
+    def test_longest_prefix_lookup(self):
+        index = os.path.join(self.tmp.name, "oui.idx")
+        self.assertEqual(build_index([self.write("oui.csv", CSV), self.write("oui.txt", OUI_TXT)], index), 6)
+        with OuiDatabase(index) as db:
+            self.assertEqual(len(db), 6)
+            self.assertEqual(db.lookup("00:00:0C:12:34:56"), "Cisco Systems, Inc")
+            self.assertEqual(db.lookup("70-b3-d5-e1-00-00"), "Acme Sensors")
+            self.assertEqual(db.lookup("70:b3:d5:12:3f:ff"), "Tiny Widgets")
+            self.assertEqual(db.lookup("70:b3:d5:00:00:01"), "IEEE Registration Authority")
+            self.assertEqual(db.lookup("8c1f.64ff.f001"), "Small Block Vendor")
+            self.assertIsNone(db.lookup("8c:1f:64:00:00:01"))
+            self.assertIsNone(db.lookup("02:00:0c:00:00:00"))  # locally administered
+            self.assertIsNone(db.lookup("not-a-mac"))
+
+    def test_open_missing_or_invalid(self):
+        self.assertIsNone(OuiDatabase.open(os.path.join(self.tmp.name, "missing.idx")))
+        self.assertIsNone(OuiDatabase.open(self.write("bogus.idx", "definitely not an index")))
+        self.assertIsNone(mac_value("00:11:22:33:44"))
+
+    def test_enrichment_fills_vendor_for_mac_only_hosts(self):
+        index = os.path.join(self.tmp.name, "oui.idx")
+        build_index([self.write("manuf", MANUF)], index)
+        with OuiDatabase(index) as db:
+            stage = EnrichmentStage(enable_mdns=False, enable_netbios=False, enable_rdns=False, vendor_db=db)
+            hosts = [Host(ip="10.0.0.1", mac="00:00:0c:aa:bb:cc"), Host(ip="10.0.0.2", mac="00:00:0c:aa:bb:cd", vendor="arp-scan says"),
+                     Host(ip="10.0.0.3")]
+            updates = list(stage.run_iter(hosts))
+        self.assertEqual([h.vendor for h in hosts], ["Cisco Systems, Inc", "arp-scan says", ""])
+        self.assertEqual(updates, [[hosts[0]]])
+
+    def test_update_command(self):
+        index = os.path.join(self.tmp.name, "sub", "oui.idx")
+        out = io.StringIO()
+        with redirect_stdout(out):
+            cli.main(["update-oui", self.write("oui.csv", CSV), "--index", index])
+        self.assertIn("4 prefixes from 1 file(s)", out.getvalue())
+        with OuiDatabase(index) as db:
+            self.assertEqual(db.lookup("00:00:0c:00:00:01"), "Cisco Systems, Inc")
@@ -1,6 +1,7 @@
 import unittest
 from models import Host
-from output import output_table, output_csv, output_json, output_ansible
+from output import output_table, output_csv, output_json, output_ansible, write_csv, write_json, write_ndjson
+import io
 import json
 
 class TestOutput(unittest.TestCase):
@@ -30,3 +31,68 @@ class TestOutput(unittest.TestCase):
         inv = output_ansible(self.hosts)
         self.assertIn("[scanned]", inv.splitlines()[0])
         self.assertIn("host2.local", inv)
+
+class TestStreamingOutput(unittest.TestCase):
+    def setUp(self):
+        self.hosts = [
+            Host(ip="192.168.0.2", hostname="host2.local", mac="00:11:22:33:44:02", vendor="V1"),
+            Host(ip="192.168.0.10", hostname=None, mac="", vendor=""),
+        ]
+
+    def test_write_ndjson(self):
+        buf = io.StringIO()
+        self.assertEqual(write_ndjson(iter(self.hosts), buf), 2)
+        lines = buf.getvalue().splitlines()
+        self.assertEqual(json.loads(lines[0])["hostname"], "host2.local")
+        self.assertEqual(json.loads(lines[1]), {"ip": "192.168.0.10", "hostname": "", "mac": "", "vendor": ""})
+
+    def test_write_csv_matches_output_csv(self):
+        buf = io.StringIO()
+        write_csv(iter(self.hosts), buf)
+        self.assertEqual(buf.getvalue(), output_csv(self.hosts) + "\n")
+
+    def test_write_json_matches_output_json(self):
+        buf = io.StringIO()
+        write_json(iter(self.hosts), buf)
+        self.assertEqual(buf.getvalue(), output_json(self.hosts) + "\n")
+        empty = io.StringIO()
+        write_json(iter([]), empty)
+        self.assertEqual(json.loads(empty.getvalue()), [])
+
+    def test_writes_before_stream_ends(self):
+        buf = io.StringIO()
+        def gen():
+            yield self.hosts[0]
+            self.assertIn("192.168.0.2", buf.getvalue())
+            yield self.hosts[1]
+        write_ndjson(gen(), buf)
+
+    def test_multi_network_hosts_carry_their_tags(self):
+        tagged = [Host(ip="10.0.0.1", mac="00:00:00:00:00:01", interface="eth0", subnet="10.0.0.0/24"),
+                  Host(ip="10.0.1.7", interface="eth0.20", subnet="10.0.1.0/24")]
+        self.assertEqual(output_csv(tagged).splitlines()[:2], [
+            "ip,hostname,mac,vendor,interface,subnet", "10.0.0.1,,00:00:00:00:00:01,,eth0,10.0.0.0/24"])
+        buf = io.StringIO()
+        write_csv(iter(tagged), buf)
+        self.assertEqual(buf.getvalue(), output_csv(tagged) + "\n")
+        self.assertEqual(json.loads(output_json(tagged))[1]["interface"], "eth0.20")
+        self.assertIn("Subnet", output_table(tagged))
+        self.assertNotIn("interface", output_json(self.hosts))
+
+class TestDiffOutput(unittest.TestCase):
+    def test_output_diff(self):
+        from inventory import InventoryDiff
+        from output import output_diff
+        diff = InventoryDiff(
+            appeared=[Host(ip="10.0.0.3", mac="aa:00:00:00:00:03")],
+            disappeared=[Host(ip="10.0.0.2")],
+            changed=[(Host(ip="10.0.0.1", hostname="a.lan"), Host(ip="10.0.0.1", hostname="b.lan"))],
+        )
+        self.assertEqual(output_diff(diff).splitlines(), [
+            "+ 10.0.0.3    aa:00:00:00:00:03",
+            "- 10.0.0.2",
+            "~ 10.0.0.1  hostname: a.lan -> b.lan",
+        ])
+        events = json.loads(output_diff(diff, "json"))
+        self.assertEqual([e["change"] for e in events], ["appeared", "disappeared", "changed"])
+        self.assertEqual(events[2]["before"]["hostname"], "a.lan")
@@ -0,0 +1,128 @@
+import time
+import unittest
+from aggregate import DiscoveryPipeline
+from inventory import InventoryStore
+from models import Host
+from planner import AdaptivePlanner, ScanHistory, StepLog
+
+class CountingScanner:
+    def __init__(self, ips, delay=0.0):
+        self.ips = ips
+        self.delay = delay
+        self.calls = 0
+    def scan_hosts(self, subnet, *, timeout, interface=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [Host(ip=ip, mac="aa:00:00:00:00:%02x" % int(ip.rsplit(".", 1)[1])) for ip in self.ips]
+
+class ArpSweep(CountingScanner):
+    pass
+
+class SlowEcho(CountingScanner):
+    pass
+
+class ListenerScanner(CountingScanner):
+    passive = True
+
+class TestScanHistory(unittest.TestCase):
+    def setUp(self):
+        self.inventory = InventoryStore(":memory:")
+        self.history = ScanHistory(self.inventory, alpha=0.5)
+
+    def tearDown(self):
+        self.inventory.close()
+
+    def test_moving_averages_and_full_runs(self):
+        self.assertEqual(self.history.since_full("10.0.0.0/24"), (0, 0.0))
+        self.history.record("10.0.0.0/24", {"ArpSweep": (2.0, 10)}, full=True, now=100)
+        self.history.record("10.0.0.1/24", {"ArpSweep": (4.0, 0), "rdns": (1.0, 3)}, full=False, now=200)
+        steps = self.history.steps("10.0.0.0/24")
+        self.assertEqual((steps["ArpSweep"].runs, steps["ArpSweep"].cost, steps["ArpSweep"].gain), (2, 3.0, 5.0))
+        self.assertEqual(steps["rdns"].runs, 1)
+        self.assertEqual(self.history.since_full("10.0.0.0/24"), (1, 100))
+        self.assertEqual(self.history.steps("10.0.1.0/24"), {})
+
+class TestAdaptivePlanner(unittest.TestCase):
+    def setUp(self):
+        self.inventory = InventoryStore(":memory:")
+        self.history = ScanHistory(self.inventory, alpha=1.0)
+
+    def tearDown(self):
+        self.inventory.close()
+
+    def learn(self, observations, runs=2):
+        for i in range(runs):
+            self.history.record("10.0.0.0/24", observations, full=i == 0, now=1000 + i)
+
+    def test_first_run_is_full(self):
+        plan = AdaptivePlanner(self.history).plan("10.0.0.0/24", ["ArpSweep", "SlowEcho"], ["mdns"])
+        self.assertEqual(plan, (["ArpSweep", "SlowEcho"], ["mdns"], [], True))
+
+    def test_skips_useless_steps_and_orders_by_yield_per_second(self):
+        self.learn({"SeedArp": (0.0, 0), "ArpSweep": (2.0, 40), "SlowEcho": (9.0, 0), "Nmap": (4.0, 40),
+                    "mdns": (1.0, 5), "rdns": (2.0, 20)})
+        planner = AdaptivePlanner(self.history, full_after=1e9)
+        plan = planner.plan("10.0.0.0/24", ["SeedArp", "ArpSweep", "SlowEcho", "Nmap", "TcpProbe"],
+                            ["mdns", "rdns"], required={"SeedArp"}, now=1010)
+        # required and not yet learned steps lead, in configured order
+        self.assertEqual(plan.scanners, ["SeedArp", "TcpProbe", "ArpSweep", "Nmap"])
+        self.assertEqual(plan.resolvers, ["rdns", "mdns"])
+        self.assertEqual(plan.skipped, ["SlowEcho"])
+        self.assertFalse(plan.full)
+
+    def test_deadline_leaves_out_what_does_not_fit(self):
+        self.learn({"ArpSweep": (2.0, 40), "Nmap": (8.0, 10), "mdns": (1.0, 5), "rdns": (5.0, 20)})
+        planner = AdaptivePlanner(self.history, deadline=9.5, full_after=1e9)
+        plan = planner.plan("10.0.0.0/24", ["ArpSweep", "Nmap"], ["mdns", "rdns"], now=1010)
+        self.assertEqual((plan.scanners, plan.resolvers, plan.skipped), (["ArpSweep"], ["mdns", "rdns"], ["Nmap"]))
+        # parallel scanners cost their longest member: max(2, 3) + 1 + 5 fits
+        self.learn({"ArpSweep": (2.0, 40), "Nmap": (3.0, 10), "mdns": (1.0, 5), "rdns": (5.0, 20)})
+        plan = planner.plan("10.0.0.0/24", ["ArpSweep", "Nmap"], ["mdns", "rdns"], now=1010)
+        self.assertEqual((plan.scanners, plan.skipped), (["ArpSweep", "Nmap"], []))
+        # one after the other they add up: 2 + 3 + 1 + 5 does not
+        plan = planner.plan("10.0.0.0/24", ["ArpSweep", "Nmap"], ["mdns", "rdns"], sequential=True, now=1010)
+        self.assertEqual((plan.scanners, plan.skipped), (["ArpSweep"], ["Nmap"]))
+
+    def test_periodic_full_run(self):
+        self.learn({"ArpSweep": (2.0, 40), "SlowEcho": (9.0, 0)})
+        planner = AdaptivePlanner(self.history, full_every=3, full_after=1e9)
+        self.assertFalse(planner.plan("10.0.0.0/24", ["ArpSweep", "SlowEcho"], [], now=1010).full)
+        self.history.record("10.0.0.0/24", {"ArpSweep": (2.0, 40)}, full=False, now=1011)
+        self.assertTrue(planner.plan("10.0.0.0/24", ["ArpSweep", "SlowEcho"], [], now=1012).full)
+        aged = AdaptivePlanner(self.history, full_every=100, full_after=60)
+        self.assertTrue(aged.plan("10.0.0.0/24", ["ArpSweep", "SlowEcho"], [], now=1100).full)
+
+class TestStepLog(unittest.TestCase):
+    def test_first_active_finder_gets_the_credit(self):
+        log = StepLog()
+        log.add("ArpSweep", 10.0, 12.0, ["10.0.0.1", "10.0.0.2"])
+        log.add("ArpSweep", 11.0, 13.5, ["10.0.0.3"])  # another shard
+        log.add("Nmap", 10.0, 11.0, ["10.0.0.1", "10.0.0.4", "10.0.0.5"])
+        log.add("SlowEcho", 10.0, 19.0, ["10.0.0.2"])
+        log.add("SeedArp", 10.0, 10.0, ["10.0.0.1", "10.0.0.9"])
+        self.assertEqual(log.observations(["ArpSweep", "Nmap", "SlowEcho"]), {
+            "ArpSweep": (3.5, 3), "Nmap": (1.0, 2), "SlowEcho": (9.0, 0), "SeedArp": (0.0, 1)})
+        # redundant scanners: the later one in run order gets nothing
+        self.assertEqual(log.observations(["Nmap", "ArpSweep", "SlowEcho"])["ArpSweep"], (3.5, 2))
+
+class TestPlannedPipeline(unittest.TestCase):
+    def test_pipeline_learns_to_skip_and_rechecks(self):
+        inventory = InventoryStore(":memory:")
+        self.addCleanup(inventory.close)
+        arp = ArpSweep(["10.0.0.1", "10.0.0.2"])
+        echo = SlowEcho(["10.0.0.1"], delay=0.02)
+        listener = ListenerScanner(["10.0.0.1", "10.0.0.2"])  # hears what the sweep stirs up
+        planner = AdaptivePlanner(ScanHistory(inventory), full_every=4)
+        pipe = DiscoveryPipeline([listener, arp, echo], [], inventory=inventory, planner=planner,
+                                 enable_mdns=False, enable_nbtscan=False, enable_rdns=False)
+        for _ in range(4):
+            self.assertEqual([h.ip for h in pipe.discover("10.0.0.0/24")], ["10.0.0.1", "10.0.0.2"])
+        # full run, still learning, then skipped twice
+        self.assertEqual((arp.calls, echo.calls, listener.calls), (4, 2, 4))
+        self.assertEqual(pipe.last_plan.skipped, ["SlowEcho"])
+        pipe.discover("10.0.0.0/24")
+        self.assertTrue(pipe.last_plan.full)
+        self.assertEqual(echo.calls, 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from dnsproto import (
+    RCODE_NXDOMAIN, TYPE_PTR, Record, build_query, build_response, parse_message,
+    reverse_name, reverse_name_to_ip,
+)
+from rdns import PtrResolver, read_resolv_conf
+
+class StubDnsServer:
+    """Tiny PTR responder on 127.0.0.1; drops the first query for `flaky` IPs."""
+    def __init__(self, names, flaky=(), reverse_order=False):
+        self.names = names
+        self.flaky = set(flaky)
+        self.seen = set()
+        self.queries = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.1)
+        self.port = self.sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sock.close()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            self.queries += 1
+            q = parse_message(data)
+            qname = q.questions[0][0]
+            ip = reverse_name_to_ip(qname)
+            if ip in self.flaky and ip not in self.seen:
+                self.seen.add(ip)
+                continue
+            if ip in self.names:
+                resp = build_response(q, [Record(qname, TYPE_PTR, 1, 60, self.names[ip])])
+            else:
+                resp = build_response(q, [], rcode=RCODE_NXDOMAIN)
+            self.sock.sendto(resp, addr)
+
+class TestDnsProto(unittest.TestCase):
+    def test_reverse_name_roundtrip(self):
+        self.assertEqual(reverse_name("192.168.0.10"), "10.0.168.192.in-addr.arpa")
+        self.assertEqual(reverse_name_to_ip("10.0.168.192.in-addr.arpa."), "192.168.0.10")
+        self.assertIsNone(reverse_name_to_ip("host.local"))
+
+    def test_query_parse(self):
+        msg = parse_message(build_query(0x1234, [("1.0.0.10.in-addr.arpa", TYPE_PTR)]))
+        self.assertEqual(msg.txid, 0x1234)
+        self.assertEqual(msg.questions, [("1.0.0.10.in-addr.arpa", TYPE_PTR)])
+        self.assertFalse(msg.is_response)
+
+    def test_compressed_answer(self):
+        q = parse_message(build_query(7, [("1.0.0.10.in-addr.arpa", TYPE_PTR)]))
+        raw = build_response(q, [])
+        # answer whose owner name is a pointer to the question name (offset 12)
+        rdata = b"\x04host\x03lan\x00"
+        raw = raw[:6] + b"\x00\x01" + raw[8:] + b"\xc0\x0c" + bytes([0, 12, 0, 1, 0, 0, 0, 60, 0, len(rdata)]) + rdata
+        msg = parse_message(raw)
+        self.assertEqual(msg.answers[0].name, "1.0.0.10.in-addr.arpa")
+        self.assertEqual(msg.answers[0].value, "host.lan")
+
+class TestPtrResolver(unittest.TestCase):
+    def test_read_resolv_conf(self):
+        with tempfile.NamedTemporaryFile("w", delete=False) as f:
+            f.write("# comment\nsearch lan\nnameserver 10.0.0.53\nnameserver 1.1.1.1\n")
+        try:
+            self.assertEqual(read_resolv_conf(f.name), "10.0.0.53")
+        finally:
+            os.unlink(f.name)
+        self.assertIsNone(read_resolv_conf("/nonexistent/resolv.conf"))
+
+    def test_batch_against_stub(self):
+        names = {f"10.0.{i // 256}.{i % 256}": f"h{i}.lan" for i in range(0, 2000, 2)}
+        ips = [f"10.0.{i // 256}.{i % 256}" for i in range(2000)]
+        with StubDnsServer(names, flaky=["10.0.0.4"]) as srv:
+            resolver = PtrResolver("127.0.0.1", port=srv.port, timeout=0.3, retries=2)
+            start = time.monotonic()
+            found, skipped = resolver.resolve(ips, deadline=10)
+            elapsed = time.monotonic() - start
+        self.assertEqual(skipped, 0)
+        self.assertEqual(found, names)
+        self.assertLess(elapsed, 5)
+
+    def test_deadline_cuts_off(self):
+        with StubDnsServer({}, flaky=["10.0.0.1", "10.0.0.2"]) as srv:
+            resolver = PtrResolver("127.0.0.1", port=srv.port, timeout=5, retries=0)
+            found, skipped = resolver.resolve(["10.0.0.1", "10.0.0.2", "10.0.0.3"], deadline=0.3)
+        self.assertEqual(found, {})
+        self.assertEqual(skipped, 2)
@@ -25,8 +25,45 @@ class TestResolvers(unittest.TestCase):
         self.assertEqual(ips, ["192.168.0.1", "192.168.0.2"])
 
     @patch("resolvers.which", side_effect=lambda c: "/usr/bin/nbtscan" if c=="nbtscan" else None)
-    @patch("resolvers.run", return_value=(0, "192.168.0.50    ALPHA<00>  UNIQUE\n192.168.0.51    BETA<00>  UNIQUE", ""))
-    def test_run_nbtscan_range(self, m_run, m_which):
+    @patch("resolvers.LineStream", return_value=["192.168.0.50    ALPHA<00>  UNIQUE", "192.168.0.51    BETA<00>  UNIQUE"])
+    def test_run_nbtscan_range(self, m_stream, m_which):
         res = resolvers.run_nbtscan_range("192.168.0.0/24", timeout=10)
         self.assertEqual(res["192.168.0.50"], "ALPHA<00>")
         self.assertEqual(res["192.168.0.51"], "BETA<00>")
+
+    @patch("resolvers.which", return_value="/usr/bin/nbtscan")
+    @patch("resolvers.LineStream", return_value=["Doing NBT name scan", "192.168.0.9", "192.168.0.50    ALPHA<00>  UNIQUE"])
+    def test_short_rows_are_skipped(self, m_stream, m_which):
+        self.assertEqual(resolvers.run_nbtscan_range("192.168.0.0/24", timeout=5), {"192.168.0.50": "ALPHA<00>"})
+
+class TestNeighTable(unittest.TestCase):
+    @patch("resolvers._read_text", side_effect=lambda p: "aa:bb:cc:00:00:05\n" if p.endswith("eth0/address") else "")
+    @patch("resolvers.which", side_effect=lambda c: "/usr/bin/ip" if c=="ip" else None)
+    @patch("resolvers.run", side_effect=[
+        (0, "10.0.0.1 dev eth0 lladdr 11:22:33:44:55:66 REACHABLE\n10.0.0.12 dev eth0 lladdr aa:bb:cc:dd:ee:ff STALE", ""),
+        (0, "1: lo    inet 127.0.0.1/8 scope host lo\n2: eth0    inet 10.0.0.5/24 brd 10.0.0.255 scope global eth0", ""),
+    ])
+    def test_snapshot_is_indexed_and_exact(self, m_run, m_which, m_read):
+        table = resolvers.read_neigh_table()
+        self.assertEqual(m_run.call_count, 2)
+        self.assertEqual(table["10.0.0.1"]["mac"], "11:22:33:44:55:66")
+        self.assertEqual(table["10.0.0.12"]["mac"], "aa:bb:cc:dd:ee:ff")
+        self.assertEqual(table["10.0.0.5"], {"ip": "10.0.0.5", "mac": "aa:bb:cc:00:00:05", "dev": "eth0", "state": "LOCAL"})
+        self.assertNotIn("127.0.0.1", table)
+        # lookups against the snapshot do not fork again
+        self.assertEqual(resolvers.probe_ip_neigh_one("10.0.0.1", table)["state"], "REACHABLE")
+        self.assertEqual(resolvers.probe_ip_neigh_one("10.0.0.2", table)["mac"], "")
+        self.assertEqual(resolvers.list_ip_neigh_all(table), ["10.0.0.1", "10.0.0.12"])
+        self.assertEqual(m_run.call_count, 2)
+
+    def test_parse_proc_net_arp(self):
+        raw = (
+            "IP address       HW type     Flags       HW address            Mask     Device\n"
+            "10.0.0.12        0x1         0x2         aa:bb:cc:dd:ee:ff     *        eth0\n"
+            "10.0.0.1         0x1         0x0         00:00:00:00:00:00     *        eth0\n"
+        )
+        table = resolvers._parse_proc_net_arp(raw)
+        self.assertEqual(table["10.0.0.12"]["mac"], "aa:bb:cc:dd:ee:ff")
+        self.assertEqual(table["10.0.0.12"]["state"], "REACHABLE")
+        self.assertEqual(table["10.0.0.1"]["mac"], "")
+        self.assertEqual(table["10.0.0.1"]["state"], "INCOMPLETE")
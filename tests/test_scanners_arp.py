@@ -0,0 +1,74 @@
+import socket
+import time
+import unittest
+from unittest.mock import patch
+from benchmarks.arp_link import SimulatedArpLink
+from benchmarks.fake_tools import Segment
+from scanners.arp import ArpSweepScanner, build_arp_request, parse_arp_reply
+import cli
+
+class TestArpFrames(unittest.TestCase):
+    def test_request_and_reply(self):
+        mac, ip = bytes.fromhex("0200000000fe"), socket.inet_aton("10.0.0.1")
+        frame = build_arp_request(mac, ip, socket.inet_aton("10.0.0.9"))
+        self.assertEqual((frame[:6], frame[6:12], frame[12:14]), (b"\xff" * 6, mac, b"\x08\x06"))
+        self.assertIsNone(parse_arp_reply(frame))  # a request, not a reply
+        link = SimulatedArpLink(Segment("10.0.0.0/24", silent=0.0))
+        link.latency = 0
+        link.send(frame)
+        self.assertEqual(parse_arp_reply(link.recv(0)[0]), (socket.inet_aton("10.0.0.9"), bytes.fromhex("02000a000009")))
+
+class TestArpSweepScanner(unittest.TestCase):
+    def setUp(self):
+        self.segment = Segment("10.0.0.0/22", silent=0.5)
+        self.links = []
+
+    def scanner(self, loss=0.0, **kw):
+        def transport(interface, subnet):
+            self.links.append(SimulatedArpLink(self.segment, loss=loss, latency=0.0005))
+            return self.links[-1]
+        return ArpSweepScanner(rate=50000, wait=0.05, transport=transport, **kw)
+
+    def test_finds_every_live_host_with_its_mac(self):
+        hosts = self.scanner().scan_hosts("10.0.0.0/22", timeout=10)
+        self.assertEqual(sorted(h.ip for h in hosts), sorted(self.segment.live_hosts()))
+        self.assertTrue(all(h.mac == self.segment.mac(h.ip) for h in hosts))
+        self.assertTrue(self.links[0].closed)
+
+    def test_retransmits_to_non_responders_only(self):
+        hosts = self.scanner(loss=0.3, retries=3).scan_hosts("10.0.0.0/22", timeout=10)
+        live = len(list(self.segment.live_hosts()))
+        self.assertGreater(len(hosts), live * 0.98)
+        # round one covers all 1021 targets, later rounds only the silent and the lost
+        silent = 1021 - live
+        self.assertLess(self.links[0].sent, 1021 + 4 * silent + live)
+
+    def test_yields_hosts_while_still_sending(self):
+        first = next(self.scanner().iter_hosts("10.0.0.0/22", timeout=10))
+        self.assertTrue(self.segment.is_live(first.ip))
+        self.assertLess(self.links[0].sent, 1021)
+
+    def test_targets_and_missing_link(self):
+        hosts = self.scanner(retries=0).scan_hosts("10.0.0.0/22", timeout=10,
+                                                   targets=["10.0.0.5", "10.0.0.9", "10.0.0.1"])
+        self.assertEqual([h.ip for h in hosts], [ip for ip in ("10.0.0.5", "10.0.0.9") if self.segment.is_live(ip)])
+        self.assertEqual(self.links[0].sent, 2)  # never asks for its own address
+        no_link = ArpSweepScanner(transport=lambda interface, subnet: None)
+        self.assertEqual(no_link.scan_hosts("10.0.0.0/24", timeout=1), [])
+
+    def test_patience_stretches_the_wait_for_replies(self):
+        silent = next(ip for ip in ("10.0.0.%d" % i for i in range(2, 255)) if not self.segment.is_live(ip))
+        for patience, least in ((1.0, 0.05), (4.0, 0.2)):
+            start = time.monotonic()
+            self.scanner(retries=0).scan_hosts("10.0.0.0/22", timeout=10, targets=[silent], patience=patience)
+            self.assertGreaterEqual(time.monotonic() - start, least)
+            self.assertLess(time.monotonic() - start, least + 0.1)
+
+class TestArpEngineChoice(unittest.TestCase):
+    def test_auto_prefers_arp_scan_when_installed(self):
+        with patch("cli.which", return_value="/usr/sbin/arp-scan"):
+            self.assertEqual(type(cli.arp_sweeper("auto")).__name__, "ArpScanScanner")
+            self.assertIsNone(cli.arp_sweeper("auto", no_arpscan=True))
+        with patch("cli.which", return_value=None):
+            self.assertEqual(type(cli.arp_sweeper("auto")).__name__, "ArpSweepScanner")
+        self.assertEqual(type(cli.arp_sweeper("native", no_arpscan=True)).__name__, "ArpSweepScanner")
@@ -1,5 +1,7 @@
 import unittest
 from unittest.mock import patch
+from aggregate import DiscoveryPipeline
+from hoststore import HostTable
 from scanners.arp_scan import _parse_arp_scan_output, ArpScanScanner
 
 class TestScannerArpScan(unittest.TestCase):
@@ -19,9 +21,31 @@ class TestScannerArpScan(unittest.TestCase):
         self.assertEqual(hosts[1].mac, "AA:BB:CC:DD:EE:FF")
 
     @patch("scanners.arp_scan.which", return_value="/usr/bin/arp-scan")
-    @patch("scanners.arp_scan.run", return_value=(0, "192.168.0.2\t00:aa:bb:cc:dd:ee\tV\n", ""))
-    def test_scan_hosts(self, m_run, m_which):
+    @patch("scanners.arp_scan.LineStream", return_value=["Interface: eth0", "192.168.0.2\t00:aa:bb:cc:dd:ee\tV"])
+    def test_scan_hosts(self, m_stream, m_which):
         s = ArpScanScanner()
         hosts = s.scan_hosts("192.168.0.0/24", timeout=5, interface=None)
         self.assertEqual(len(hosts), 1)
         self.assertEqual(hosts[0].ip, "192.168.0.2")
+        self.assertEqual(m_stream.call_args[0][0], ["arp-scan", "192.168.0.0/24"])
+        s.scan_hosts("192.168.0.0/24", timeout=5, interface="eth0", rate=500)
+        self.assertEqual(m_stream.call_args[0][0], ["arp-scan", "--interval=2000u", "-I", "eth0", "192.168.0.0/24"])
+        s.scan_hosts("192.168.0.0/24", timeout=15, interface=None, patience=3)
+        self.assertEqual(m_stream.call_args[0][0], ["arp-scan", "--timeout=1500", "192.168.0.0/24"])
+
+    @patch("scanners.arp_scan.which", return_value="/usr/bin/arp-scan")
+    @patch("scanners.arp_scan.LineStream", return_value=[])
+    def test_each_shard_sweeps_only_itself(self, m_stream, m_which):
+        pipe = DiscoveryPipeline([ArpScanScanner()], [], timeout=5, shard_prefix=24, max_shards=2)
+        list(pipe._scan_iter("10.0.0.0/22", HostTable()))
+        self.assertEqual(sorted(c.args[0] for c in m_stream.call_args_list),
+                         [["arp-scan", f"10.0.{i}.0/24"] for i in range(4)])
+
+    @patch("scanners.arp_scan.which", return_value="/usr/bin/arp-scan")
+    def test_iter_hosts_yields_before_the_tool_finishes(self, m_which):
+        def lines(cmd, timeout):
+            yield "192.168.0.2\t00:aa:bb:cc:dd:ee\tV"
+            raise AssertionError("read past the first host")
+        with patch("scanners.arp_scan.LineStream", side_effect=lines):
+            first = next(ArpScanScanner().iter_hosts("192.168.0.0/24", timeout=5, interface="eth0"))
+        self.assertEqual(first.mac, "00:aa:bb:cc:dd:ee")
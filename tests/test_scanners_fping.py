@@ -4,8 +4,13 @@ from scanners.fping import FpingSweepScanner
 
 class TestScannerFping(unittest.TestCase):
     @patch("scanners.fping.which", return_value="/usr/bin/fping")
-    @patch("scanners.fping.run", return_value=(0, "192.168.0.2\n192.168.0.3\n", ""))
-    def test_scan_ips(self, m_run, m_which):
+    @patch("scanners.fping.LineStream", return_value=["192.168.0.2", "192.168.0.3", ""])
+    def test_scan_ips(self, m_stream, m_which):
         s = FpingSweepScanner()
         ips = s.scan_ips("192.168.0.0/24", timeout=5)
         self.assertEqual(ips, ["192.168.0.2", "192.168.0.3"])
+        s.scan_ips("192.168.0.0/24", timeout=5, rate=300)
+        self.assertEqual(m_stream.call_args[0][0][-4:], ["-i", "4", "-g", "192.168.0.0/24"])
+        self.assertEqual(m_stream.call_args[0][0][:6], ["fping", "-a", "-r", "0", "-t", "200"])
+        s.scan_ips("192.168.0.0/24", timeout=15, patience=3)
+        self.assertEqual(m_stream.call_args[0][0][:6], ["fping", "-a", "-r", "0", "-t", "600"])
@@ -0,0 +1,38 @@
+import struct
+import time
+import unittest
+from scanners.icmp import (
+    IcmpEchoScanner, build_echo_request, icmp_checksum, open_icmp_socket, parse_echo_reply,
+)
+
+def _icmp_available():
+    sock, _ = open_icmp_socket()
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+class TestScannerIcmp(unittest.TestCase):
+    def test_echo_request_checksum(self):
+        pkt = build_echo_request(0x1234, 7)
+        self.assertEqual(pkt[0], 8)
+        self.assertEqual(icmp_checksum(pkt), 0)
+        self.assertEqual(struct.unpack("!HH", pkt[4:8]), (0x1234, 7))
+
+    def test_parse_echo_reply(self):
+        reply = b"\x00" + build_echo_request(5, 9)[1:]
+        self.assertEqual(parse_echo_reply(reply, raw=False), (5, 9))
+        ip_header = b"\x45" + b"\x00" * 19
+        self.assertEqual(parse_echo_reply(ip_header + reply, raw=True), (5, 9))
+        # our own echo request looped back on a raw socket is not a reply
+        self.assertIsNone(parse_echo_reply(ip_header + build_echo_request(5, 9), raw=True))
+
+    @unittest.skipUnless(_icmp_available(), "no ICMP socket permitted (ping_group_range / CAP_NET_RAW)")
+    def test_sweep_loopback(self):
+        s = IcmpEchoScanner(rate=20000, wait=0.5)
+        start = time.monotonic()
+        ips = s.scan_ips("127.0.0.0/22", timeout=10)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(len(ips), 1022)
+        self.assertEqual(ips[0], "127.0.0.1")
+        self.assertEqual(ips[-1], "127.0.3.254")
@@ -1,21 +1,68 @@
 import unittest
 from unittest.mock import patch
-from scanners.nmap import _parse_nmap_grepable, NmapPingScanner
+from scanners.nmap import NmapPingScanner, NmapXmlParser, parse_nmap_xml
+
+XML = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE nmaprun>
+<nmaprun scanner="nmap" args="nmap -sn -n -oX - 192.168.0.0/24" start="1700000000" version="7.94">
+<host><status state="up" reason="arp-response" reason_ttl="0"/>
+<address addr="192.168.0.1" addrtype="ipv4"/>
+<address addr="00:11:22:33:44:55" addrtype="mac" vendor="Router Inc"/>
+<hostnames>
+</hostnames>
+<times srtt="380" rttvar="5000" to="100000"/>
+</host>
+<host><status state="up" reason="localhost-response" reason_ttl="0"/>
+<address addr="192.168.0.9" addrtype="ipv4"/>
+<hostnames><hostname name="me.lan" type="PTR"/></hostnames>
+</host>
+<host><status state="down" reason="no-response" reason_ttl="0"/>
+<address addr="192.168.0.10" addrtype="ipv4"/>
+</host>
+<runstats><finished time="1700000002" elapsed="2.05"/><hosts up="2" down="254" total="256"/></runstats>
+</nmaprun>
+"""
 
 class TestScannerNmap(unittest.TestCase):
-    def test_parse_nmap_grepable(self):
-        raw = (
-            "# Nmap scan\n"
-            "Host: 192.168.0.10 ()\tStatus: Up\n"
-            "Host: 192.168.0.11 ()\tStatus: Up\n"
-            "# end\n"
-        )
-        ips = _parse_nmap_grepable(raw)
-        self.assertEqual(ips, ["192.168.0.10", "192.168.0.11"])
+    def test_parse_nmap_xml(self):
+        hosts = parse_nmap_xml(XML)
+        self.assertEqual([(h.ip, h.mac, h.vendor, h.hostname) for h in hosts], [
+            ("192.168.0.1", "00:11:22:33:44:55", "Router Inc", None),
+            ("192.168.0.9", "", "", "me.lan"),
+        ])
+
+    def test_xml_parser_is_incremental_and_tolerates_truncation(self):
+        parser = NmapXmlParser()
+        cut = XML.index("<host><status state=\"up\" reason=\"localhost")
+        first = parser.feed(XML[:cut])
+        self.assertEqual([h.ip for h in first], ["192.168.0.1"])
+        # nmap killed mid-host: the partial record is dropped, nothing raises
+        self.assertEqual(parser.feed(XML[cut:cut + 60]), [])
 
     @patch("scanners.nmap.which", return_value="/usr/bin/nmap")
-    @patch("scanners.nmap.run", return_value=(0, "Host: 192.168.0.3 ()\tStatus: Up\n", ""))
-    def test_scan_ips(self, m_run, m_which):
+    @patch("scanners.nmap.LineStream", return_value=XML.splitlines())
+    def test_scan_hosts(self, m_run, m_which):
         s = NmapPingScanner()
-        ips = s.scan_ips("192.168.0.0/24", timeout=5)
-        self.assertEqual(ips, ["192.168.0.3"])
+        hosts = s.scan_hosts("192.168.0.0/24", timeout=5)
+        self.assertEqual([h.ip for h in hosts], ["192.168.0.1", "192.168.0.9"])
+        self.assertEqual(m_run.call_args[0][0], ["nmap", "-sn", "-n", "-oX", "-", "192.168.0.0/24"])
+        self.assertEqual(s.scan_ips("192.168.0.0/24", timeout=5), ["192.168.0.1", "192.168.0.9"])
+        s.scan_ips("192.168.0.0/24", timeout=5, rate=250)
+        self.assertEqual(m_run.call_args[0][0][5:], ["--max-rate", "250.00", "192.168.0.0/24"])
+        s.scan_ips("192.168.0.0/24", timeout=15, patience=3)
+        self.assertEqual(m_run.call_args[0][0][5:], ["--initial-rtt-timeout", "3000ms", "192.168.0.0/24"])
+
+    @patch("scanners.nmap.which", return_value="/usr/bin/nmap")
+    def test_scan_hosts_targets_go_through_a_target_file(self, m_which):
+        seen = {}
+        def fake_stream(cmd, timeout):
+            seen["cmd"] = cmd
+            with open(cmd[cmd.index("-iL") + 1]) as f:
+                seen["targets"] = f.read().split()
+            return XML.splitlines()
+        with patch("scanners.nmap.LineStream", side_effect=fake_stream):
+            hosts = NmapPingScanner().scan_hosts("192.168.0.0/24", timeout=5, targets=["192.168.0.1", "192.168.0.12"])
+        self.assertEqual(len(hosts), 2)
+        self.assertEqual(seen["cmd"][:5], ["nmap", "-sn", "-n", "-oX", "-"])
+        self.assertEqual(seen["targets"], ["192.168.0.1", "192.168.0.12"])
+        self.assertEqual(NmapPingScanner().scan_hosts("192.168.0.0/24", timeout=5, targets=[]), [])
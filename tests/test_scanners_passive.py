@@ -0,0 +1,121 @@
+import os
+import socket
+import struct
+import tempfile
+import unittest
+from dnsproto import CLASS_IN, TYPE_A, TYPE_PTR, Message, Record, build_response
+from scanners.passive import PassiveListenerScanner, PassiveSightings, Sighting, parse_frame, read_pcap
+
+BROADCAST = b"\xff" * 6
+
+def mac(text):
+    return bytes.fromhex(text.replace(":", ""))
+
+def ether(src, dst, ethertype, payload, vlan=None):
+    tag = struct.pack("!HH", 0x8100, vlan) if vlan is not None else b""
+    return dst + mac(src) + tag + struct.pack("!H", ethertype) + payload
+
+def arp(sender_mac, sender_ip, target_ip, op=1, vlan=None):
+    body = struct.pack("!HHBBH", 1, 0x0800, 6, 4, op) + mac(sender_mac) + socket.inet_aton(sender_ip) \
+        + b"\x00" * 6 + socket.inet_aton(target_ip)
+    return ether(sender_mac, BROADCAST, 0x0806, body, vlan)
+
+def udp(src_mac, src_ip, dst_ip, sport, dport, payload):
+    segment = struct.pack("!HHHH", sport, dport, 8 + len(payload), 0) + payload
+    header = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(segment), 0, 0, 255, 17, 0,
+                         socket.inet_aton(src_ip), socket.inet_aton(dst_ip))
+    return ether(src_mac, BROADCAST, 0x0800, header + segment)
+
+def mdns_announcement(src_mac, src_ip, name):
+    answers = [Record(name + ".", TYPE_A, CLASS_IN, 120, src_ip),
+               Record(".".join(reversed(src_ip.split("."))) + ".in-addr.arpa", TYPE_PTR, CLASS_IN, 120, name)]
+    payload = build_response(Message(txid=0, flags=0), answers, flags=0x8400)
+    return udp(src_mac, src_ip, "224.0.0.251", 5353, 5353, payload)
+
+def dhcp_request(client_mac, hostname=None, requested=None, ciaddr="0.0.0.0"):
+    options = b"\x35\x01" + (b"\x03" if requested or ciaddr != "0.0.0.0" else b"\x01")
+    if hostname:
+        options += bytes([12, len(hostname)]) + hostname.encode()
+    if requested:
+        options += b"\x32\x04" + socket.inet_aton(requested)
+    bootp = struct.pack("!BBBBIHH", 1, 1, 6, 0, 0x1234, 0, 0) + socket.inet_aton(ciaddr) + b"\x00" * 12 \
+        + mac(client_mac) + b"\x00" * 10 + b"\x00" * 192 + b"\x63\x82\x53\x63" + options + b"\xff"
+    return udp(client_mac, "0.0.0.0", "255.255.255.255", 68, 67, bootp)
+
+def write_pcap(path, frames, nanosecond=False, big_endian=False):
+    order = ">" if big_endian else "<"
+    magic = 0xA1B23C4D if nanosecond else 0xA1B2C3D4
+    with open(path, "wb") as f:
+        f.write(struct.pack(order + "IHHiIII", magic, 2, 4, 0, 0, 65535, 1))
+        for i, frame in enumerate(frames):
+            f.write(struct.pack(order + "IIII", 1700000000 + i, 0, len(frame), len(frame)) + frame)
+
+class TestPassiveFrames(unittest.TestCase):
+    def test_arp_request_reply_and_gratuitous(self):
+        self.assertEqual(parse_frame(arp("00:11:22:33:44:01", "192.168.0.1", "192.168.0.7")),
+                         [Sighting("192.168.0.1", "00:11:22:33:44:01")])
+        self.assertEqual(parse_frame(arp("00:11:22:33:44:02", "192.168.0.2", "192.168.0.2", op=2, vlan=10)),
+                         [Sighting("192.168.0.2", "00:11:22:33:44:02")])
+        # an ARP probe (sender 0.0.0.0) proves nothing yet
+        self.assertEqual(parse_frame(arp("00:11:22:33:44:03", "0.0.0.0", "192.168.0.3")), [])
+
+    def test_mdns_announcement_names_the_sender(self):
+        sightings = parse_frame(mdns_announcement("00:11:22:33:44:05", "192.168.0.5", "printer.local"))
+        self.assertIn(Sighting("192.168.0.5", "00:11:22:33:44:05", "printer.local"), sightings)
+        self.assertTrue(all(s.ip == "192.168.0.5" for s in sightings))
+
+    def test_dhcp_option_12(self):
+        self.assertEqual(parse_frame(dhcp_request("00:11:22:33:44:09", "laptop", requested="192.168.0.9")),
+                         [Sighting("192.168.0.9", "00:11:22:33:44:09", "laptop")])
+        self.assertEqual(parse_frame(dhcp_request("00:11:22:33:44:09", "laptop")),
+                         [Sighting("", "00:11:22:33:44:09", "laptop")])
+
+    def test_garbage_is_ignored(self):
+        self.assertEqual(parse_frame(b"\x00" * 10), [])
+        self.assertEqual(parse_frame(udp("00:11:22:33:44:05", "192.168.0.5", "224.0.0.251", 5353, 5353, b"\x01")),
+                         [Sighting("192.168.0.5", "00:11:22:33:44:05")])
+
+class TestPassiveSightings(unittest.TestCase):
+    def test_discover_name_attaches_once_the_address_is_known(self):
+        sightings = PassiveSightings("192.168.0.0/24")
+        self.assertIsNone(sightings.add(Sighting("", "00:11:22:33:44:09", "laptop")))
+        host = sightings.add(Sighting("192.168.0.9", "00:11:22:33:44:09"))
+        self.assertEqual((host.ip, host.mac, host.hostname), ("192.168.0.9", "00:11:22:33:44:09", "laptop"))
+        self.assertIsNone(sightings.add(Sighting("192.168.0.9", "00:11:22:33:44:09")))  # nothing new
+        self.assertIsNone(sightings.add(Sighting("10.0.0.1", "00:11:22:33:44:10")))  # other subnet
+
+class TestPassiveListenerScanner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.pcap = os.path.join(self.tmp.name, "segment.pcap")
+
+    def test_replay_pcap(self):
+        write_pcap(self.pcap, [
+            dhcp_request("00:11:22:33:44:09", "laptop"),
+            arp("00:11:22:33:44:01", "192.168.0.1", "192.168.0.9"),
+            mdns_announcement("00:11:22:33:44:05", "192.168.0.5", "printer.local"),
+            dhcp_request("00:11:22:33:44:09", "laptop", requested="192.168.0.9"),
+            arp("00:11:22:33:44:77", "10.1.1.1", "10.1.1.2"),
+        ], nanosecond=True, big_endian=True)
+        hosts = PassiveListenerScanner(pcap=self.pcap).scan_hosts("192.168.0.0/24", timeout=5)
+        self.assertEqual([(h.ip, h.mac, h.hostname) for h in hosts], [
+            ("192.168.0.1", "00:11:22:33:44:01", None),
+            ("192.168.0.5", "00:11:22:33:44:05", "printer.local"),
+            ("192.168.0.9", "00:11:22:33:44:09", "laptop"),
+        ])
+
+    def test_iter_hosts_reports_each_update(self):
+        write_pcap(self.pcap, [
+            arp("00:11:22:33:44:05", "192.168.0.5", "192.168.0.1"),
+            arp("00:11:22:33:44:05", "192.168.0.5", "192.168.0.1"),
+            mdns_announcement("00:11:22:33:44:05", "192.168.0.5", "printer.local"),
+        ])
+        updates = list(PassiveListenerScanner(pcap=self.pcap).iter_hosts("192.168.0.0/24", timeout=5))
+        self.assertEqual([h.hostname for h in updates], [None, "printer.local"])
+
+    def test_read_pcap_rejects_other_formats(self):
+        with open(self.pcap, "wb") as f:
+            f.write(b"\x0a\x0d\x0d\x0a" + b"\x00" * 28)  # pcapng
+        with open(self.pcap, "rb") as f, self.assertRaises(ValueError):
+            list(read_pcap(f))
@@ -3,9 +3,15 @@ from unittest.mock import patch
 from scanners.seed_arp import SeedArpCacheScanner
 
 class TestScannerSeedArp(unittest.TestCase):
-    @patch("scanners.seed_arp.list_ip_neigh_all", return_value=["192.168.0.2", "192.168.0.3"])
-    def test_seed_from_arp_cache(self, m_list):
+    @patch("scanners.seed_arp.read_neigh_table", return_value={
+        "192.168.0.2": {"ip": "192.168.0.2", "mac": "aa:bb:cc:dd:ee:02", "dev": "eth0", "state": "REACHABLE"},
+        "192.168.0.3": {"ip": "192.168.0.3", "mac": "aa:bb:cc:dd:ee:03", "dev": "eth0", "state": "STALE"},
+        "192.168.0.4": {"ip": "192.168.0.4", "mac": "", "dev": "eth0", "state": "FAILED"},
+    })
+    def test_seed_from_arp_cache(self, m_table):
         s = SeedArpCacheScanner()
         hosts = s.scan_hosts("192.168.0.0/24", timeout=5, interface=None)
         ips = [h.ip for h in hosts]
         self.assertEqual(ips, ["192.168.0.2", "192.168.0.3"])
+        self.assertEqual(hosts[0].mac, "aa:bb:cc:dd:ee:02")
+        m_table.assert_called_once()
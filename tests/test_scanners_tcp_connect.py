@@ -0,0 +1,73 @@
+import asyncio
+import socket
+import time
+import unittest
+from unittest.mock import patch
+from scanners.tcp_connect import TcpConnectScanner
+
+class TestScannerTcpConnect(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+
+    def tearDown(self):
+        self.listener.close()
+
+    def test_handshake_is_alive(self):
+        s = TcpConnectScanner([self.port])
+        self.assertEqual(s.scan_ips("127.0.0.1/32", timeout=5), ["127.0.0.1"])
+
+    def test_rst_is_alive(self):
+        # nothing listens on this port at 127.0.0.2-3: the kernel answers with RST
+        s = TcpConnectScanner([self.port])
+        self.assertEqual(s.scan_ips("127.0.0.2/31", timeout=5), ["127.0.0.2", "127.0.0.3"])
+
+    def test_short_circuit_on_first_answer(self):
+        cancelled = []
+
+        async def fake_probe(self, ip, port, sem, connect_timeout=None):
+            if port == 1:
+                return True
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(port)
+                raise
+            return False
+
+        with patch.object(TcpConnectScanner, "_probe", fake_probe):
+            start = time.monotonic()
+            ips = TcpConnectScanner([2, 1, 3]).scan_ips("10.9.9.1/32", timeout=10)
+        self.assertEqual(ips, ["10.9.9.1"])
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(sorted(cancelled), [2, 3])
+
+    def test_inflight_cap(self):
+        peak = []
+        current = [0]
+
+        async def fake_probe(self, ip, port, sem, connect_timeout=None):
+            async with sem:
+                current[0] += 1
+                peak.append(current[0])
+                await asyncio.sleep(0.01)
+                current[0] -= 1
+                return False
+
+        with patch.object(TcpConnectScanner, "_probe", fake_probe):
+            TcpConnectScanner([1, 2], max_inflight=8).scan_ips("10.9.9.0/27", timeout=10)
+        self.assertEqual(max(peak), 8)
+
+    def test_patience_stretches_connect_timeout(self):
+        seen = []
+
+        async def fake_probe(self, ip, port, sem, connect_timeout=None):
+            seen.append(connect_timeout)
+            return False
+
+        with patch.object(TcpConnectScanner, "_probe", fake_probe):
+            TcpConnectScanner([1], connect_timeout=0.5).scan_ips("10.9.9.1/32", timeout=10)
+            TcpConnectScanner([1], connect_timeout=0.5).scan_ips("10.9.9.1/32", timeout=30, patience=3)
+        self.assertEqual(seen, [0.5, 1.5])
@@ -0,0 +1,33 @@
+import unittest
+from scheduler import RateBudget, host_count, shard_subnet
+
+class TestScheduler(unittest.TestCase):
+    def test_shard_subnet(self):
+        self.assertEqual(shard_subnet("10.0.0.0/24"), ["10.0.0.0/24"])
+        self.assertEqual(shard_subnet("10.0.0.5/24"), ["10.0.0.5/24"])
+        shards = shard_subnet("10.0.0.0/22")
+        self.assertEqual(shards, ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24", "10.0.3.0/24"])
+        self.assertEqual(len(shard_subnet("10.0.0.0/16")), 256)
+        self.assertEqual(shard_subnet("10.0.0.0/16", None), ["10.0.0.0/16"])
+
+    def test_host_count(self):
+        self.assertEqual(host_count("10.0.0.0/24"), 254)
+        self.assertEqual(host_count("10.0.0.1/32"), 1)
+
+    def test_rate_budget(self):
+        now = [0.0]
+        sleeps = []
+        def sleep(dt):
+            sleeps.append(dt)
+            now[0] += dt
+        budget = RateBudget(500, clock=lambda: now[0], sleep=sleep)
+        budget.acquire(254)   # bucket starts full
+        budget.acquire(254)   # needs 8 more tokens
+        self.assertAlmostEqual(sum(sleeps), 8 / 500)
+        budget.acquire(1000)  # bigger than the bucket: waits for a full bucket, then owes the rest
+        budget.acquire(1)
+        # 1509 tokens in total, 500 of them from the initially full bucket
+        self.assertAlmostEqual(now[0], (1509 - 500) / 500, places=6)
+
+    def test_unlimited(self):
+        RateBudget(None, sleep=lambda dt: self.fail("should not sleep")).acquire(10 ** 6)
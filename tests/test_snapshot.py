@@ -0,0 +1,155 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import ansible_inventory
+import cli
+from models import Host
+from snapshot import VERSION, ansible_inventory as inventory_of, group_name, read_snapshot, start_rescan, write_snapshot
+
+class FakeDiscovery:
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.last_sources = {"10.0.0.2": "mdns"}
+        self.skipped = 0
+    def discover(self):
+        return list(self.hosts)
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "localnet", "snapshot.json")
+
+    def test_round_trip_tags_untagged_hosts(self):
+        hosts = [
+            Host(ip="10.0.0.10", mac="aa:00:00:00:00:0a", vendor="Apple, Inc."),
+            Host(ip="10.0.0.2", hostname="nas", mac="aa:00:00:00:00:02"),
+            Host(ip="10.0.1.7", hostname="pi", interface="eth1", subnet="10.0.1.0/24"),
+        ]
+        n = write_snapshot(self.path, hosts, sources={"10.0.0.2": "mdns"},
+                           networks=[("eth0", "10.0.0.0/24")], now=1000.5)
+        self.assertEqual(n, 3)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["snapshot.json"])
+        snap = read_snapshot(self.path)
+        self.assertEqual(snap.created, 1000)
+        self.assertEqual([tuple(h) for h in snap.hosts], [
+            ("10.0.0.2", "nas", "aa:00:00:00:00:02", "", "eth0", "10.0.0.0/24", "mdns", 1000),
+            ("10.0.0.10", "", "aa:00:00:00:00:0a", "Apple, Inc.", "eth0", "10.0.0.0/24", "", 1000),
+            ("10.0.1.7", "pi", "", "", "eth1", "10.0.1.0/24", "scan", 1000),
+        ])
+
+    def test_keep_carries_recent_hosts_over(self):
+        write_snapshot(self.path, [Host(ip="10.0.0.1"), Host(ip="10.0.0.2")], now=1000)
+        write_snapshot(self.path, [Host(ip="10.0.0.3")], now=1500)
+        write_snapshot(self.path, [Host(ip="10.0.0.1")], keep=600, now=2000)
+        self.assertEqual([(h.ip, h.last_seen) for h in read_snapshot(self.path).hosts],
+                         [("10.0.0.1", 2000), ("10.0.0.3", 1500)])
+
+    def test_failed_write_keeps_previous_snapshot(self):
+        write_snapshot(self.path, [Host(ip="10.0.0.1")], now=1000)
+        with patch("snapshot.json.dump", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                write_snapshot(self.path, [Host(ip="10.0.0.9")], now=2000)
+        self.assertEqual([h.ip for h in read_snapshot(self.path).hosts], ["10.0.0.1"])
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["snapshot.json"])
+
+    def test_rejects_foreign_and_newer_files(self):
+        os.makedirs(os.path.dirname(self.path))
+        for content in ("[1, 2]", "{not json", json.dumps({"format": "localnet-snapshot", "version": VERSION + 1}),
+                        json.dumps({"format": "localnet-snapshot", "version": VERSION, "created": 1,
+                                    "fields": ["mac"], "hosts": [["aa"]]})):
+            with open(self.path, "w") as f:
+                f.write(content)
+            with self.assertRaises(ValueError):
+                read_snapshot(self.path)
+        # unknown columns are ignored, missing ones take their defaults
+        with open(self.path, "w") as f:
+            json.dump({"format": "localnet-snapshot", "version": VERSION, "created": 5,
+                       "fields": ["ip", "rtt", "mac"], "hosts": [["10.0.0.1", 0.4, "aa"]]}, f)
+        self.assertEqual(read_snapshot(self.path).hosts[0][:4], ("10.0.0.1", "", "aa", ""))
+
+class TestAnsibleInventory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "snapshot.json")
+
+    def run_main(self, *argv):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            ansible_inventory.main(["--snapshot", self.path, *argv])
+        return json.loads(out.getvalue())
+
+    def test_groups_and_hostvars(self):
+        write_snapshot(self.path, [
+            Host(ip="10.0.0.2", hostname="nas", mac="aa:00:00:00:00:02", vendor="Synology Inc."),
+            Host(ip="10.0.0.3", hostname="nas", vendor="Synology Inc."),
+            Host(ip="10.0.1.4", interface="a/vlan20", subnet="10.0.1.0/24"),
+        ], sources={"10.0.0.2": "mdns"}, networks=[("eth0", "10.0.0.0/24")], now=1000)
+        inv = self.run_main("--list")
+        self.assertEqual(inv["scanned"]["hosts"], ["nas", "10.0.0.3", "10.0.1.4"])
+        self.assertEqual(inv["vendor_synology_inc"]["hosts"], ["nas", "10.0.0.3"])
+        self.assertEqual(inv["subnet_10_0_0_0_24"]["hosts"], ["nas", "10.0.0.3"])
+        self.assertEqual(inv["iface_a_vlan20"]["hosts"], ["10.0.1.4"])
+        self.assertEqual(inv["all"]["children"], sorted(k for k in inv if k not in ("all", "_meta")))
+        self.assertEqual(inv["_meta"]["hostvars"]["nas"], {
+            "ansible_host": "10.0.0.2", "ip": "10.0.0.2", "hostname": "nas", "mac": "aa:00:00:00:00:02",
+            "vendor": "Synology Inc.", "hostname_source": "mdns", "interface": "eth0", "subnet": "10.0.0.0/24",
+            "last_seen": 1000,
+        })
+        self.assertEqual(self.run_main("--host", "10.0.1.4")["subnet"], "10.0.1.0/24")
+        self.assertEqual(self.run_main("--host", "unknown"), {})
+        self.assertEqual(group_name("vendor", "Apple, Inc."), "vendor_apple_inc")
+
+    def test_missing_snapshot(self):
+        with self.assertRaises(SystemExit):
+            self.run_main("--list")
+        with patch("ansible_inventory.start_rescan") as m_rescan:
+            inv = self.run_main("--list", "--max-age", "60", "--rescan", "localnet -s 10.0.0.0/24")
+        m_rescan.assert_called_once_with(self.path, ["localnet", "-s", "10.0.0.0/24"])
+        self.assertEqual(inv["_meta"]["hostvars"], {})
+
+    def test_stale_snapshot_served_while_rescanning(self):
+        write_snapshot(self.path, [Host(ip="10.0.0.2")], now=1000)
+        with patch("ansible_inventory.start_rescan") as m_rescan, \
+                patch.dict(os.environ, {"LOCALNET_MAX_AGE": "300"}):
+            with patch("ansible_inventory.time.time", return_value=1200):
+                self.run_main("--list")
+            m_rescan.assert_not_called()
+            with patch("ansible_inventory.time.time", return_value=1400):
+                inv = self.run_main("--list")
+            m_rescan.assert_called_once()
+        self.assertEqual(inv["scanned"]["hosts"], ["10.0.0.2"])
+
+    def test_one_rescan_at_a_time(self):
+        command = [sys.executable, "-c", "import sys, time; time.sleep(0.5); print(sys.argv[1:], file=sys.stderr)"]
+        first = start_rescan(self.path, command)
+        self.assertIsNotNone(first)
+        self.assertIsNone(start_rescan(self.path, command))
+        first.wait(10)
+        with open(f"{self.path}.log") as f:
+            self.assertIn("'--snapshot', %r" % self.path, f.read())
+        second = start_rescan(self.path, command)  # lock released with the first rescan
+        self.assertIsNotNone(second)
+        second.wait(10)
+
+class TestCliSnapshot(unittest.TestCase):
+    def test_scan_writes_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "snap.json")
+            hosts = [Host(ip="10.0.0.2", hostname="nas"), Host(ip="10.0.0.5")]
+            with patch("cli.discovery_from_args", return_value=FakeDiscovery(hosts)), \
+                    patch("cli.open_vendor_db", return_value=None):
+                cli.main(["-s", "10.0.0.0/24", "-i", "eth0", "--snapshot", path, "-o", os.devnull])
+            snap = read_snapshot(path)
+        self.assertEqual([(h.ip, h.source, h.interface, h.subnet) for h in snap.hosts],
+                         [("10.0.0.2", "mdns", "eth0", "10.0.0.0/24"), ("10.0.0.5", "", "eth0", "10.0.0.0/24")])
+        self.assertEqual(inventory_of(snap)["iface_eth0"]["hosts"], ["nas", "10.0.0.5"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import patch
+import stats
+import utils
+from aggregate import DiscoveryPipeline
+from models import Host
+
+class FakeArpScan:
+    def scan_hosts(self, subnet, *, timeout, interface=None):
+        return [Host(ip="10.0.0.2", mac="aa:bb:cc:00:00:02"), Host(ip="10.0.0.3")]
+
+class TestStats(unittest.TestCase):
+    def test_listener_gets_subprocess_events(self):
+        events = []
+        with stats.listening(events.append):
+            rc, out, _ = utils.run(["sh", "-c", "echo hello; exit 3"])
+        utils.run(["true"])  # no listener any more
+        self.assertEqual((rc, out), (3, "hello"))
+        self.assertEqual(len(events), 1)
+        ev = events[0]
+        self.assertEqual((ev["kind"], ev["tool"], ev["rc"], ev["timed_out"], ev["stdout_bytes"]),
+                         ("subprocess", "sh", 3, False, 5))
+        self.assertEqual(ev["cmd"], ["sh", "-c", "echo hello; exit 3"])
+
+    def test_broken_listener_does_not_break_emit(self):
+        def broken(event):
+            raise RuntimeError("metrics backend down")
+        seen = []
+        with stats.listening(broken), stats.listening(seen.append):
+            stats.emit("stage", name="scan", duration=0.1, hosts=1)
+        self.assertEqual(len(seen), 1)
+
+    @patch("aggregate.read_neigh_table", return_value={})
+    def test_pipeline_stage_and_scanner_events(self, m_neigh):
+        collector = stats.StatsCollector()
+        pipe = DiscoveryPipeline([FakeArpScan()], [], enable_mdns=False, enable_nbtscan=False, enable_rdns=False)
+        with stats.listening(collector):
+            pipe.discover("10.0.0.0/24")
+        summary = collector.summary()
+        self.assertEqual(summary["scanners"]["FakeArpScan"]["hosts"], 2)
+        self.assertEqual(summary["scanners"]["FakeArpScan"]["calls"], 1)
+        self.assertEqual(set(summary["stages"]), {"scan", "neigh", "enrich"})
+        self.assertEqual(summary["stages"]["scan"]["hosts"], 2)
+
+    def test_collector_summary(self):
+        c = stats.StatsCollector(slowest=1)
+        c(dict(kind="subprocess", tool="nmap", cmd=["nmap"], duration=2.0, rc=0, timed_out=False,
+               stdout_bytes=10, stderr_bytes=0))
+        c(dict(kind="subprocess", tool="nmap", cmd=["nmap", "-x"], duration=5.0, rc=124, timed_out=True,
+               stdout_bytes=4, stderr_bytes=0))
+        c(dict(kind="resolver", name="rdns", duration=0.5, queried=10, resolved=4, skipped=2))
+        s = c.summary()
+        self.assertEqual(s["subprocesses"]["count"], 2)
+        self.assertEqual(s["subprocesses"]["by_tool"]["nmap"]["timeouts"], 1)
+        self.assertEqual(s["subprocesses"]["by_tool"]["nmap"]["stdout_bytes"], 14)
+        self.assertEqual(s["subprocesses"]["slowest"], [dict(cmd=["nmap", "-x"], duration=5.0, rc=124)])
+        self.assertEqual(s["resolvers"]["rdns"], dict(calls=1, duration=0.5, queried=10, resolved=4, skipped=2))
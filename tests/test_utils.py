@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch
+import signal
 import subprocess
+import time
 
 import utils
 
@@ -15,3 +17,34 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(rc, 124)
         self.assertEqual(out, "")
         self.assertEqual(err, "timeout")
+
+    @patch("subprocess.run", side_effect=subprocess.TimeoutExpired(cmd=["arp-scan"], timeout=1, output="10.0.0.1\t00:11:22:33:44:55\n"))
+    def test_run_timeout_keeps_partial_output(self, m):
+        rc, out, err = utils.run(["arp-scan"], timeout=1)
+        self.assertEqual((rc, out, err), (124, "10.0.0.1\t00:11:22:33:44:55", "timeout"))
+
+class TestLineStream(unittest.TestCase):
+    def test_lines_and_exit_status(self):
+        stream = utils.LineStream(["sh", "-c", "echo a; echo b >&2; printf c; exit 3"], timeout=5)
+        self.assertEqual(list(stream), ["a", "c"])
+        self.assertEqual((stream.rc, stream.timed_out, stream.stderr), (3, False, "b"))
+
+    def test_timeout_keeps_lines_already_printed(self):
+        stream = utils.LineStream(["sh", "-c", "echo 10.0.0.1; printf 10.0.0; sleep 10"], timeout=0.5)
+        self.assertEqual(list(stream), ["10.0.0.1"])  # the half-written line is dropped
+        self.assertEqual((stream.rc, stream.timed_out), (124, True))
+
+    def test_line_timeout_kills_the_process_group(self):
+        start = time.monotonic()
+        # the background sleep keeps stdout open: only a group kill ends the read
+        stream = utils.LineStream(["sh", "-c", "echo a; sleep 10 & sleep 10"], timeout=10, line_timeout=0.3)
+        self.assertEqual(list(stream), ["a"])
+        self.assertTrue(stream.timed_out)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_stopping_early_terminates_the_tool(self):
+        stream = utils.LineStream(["sh", "-c", "echo 1; echo 2; sleep 10"], timeout=10)
+        lines = iter(stream)
+        self.assertEqual(next(lines), "1")
+        lines.close()
+        self.assertEqual(stream.rc, -signal.SIGTERM)
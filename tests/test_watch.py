@@ -0,0 +1,120 @@
+import json
+import os
+import socket
+import tempfile
+import unittest
+from unittest.mock import patch
+from hoststore import HostTable
+from models import Host
+from watch import UnixSocketSink, Watcher
+
+class FakePipeline:
+    def __init__(self):
+        self.sweep = {}
+        self.scans = 0
+        self.enriched = []
+        self.names = {}
+    def scan(self, subnet):
+        self.scans += 1
+        return HostTable(Host(ip=ip, mac=mac) for ip, mac in self.sweep.items())
+    def enrich(self, hosts, neigh_table=None):
+        for h in hosts:
+            self.enriched.append(h.ip)
+            h.hostname = self.names.get(h.ip, f"host-{h.ip.rsplit('.', 1)[1]}")
+
+def neigh(entries):
+    return {ip: {"ip": ip, "mac": mac, "dev": "eth0", "state": state} for ip, (mac, state) in entries.items()}
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.now = [1000.0]
+        self.events = []
+        self.pipe = FakePipeline()
+        self.w = Watcher(self.pipe, "10.0.0.0/24", self.events.append,
+                         refresh_interval=10, sweep_interval=60, leave_after=30, clock=lambda: self.now[0])
+
+    def tick(self, table, advance=10):
+        with patch("watch.read_neigh_table", return_value=neigh(table)):
+            self.w.tick()
+        self.now[0] += advance
+
+    def test_join_change_leave(self):
+        self.pipe.sweep = {"10.0.0.5": "aa:00:00:00:00:05"}
+        self.tick({"10.0.0.1": ("aa:00:00:00:00:01", "REACHABLE"), "10.0.0.9": ("", "FAILED"),
+                   "192.168.1.1": ("bb:00:00:00:00:01", "REACHABLE")})
+        self.assertEqual(sorted((e["event"], e["ip"]) for e in self.events),
+                         [("join", "10.0.0.1"), ("join", "10.0.0.5")])
+        self.assertEqual(self.events[0]["hostname"], "host-1")
+        self.assertEqual(self.pipe.scans, 1)
+
+        # cheap refresh: no sweep, nothing new, nothing re-enriched
+        self.events.clear()
+        self.pipe.enriched.clear()
+        self.tick({"10.0.0.1": ("aa:00:00:00:00:01", "REACHABLE"), "10.0.0.5": ("aa:00:00:00:00:05", "DELAY")})
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.pipe.enriched, [])
+        self.assertEqual(self.pipe.scans, 1)
+
+        # MAC change on a known IP
+        self.tick({"10.0.0.1": ("aa:00:00:00:00:99", "REACHABLE")})
+        self.assertEqual([(e["event"], e["ip"], e["before"]["mac"]) for e in self.events],
+                         [("change", "10.0.0.1", "aa:00:00:00:00:01")])
+        self.assertEqual(self.pipe.enriched, ["10.0.0.1"])
+
+        # 10.0.0.5 only STALE from now on -> leaves after 30s without sighting
+        self.events.clear()
+        for _ in range(3):
+            self.tick({"10.0.0.1": ("aa:00:00:00:00:99", "REACHABLE"), "10.0.0.5": ("aa:00:00:00:00:05", "STALE")})
+        self.assertEqual([(e["event"], e["ip"]) for e in self.events], [("leave", "10.0.0.5")])
+        self.assertNotIn("10.0.0.5", self.w.hosts)
+        self.assertNotIn("10.0.0.5", self.w.last_seen)
+
+    def test_names_are_refreshed(self):
+        self.w = Watcher(self.pipe, "10.0.0.0/24", self.events.append, refresh_interval=10,
+                         sweep_interval=60, leave_after=300, name_ttl=100, clock=lambda: self.now[0])
+        table = {"10.0.0.1": ("aa:00:00:00:00:01", "REACHABLE"), "10.0.0.2": ("aa:00:00:00:00:02", "REACHABLE")}
+        self.pipe.names = {"10.0.0.2": ""}  # no name found at first
+        self.tick(table, advance=60)
+        self.assertEqual([(e["event"], e["hostname"]) for e in self.events], [("join", "host-1"), ("join", "")])
+
+        # the nameless host is retried after a sweep interval, the named one keeps its name
+        self.events.clear()
+        self.pipe.enriched.clear()
+        self.pipe.names = {"10.0.0.2": "printer"}
+        self.tick(table, advance=50)
+        self.assertEqual(self.pipe.enriched, ["10.0.0.2"])
+        self.assertEqual([(e["event"], e["ip"], e["hostname"], e["before"]["hostname"]) for e in self.events],
+                         [("change", "10.0.0.2", "printer", "")])
+        self.assertEqual(self.w.hosts["10.0.0.2"].mac, "aa:00:00:00:00:02")
+
+        # past the TTL the name is looked up again, and a new name is a change
+        self.events.clear()
+        self.pipe.enriched.clear()
+        self.pipe.names = {"10.0.0.1": "laptop"}
+        self.tick(table)
+        self.assertEqual(self.pipe.enriched, ["10.0.0.1"])
+        self.assertEqual([(e["event"], e["hostname"], e["before"]["hostname"]) for e in self.events],
+                         [("change", "laptop", "host-1")])
+
+        # a failed lookup keeps the name
+        self.events.clear()
+        self.pipe.names = {"10.0.0.1": "", "10.0.0.2": ""}
+        self.now[0] += 200
+        self.tick(table)
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.w.hosts["10.0.0.1"].hostname, "laptop")
+
+class TestUnixSocketSink(unittest.TestCase):
+    def test_broadcast(self):
+        path = os.path.join(tempfile.mkdtemp(), "events.sock")
+        sink = UnixSocketSink(path)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        try:
+            sink({"event": "join", "ip": "10.0.0.1"})
+            client.settimeout(2)
+            self.assertEqual(json.loads(client.recv(4096).decode()), {"event": "join", "ip": "10.0.0.1"})
+        finally:
+            client.close()
+            sink.close()
+        self.assertFalse(os.path.exists(path))
@@ -1,17 +1,152 @@
 from __future__ import annotations
+import os
+import selectors
 import shutil
+import signal
 import subprocess
-from typing import List, Optional, Tuple
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Tuple
+import stats
 
 def which(cmd: str) -> Optional[str]:
     return shutil.which(cmd)
 
+def _text(data) -> str:
+    if data is None:
+        return ""
+    if isinstance(data, bytes):
+        data = data.decode(errors="replace")
+    return data.strip()
+
 def run(cmd: List[str], timeout: int = 30) -> Tuple[int, str, str]:
+    """
+    Run `cmd` and return (rc, stdout, stderr). On timeout rc is 124 and
+    stdout holds whatever the tool printed before it was killed. Every
+    call is reported as a `subprocess` instrumentation event.
+    """
+    start = time.monotonic()
+    timed_out = False
     try:
         p = subprocess.run(
             cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
             text=True, timeout=timeout
         )
-        return p.returncode, p.stdout.strip(), p.stderr.strip()
-    except subprocess.TimeoutExpired:
-        return 124, "", "timeout"
+        rc, out, err = p.returncode, p.stdout.strip(), p.stderr.strip()
+    except subprocess.TimeoutExpired as e:
+        timed_out = True
+        rc, out, err = 124, _text(e.stdout), "timeout"
+    if stats.enabled():
+        stats.emit(
+            "subprocess", tool=os.path.basename(cmd[0]), cmd=list(cmd), duration=round(time.monotonic() - start, 6),
+            rc=rc, timed_out=timed_out, stdout_bytes=len(out.encode(errors="replace")),
+            stderr_bytes=0 if timed_out else len(err.encode(errors="replace")),
+        )
+    return rc, out, err
+
+class LineStream:
+    """
+    Run `cmd` and iterate over its stdout lines as the tool prints them.
+
+    `timeout` caps the whole run and `line_timeout` (optional) the silence
+    between two lines; when either expires, or the consumer stops
+    iterating early, the tool's whole process group is terminated (SIGTERM,
+    then SIGKILL after `kill_grace` seconds). Every complete line received
+    before that has already been yielded. Afterwards `rc` holds the exit
+    status (124 on timeout, as with `run`), `timed_out` and `stderr` are
+    set, and a `subprocess` instrumentation event has been emitted.
+    """
+
+    def __init__(self, cmd: List[str], *, timeout: float = 30, line_timeout: Optional[float] = None,
+                 kill_grace: float = 1.0):
+        self.cmd = list(cmd)
+        self.timeout = timeout
+        self.line_timeout = line_timeout
+        self.kill_grace = kill_grace
+        self.rc: Optional[int] = None
+        self.timed_out = False
+        self.stderr = ""
+        self.stdout_bytes = 0
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.monotonic()
+        proc = subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+        sel = selectors.DefaultSelector()
+        sel.register(proc.stdout, selectors.EVENT_READ)
+        sel.register(proc.stderr, selectors.EVENT_READ)
+        pending = b""
+        err = bytearray()
+        last = start
+        closed = False
+        try:
+            while sel.get_map():
+                now = time.monotonic()
+                wait = start + self.timeout - now
+                if self.line_timeout is not None:
+                    wait = min(wait, last + self.line_timeout - now)
+                if wait <= 0:
+                    self.timed_out = True
+                    break
+                for key, _ in sel.select(wait):
+                    data = os.read(key.fd, 65536)
+                    if not data:
+                        sel.unregister(key.fileobj)
+                    elif key.fileobj is proc.stderr:
+                        err += data[:_STDERR_LIMIT - len(err)]
+                    else:
+                        self.stdout_bytes += len(data)
+                        last = time.monotonic()
+                        *lines, pending = (pending + data).split(b"\n")
+                        for line in lines:
+                            yield line.decode(errors="replace").rstrip("\r")
+            else:
+                closed = True
+            # a partial last line is only trusted when the tool closed stdout itself
+            if pending and closed:
+                yield pending.decode(errors="replace").rstrip("\r")
+        finally:
+            sel.close()
+            if closed:
+                try:
+                    proc.wait(timeout=max(0.0, start + self.timeout - time.monotonic()))
+                except subprocess.TimeoutExpired:
+                    self.timed_out = True
+            if proc.poll() is None:
+                self._kill(proc)
+            proc.stdout.close()
+            proc.stderr.close()
+            self.rc = 124 if self.timed_out else proc.returncode
+            self.stderr = "timeout" if self.timed_out else _text(bytes(err))
+            if stats.enabled():
+                stats.emit(
+                    "subprocess", tool=os.path.basename(self.cmd[0]), cmd=self.cmd,
+                    duration=round(time.monotonic() - start, 6), rc=self.rc, timed_out=self.timed_out,
+                    stdout_bytes=self.stdout_bytes, stderr_bytes=0 if self.timed_out else len(err),
+                )
+
+    def _kill(self, proc: subprocess.Popen) -> None:
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(proc.pid, sig)
+            except ProcessLookupError:
+                pass
+            try:
+                proc.wait(timeout=self.kill_grace)
+                return
+            except subprocess.TimeoutExpired:
+                continue
+        proc.wait()
+
+_STDERR_LIMIT = 1 << 16  # stderr is kept for diagnostics only
+
+@contextmanager
+def target_file(ips: Iterable[str]) -> Iterator[str]:
+    """Temporary file listing `ips` one per line, for tools that read targets from a file (-iL / -f)."""
+    fd, path = tempfile.mkstemp(prefix="localnet-targets-", text=True)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.writelines(ip + "\n" for ip in ips)
+        yield path
+    finally:
+        os.unlink(path)
@@ -0,0 +1,198 @@
+from __future__ import annotations
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional, TextIO
+from aggregate import DiscoveryPipeline
+from models import Host
+from output import host_dict
+from resolvers import read_neigh_table
+
+# neighbour states that prove the host answered recently; STALE entries can
+# linger long after a host left, so they do not refresh presence
+PRESENT_STATES = ("REACHABLE", "DELAY", "PROBE", "PERMANENT")
+
+# how long a resolved name is trusted when the pipeline has no inventory
+# (the InventoryStore default hostname TTL)
+DEFAULT_NAME_TTL = 3600.0
+
+class StreamSink:
+    """Writes events as NDJSON lines to a text stream (stdout by default)."""
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def __call__(self, event: Dict) -> None:
+        self.out.write(json.dumps(event) + "\n")
+        self.out.flush()
+
+    def close(self) -> None:
+        pass
+
+class UnixSocketSink:
+    """Broadcasts NDJSON events to every client connected to a Unix stream socket."""
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(8)
+        self.server.setblocking(False)
+        self.clients: List[socket.socket] = []
+
+    def __call__(self, event: Dict) -> None:
+        self._accept()
+        line = (json.dumps(event) + "\n").encode()
+        for c in list(self.clients):
+            try:
+                c.sendall(line)
+            except OSError:
+                self.clients.remove(c)
+                c.close()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except (BlockingIOError, OSError):
+                return
+            conn.settimeout(1.0)
+            self.clients.append(conn)
+
+    def close(self) -> None:
+        for c in self.clients:
+            c.close()
+        self.server.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+class Watcher:
+    """
+    Continuous monitoring on top of a DiscoveryPipeline. Keeps the known
+    hosts in memory, refreshes presence cheaply from the neighbour table
+    every `refresh_interval` seconds, runs the active scanners every
+    `sweep_interval` seconds, enriches only new or changed hosts and emits
+    join/leave/change events. Names are looked up again once they are older
+    than `name_ttl` (the inventory's hostname TTL by default); hosts without
+    a name are retried every sweep interval. Hosts not seen for
+    `leave_after` seconds are dropped, so memory is bounded by the number
+    of live hosts.
+    """
+
+    def __init__(
+        self,
+        pipeline: DiscoveryPipeline,
+        subnet: str,
+        emit: Callable[[Dict], None],
+        *,
+        refresh_interval: float = 10.0,
+        sweep_interval: float = 300.0,
+        leave_after: Optional[float] = None,
+        name_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.pipeline = pipeline
+        self.network = ipaddress.ip_network(subnet, strict=False)
+        self.subnet = subnet
+        self.emit = emit
+        self.refresh_interval = refresh_interval
+        self.sweep_interval = sweep_interval
+        self.leave_after = leave_after if leave_after is not None else 2 * sweep_interval + refresh_interval
+        if name_ttl is None:
+            inventory = getattr(pipeline, "inventory", None)
+            name_ttl = inventory.hostname_ttl if inventory is not None else DEFAULT_NAME_TTL
+        self.name_ttl = name_ttl
+        self.clock = clock
+        self.hosts: Dict[str, Host] = {}
+        self.last_seen: Dict[str, float] = {}
+        self.named_at: Dict[str, float] = {}
+        self._next_sweep = 0.0
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.tick()
+            stop.wait(self.refresh_interval)
+
+    def tick(self) -> None:
+        """One cycle: neighbour refresh, active sweep when due, then expiry."""
+        now = self.clock()
+        neigh = read_neigh_table(include_local=False)
+        seen: Dict[str, Host] = {}
+        for ip, entry in neigh.items():
+            if entry["state"] in PRESENT_STATES and self._in_scope(ip):
+                seen[ip] = Host(ip=ip, mac=entry["mac"])
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            for h in self.pipeline.scan(self.subnet).values():
+                ip = h.ip
+                if not self._in_scope(ip):
+                    continue
+                if ip in seen:
+                    seen[ip].merge_from(h)
+                else:
+                    seen[ip] = h
+        self._absorb(seen, neigh, now)
+        self._expire(now)
+
+    def _absorb(self, seen: Dict[str, Host], neigh, now: float) -> None:
+        new: List[Host] = []
+        changed: List[Host] = []
+        renamed: List[Host] = []
+        for ip, h in seen.items():
+            self.last_seen[ip] = now
+            known = self.hosts.get(ip)
+            if known is None:
+                new.append(h)
+            elif h.mac and h.mac.lower() != known.mac.lower():
+                changed.append(h)
+            elif now - self.named_at.get(ip, 0.0) >= (self.name_ttl if known.hostname else self.sweep_interval):
+                # same host, name missing or expired: look it up again
+                fresh = replace(known, hostname="")
+                fresh.merge_from(h)
+                renamed.append(fresh)
+        if not new and not changed and not renamed:
+            return
+        # re-enrich only what is new, changed or due for a new name
+        self.pipeline.enrich(new + changed + renamed, neigh)
+        for h in new + changed + renamed:
+            self.named_at[h.ip] = now
+        for h in new:
+            self.hosts[h.ip] = h
+            self._event("join", h)
+        for h in changed:
+            before = self.hosts[h.ip]
+            self.hosts[h.ip] = h
+            self._event("change", h, before)
+        for h in renamed:
+            before = self.hosts[h.ip]
+            if not h.hostname or h.hostname == before.hostname:
+                continue  # a failed lookup keeps the name we had
+            self.hosts[h.ip] = h
+            self._event("change", h, before)
+
+    def _expire(self, now: float) -> None:
+        for ip in [ip for ip, t in self.last_seen.items() if now - t > self.leave_after]:
+            del self.last_seen[ip]
+            self.named_at.pop(ip, None)
+            host = self.hosts.pop(ip, None)
+            if host is not None:
+                self._event("leave", host)
+
+    def _in_scope(self, ip: str) -> bool:
+        try:
+            return ipaddress.ip_address(ip) in self.network
+        except ValueError:
+            return False
+
+    def _event(self, kind: str, host: Host, before: Optional[Host] = None) -> None:
+        event = dict(event=kind, ts=round(self.clock(), 3), **host_dict(replace(host)))
+        if before is not None:
+            event["before"] = host_dict(before)
+        self.emit(event)